@@ -4,14 +4,37 @@ Reversible BitFuck (RBF) interpretor
 
 __version__ = "0.2.1"
 
+from . import hooks
 from . import program
 from . import tape
 from . import runner
 from . import reverse
+from . import parallel
 
 Program = program.Program
+Code = program.Code
 Tape = tape.Tape
+PackedTape = tape.PackedTape
+SparseTape = tape.SparseTape
+GrowableTape = tape.GrowableTape
+Hooks = hooks.Hooks
 run = runner.run
+run_backward = runner.run_backward
+iter_run = runner.iter_run
+run_many = parallel.run_many
 reverse_program = reverse.reverse_program
 
-__all__ = ["Program", "Tape", "run", "reverse_program"]
+__all__ = [
+    "Program",
+    "Code",
+    "Tape",
+    "PackedTape",
+    "SparseTape",
+    "GrowableTape",
+    "Hooks",
+    "run",
+    "run_backward",
+    "iter_run",
+    "run_many",
+    "reverse_program",
+]
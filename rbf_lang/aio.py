@@ -0,0 +1,128 @@
+"""Run programs from an asyncio event loop without blocking it.
+
+:func:`arun` runs a program in slices with :func:`rbf_lang.runner.iter_run`, and gives
+the event loop a chance to run other tasks after each slice, so that a long run never
+holds it up for more than one slice. The slices can also be run in a thread pool, to
+keep the loop responsive while a slice runs, or the whole run can be sent to a process
+pool, to use more CPUs. Cancelling the task stops the run at the end of the current
+slice.
+
+To share a host between many requests, pass the same :class:`asyncio.Semaphore` as the
+``limiter`` of every call. Only as many runs as the semaphore allows run at once, and
+the rest wait their turn in the order they arrived.
+
+>>> import asyncio
+>>> async def main() -> list[str]:
+...     limiter = asyncio.Semaphore(2)
+...     runs = [
+...         arun("(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)", tape, limiter=limiter)
+...         for tape in ("100", "000", "110")
+...     ]
+...     return [str(tape) for _program, tape in await asyncio.gather(*runs)]
+>>> asyncio.run(main())
+['010', '000', '110']
+"""
+
+import asyncio
+import contextlib
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Awaitable, Callable, Generator, Optional
+
+from .hooks import Hooks
+from .program import Program, _ProgramInitType
+from .runner import Progress, iter_run, run
+from .tape import Tape, _TapeInitType
+
+
+async def arun(
+    program: _ProgramInitType,
+    tape: _TapeInitType,
+    max_steps: int = 1000,
+    engine: str = "reference",
+    hooks: Optional[Hooks] = None,
+    tape_type: Optional[str] = None,
+    in_place: bool = False,
+    slice_steps: int = 10_000,
+    executor: Optional[Executor] = None,
+    limiter: Optional[asyncio.Semaphore] = None,
+) -> tuple[Program, Tape]:
+    """Run the program like :func:`rbf_lang.run`, yielding to the event loop every
+    ``slice_steps`` steps.
+
+    Without an ``executor``, the slices run in the event loop itself. With a thread pool
+    (or any other :class:`concurrent.futures.Executor` which is not a process pool), each
+    slice runs in the pool, and the loop is free in the meantime. If the task is
+    cancelled while a slice runs in a thread, the task waits for the slice to finish
+    before it stops, so the program and tape are never changed after that. The
+    ``"compiled"`` engine only runs in a process pool, since it cannot run in slices (see
+    :func:`rbf_lang.runner.iter_run`).
+
+    With a :class:`concurrent.futures.ProcessPoolExecutor`, the whole run is sent to the
+    pool at once, and the result comes back as a new program and tape, so ``in_place``
+    is not supported, and the ``hooks`` must be picklable. Cancelling the task before
+    the run starts removes it from the pool, but a run which has started goes on to the
+    end, and its result is dropped.
+
+    The ``limiter`` is held for the whole run, including the time spent in the pool.
+    """
+    if isinstance(executor, ProcessPoolExecutor) and in_place:
+        raise ValueError("in_place is not supported with a process pool.")
+    # Convert (or copy) the program and tape, and check the arguments, before waiting
+    program, tape = run(
+        program, tape, 0, engine=engine, tape_type=tape_type, in_place=in_place
+    )
+    work: Callable[[], Awaitable[tuple[Program, Tape]]]
+    if isinstance(executor, ProcessPoolExecutor):
+        # A generator cannot be sent to another process, so the whole run is sent
+        work = functools.partial(
+            asyncio.get_running_loop().run_in_executor,
+            executor,
+            functools.partial(
+                run, program, tape, max_steps, engine=engine, hooks=hooks, in_place=True
+            ),
+        )
+    else:
+        slices = iter_run(
+            program, tape, slice_steps, max_steps, engine, hooks, in_place=True
+        )
+        work = functools.partial(_run_slices, slices, program, tape, executor)
+    if limiter is None:
+        return await work()
+    async with limiter:
+        return await work()
+
+
+async def _run_slices(
+    slices: Generator[Progress, Optional[int], None],
+    program: Program,
+    tape: Tape,
+    executor: Optional[Executor],
+) -> tuple[Program, Tape]:
+    """Run the slices in the event loop, yielding to it after each of them, or in the
+    executor."""
+    if executor is None:
+        try:
+            for _progress in slices:
+                await asyncio.sleep(0)
+        finally:
+            slices.close()
+    else:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                future = loop.run_in_executor(executor, next, slices, None)
+                try:
+                    progress = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # The slice goes on in its thread regardless, so wait for it to
+                    # finish before handing the program and tape back to the caller
+                    while not future.done():
+                        with contextlib.suppress(asyncio.CancelledError):
+                            await asyncio.wait({future})
+                    raise
+                if progress is None:
+                    break
+        finally:
+            slices.close()
+    return program, tape
@@ -0,0 +1,129 @@
+"""Run one program over many tapes at once with NumPy.
+
+The tapes are stored as the rows of a 2D matrix of bits, and every row has its own tape
+head and program pointer. At each step, every row which is still running executes its
+current command, so rows whose loops take different paths stay correct. Since each row
+executes exactly one command per step, all the running rows always have the same step
+count, and a row only drops out when it finishes or runs out of steps.
+"""
+
+from typing import NamedTuple, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    raise ImportError(
+        "rbf_lang.batch requires numpy. Install it with `pip install rbf-lang[numpy]`."
+    ) from None
+
+from .command import Command
+from .program import Program, _ProgramInitType
+from .tape import Tape, _TapeInitType
+
+_OPCODES = {
+    Command.TOGGLE: 0,
+    Command.TAPE_RIGHT: 1,
+    Command.TAPE_LEFT: 2,
+    Command.LOOP_START: 3,
+    Command.LOOP_END: 4,
+}
+
+_BatchTapesType = Union["np.ndarray", Sequence[_TapeInitType]]
+
+
+class BatchResult(NamedTuple):
+    """The result of :func:`run_batch`. Each field has one entry per input tape."""
+
+    tapes: "np.ndarray"
+    """The final tapes, as a ``(len(tapes), tape size)`` matrix of 0s and 1s."""
+    pointers: "np.ndarray"
+    """The final tape head positions."""
+    steps: "np.ndarray"
+    """The number of steps each row has run for."""
+    finished: "np.ndarray"
+    """Whether each row has run to the end of the program (rather than out of steps)."""
+
+    def tape(self, index: int) -> Tape:
+        """Return the final tape of a single row as a :class:`Tape`."""
+        return Tape(self.tapes[index].tolist(), pointer=int(self.pointers[index]))
+
+
+def _tape_matrix(tapes: _BatchTapesType) -> tuple["np.ndarray", "np.ndarray"]:
+    """Convert the tapes to a matrix of bits and an array of tape head positions."""
+    if isinstance(tapes, np.ndarray):
+        if tapes.ndim != 2:
+            raise ValueError("Tapes must be a 2D array of bits.")
+        return (tapes != 0).astype(np.uint8), np.zeros(len(tapes), dtype=np.intp)
+
+    rows = [tape if isinstance(tape, Tape) else Tape(tape) for tape in tapes]
+    if len({len(row) for row in rows}) > 1:
+        raise ValueError("All tapes must have the same size.")
+    size = len(rows[0]) if rows else 0
+    matrix = np.zeros((len(rows), size), dtype=np.uint8)
+    for i, row in enumerate(rows):
+        matrix[i] = np.frombuffer(row._cells(), dtype=np.uint8)
+    pointers = np.array([row.pointer for row in rows], dtype=np.intp)
+    return matrix, pointers
+
+
+def run_batch(
+    program: _ProgramInitType,
+    tapes: _BatchTapesType,
+    max_steps: int = 1000,
+    pointers: Optional[Sequence[int]] = None,
+) -> BatchResult:
+    """Run the program on each of the tapes, with the same result as calling
+    :func:`rbf_lang.run` on each of them. The program is parsed and validated once.
+
+    ``tapes`` is either a 2D array with one tape per row, or a sequence of anything
+    :class:`Tape` accepts. The tape heads start at ``pointers`` if given, or else at
+    the pointers of the given tapes (0 for arrays).
+
+    >>> result = run_batch("(>*<)", ["00", "10", "11"])
+    >>> result.tapes.tolist()
+    [[0, 0], [1, 1], [1, 0]]
+    >>> result.steps.tolist()
+    [1, 5, 5]
+    """
+    program = Program(program)
+    matrix, heads = _tape_matrix(tapes)
+    if pointers is not None:
+        heads = np.array(pointers, dtype=np.intp)
+    rows, size = matrix.shape
+
+    opcodes = np.array([_OPCODES[command] for command in program], dtype=np.uint8)
+    jumps = np.array(program._jumps, dtype=np.intp)
+    length = len(program)
+
+    pc = np.full(rows, program.pointer, dtype=np.intp)
+    steps = np.full(rows, program.steps, dtype=np.int64)
+    running = np.full(rows, length > 0, dtype=bool)
+
+    step = program.steps
+    while step < max_steps:
+        (active,) = np.nonzero(running)
+        if not active.size:
+            break
+
+        codes = opcodes[pc[active]]
+
+        toggle = active[codes == 0]
+        matrix[toggle, heads[toggle]] ^= 1
+
+        right = active[codes == 1]
+        heads[right] = (heads[right] + 1) % size
+        left = active[codes == 2]
+        heads[left] = (heads[left] - 1) % size
+
+        # Both brackets continue if the current bit is set, and otherwise jump to their
+        # matching bracket. Either way, we then move on to the next command.
+        bracket = active[codes >= 3]
+        bits = matrix[bracket, heads[bracket]].astype(bool)
+        pc[bracket] = np.where(bits, pc[bracket], jumps[pc[bracket]])
+        pc[active] += 1
+
+        step += 1
+        steps[active] = step
+        running[active] = pc[active] < length
+
+    return BatchResult(matrix, heads, steps, pc >= length)
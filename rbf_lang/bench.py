@@ -0,0 +1,215 @@
+"""Benchmarks of :func:`rbf_lang.run` on generated workloads.
+
+Each workload is run with every engine and tape type which supports it, and measured in
+steps per second (the best of a few repeats, after a warm-up run) and peak memory (in a
+separate run, since tracing the allocations slows the run down). The results can be saved as JSON, and
+compared with a saved baseline to catch regressions. This is what ``rbf bench`` does.
+
+>>> [workload.name for workload in workloads()]
+['move_right', 'nested', 'scan', 'straight', 'large_tape']
+>>> results = benchmark(workloads(scale=0.01)[:1], engines=["optimized"], tape_types=["packed"])
+>>> results[0].workload, results[0].engine, results[0].tape_type, results[0].steps
+('move_right', 'optimized', 'packed', 25)
+"""
+
+import json
+import os
+import platform
+import time
+import tracemalloc
+from typing import Any, Iterable, NamedTuple, Optional, Union
+
+from .program import Program
+from .runner import ENGINES, run
+from .tape import TAPE_TYPES, _TapeInitType
+
+MOVE_RIGHT = "(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)"
+"""Moves the bit under the tape head one cell to the right, using the next two cells."""
+
+
+class Workload(NamedTuple):
+    """A program to benchmark, with its initial tape."""
+
+    name: str
+    program: str
+    tape: _TapeInitType
+    max_steps: int
+
+
+def workloads(scale: float = 1.0) -> list[Workload]:
+    """Return the benchmark workloads. ``scale`` scales the size of each of them, and so
+    roughly the time they take."""
+
+    def scaled(n: int) -> int:
+        return max(1, int(n * scale))
+
+    chain = scaled(100)
+    depth = scaled(20)
+    size = scaled(500)
+    large = scaled(1_000_000)
+    return [
+        # The move right gadget chained to carry a bit along the tape
+        Workload("move_right", MOVE_RIGHT * chain, "1" + "0" * (chain + 1), 25 * chain),
+        # Loops nested deep inside each other
+        Workload("nested", "*" + "(>" * depth + ")" * depth, 4 * depth, scaled(20_000)),
+        # Scan loops which go round the whole tape to find the one set cell
+        Workload("scan", "(>)" * 10, "1" + "0" * (size - 1), 2 * size * 10),
+        # A long program without any loops
+        Workload("straight", "*>*>>*<" * size, size, 4 * 7 * size),
+        # A short run on a very large tape
+        Workload("large_tape", MOVE_RIGHT * 10, "1" + "0" * large, 250),
+    ]
+
+
+class Result(NamedTuple):
+    """The measurements of one workload, with one engine and tape type."""
+
+    workload: str
+    engine: str
+    tape_type: str
+    steps: int
+    seconds: float
+    """The time of the fastest run."""
+    peak_memory: int
+    """The peak memory allocated during the run, in bytes."""
+
+    @property
+    def key(self) -> str:
+        return f"{self.workload}/{self.engine}/{self.tape_type}"
+
+    @property
+    def steps_per_second(self) -> float:
+        return self.steps / self.seconds if self.seconds > 0 else float("inf")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**self._asdict(), "steps_per_second": self.steps_per_second}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Result":
+        return cls(*(data[field] for field in cls._fields))
+
+
+def measure(
+    workload: Workload,
+    engine: str = "reference",
+    tape_type: str = "list",
+    repeat: int = 3,
+) -> Result:
+    """Run the workload ``repeat`` times, and once more to measure its peak memory."""
+    program = Program(workload.program)
+    tape = TAPE_TYPES[tape_type](workload.tape)
+    # A run which is not timed first, so that the time to compile or optimize the program
+    # (which is cached) does not depend on which tape type is measured first
+    run(program, tape, workload.max_steps, engine=engine)
+    seconds = float("inf")
+    steps = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        final_program, _tape = run(program, tape, workload.max_steps, engine=engine)
+        seconds = min(seconds, time.perf_counter() - start)
+        steps = final_program.steps
+
+    tracemalloc.start()
+    try:
+        run(program, tape, workload.max_steps, engine=engine)
+        _current, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(workload.name, engine, tape_type, steps, seconds, peak_memory)
+
+
+def benchmark(
+    workloads: Iterable[Workload],
+    engines: Iterable[str] = ENGINES,
+    tape_types: Iterable[str] = tuple(TAPE_TYPES),
+    repeat: int = 3,
+) -> list[Result]:
+    """Measure every workload with every engine and tape type. Growable and sparse tapes
+    are only measured with the reference engine, which is the only one to support them."""
+    engines, tape_types = list(engines), list(tape_types)
+    results = []
+    for workload in workloads:
+        for engine in engines:
+            for tape_type in tape_types:
+                kind = TAPE_TYPES[tape_type]
+                if engine != "reference" and not (kind.circular and kind.dense):
+                    continue
+                results.append(measure(workload, engine, tape_type, repeat))
+    return results
+
+
+def save_results(
+    results: Iterable[Result], path: Union[str, "os.PathLike[str]"]
+) -> None:
+    """Save the results as JSON, with the versions of Python and rbf-lang."""
+    from . import __version__
+
+    data = {
+        "python": platform.python_version(),
+        "rbf_lang": __version__,
+        "results": [result.to_dict() for result in results],
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+
+
+def load_results(path: Union[str, "os.PathLike[str]"]) -> list[Result]:
+    """Load results saved with :func:`save_results`."""
+    with open(path) as file:
+        data = json.load(file)
+    return [Result.from_dict(result) for result in data["results"]]
+
+
+class Comparison(NamedTuple):
+    """A result compared with the same measurement in a baseline."""
+
+    key: str
+    baseline: float
+    """The steps per second of the baseline."""
+    current: float
+    """The steps per second now."""
+
+    @property
+    def ratio(self) -> float:
+        """How many times faster than the baseline (less than 1 if slower)."""
+        return self.current / self.baseline if self.baseline > 0 else float("inf")
+
+    def regressed(self, tolerance: float) -> bool:
+        """Whether it is more than ``tolerance`` (a fraction) slower than the baseline."""
+        return self.ratio < 1 - tolerance
+
+
+def compare(results: Iterable[Result], baseline: Iterable[Result]) -> list[Comparison]:
+    """Compare the results with the baseline. Results which are not in the baseline are
+    left out."""
+    previous = {result.key: result for result in baseline}
+    return [
+        Comparison(
+            result.key,
+            previous[result.key].steps_per_second,
+            result.steps_per_second,
+        )
+        for result in results
+        if result.key in previous
+    ]
+
+
+def table(
+    results: Iterable[Result], comparisons: Optional[Iterable[Comparison]] = None
+) -> str:
+    """Format the results as a table, with the speedups over the baseline if given."""
+    ratios = {c.key: c.ratio for c in comparisons} if comparisons is not None else {}
+    lines = [
+        f"{'workload':<12} {'engine':<10} {'tape':<9} {'steps':>9} "
+        f"{'steps/s':>12} {'peak KiB':>10}" + ("  vs baseline" if ratios else "")
+    ]
+    for result in results:
+        line = (
+            f"{result.workload:<12} {result.engine:<10} {result.tape_type:<9} "
+            f"{result.steps:>9} {result.steps_per_second:>12,.0f} "
+            f"{result.peak_memory / 1024:>10,.0f}"
+        )
+        if result.key in ratios:
+            line += f"  {ratios[result.key]:>10.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,192 @@
+"""Bit-sliced interpreter which runs a program on many tapes at once, without NumPy.
+
+The tapes are stored transposed: cell ``i`` of the tape is a single Python int whose bit
+``L`` is cell ``i`` of lane (tape) ``L``. Lanes which are at the same command with their
+tape head at the same cell form a *group*, with a bit mask of its lanes, so that ``*``
+on a group is a single xor and ``>`` or ``<`` just move the group's tape head. At a
+bracket, the group splits into the lanes whose current bit is set and those where it is
+not. Groups which end up at the same command and cell are merged again, since from then
+on they behave identically. Python ints have no fixed width, so any number of lanes can
+run together.
+"""
+
+from typing import NamedTuple, Sequence
+
+from .command import Command
+from .program import Program, _ProgramInitType
+from .tape import Tape, _TapeInitType
+
+
+class LanesResult(NamedTuple):
+    """The result of :func:`run_lanes`. Each field has one entry per lane."""
+
+    tapes: list[Tape]
+    """The final tapes, with the tape head at its final position."""
+    steps: list[int]
+    """The number of steps each lane has run for."""
+    finished: list[bool]
+    """Whether each lane has run to the end of the program (rather than out of steps)."""
+
+
+def _lanes(mask: int) -> list[int]:
+    """Return the indices of the set bits of the mask."""
+    lanes = []
+    while mask:
+        low = mask & -mask
+        lanes.append(low.bit_length() - 1)
+        mask ^= low
+    return lanes
+
+
+def _slice(
+    program: Program,
+    cells: list[int],
+    heads: dict[int, int],
+    lanes: int,
+    max_steps: int,
+) -> tuple[list[int], list[int], list[bool]]:
+    """Run the program in place on the transposed tape ``cells``. ``heads`` maps each
+    initial tape head position to the mask of the lanes which start there. Return the
+    final steps, tape heads and finished flags of each lane."""
+    commands = program.program
+    jumps = program._jumps
+    length = len(commands)
+    size = len(cells)
+
+    final_steps = [max_steps] * lanes
+    final_heads = [0] * lanes
+    finished = [False] * lanes
+
+    step = program.steps
+    groups: dict[tuple[int, int], int] = {}
+    for head, mask in heads.items():
+        groups[program.pointer, head] = mask
+    if length == 0:
+        # Nothing to run. Every lane is done straight away.
+        for head, mask in heads.items():
+            for lane in _lanes(mask):
+                final_steps[lane], final_heads[lane] = step, head
+                finished[lane] = True
+        groups = {}
+
+    while groups and step < max_steps:
+        step += 1
+        next_groups: dict[tuple[int, int], int] = {}
+        for (pc, head), mask in groups.items():
+            command = commands[pc]
+            if command == Command.TOGGLE:
+                cells[head] ^= mask
+                moved = [(pc + 1, head, mask)]
+            elif command == Command.TAPE_RIGHT:
+                moved = [(pc + 1, (head + 1) % size, mask)]
+            elif command == Command.TAPE_LEFT:
+                moved = [(pc + 1, (head - 1) % size, mask)]
+            else:
+                # Lanes whose bit is set continue, the others jump to the matching bracket
+                ones = cells[head] & mask
+                zeros = mask ^ ones
+                moved = []
+                if ones:
+                    moved.append((pc + 1, head, ones))
+                if zeros:
+                    moved.append((jumps[pc] + 1, head, zeros))
+
+            for next_pc, next_head, next_mask in moved:
+                if next_pc == length:
+                    for lane in _lanes(next_mask):
+                        final_steps[lane], final_heads[lane] = step, next_head
+                        finished[lane] = True
+                else:
+                    key = (next_pc, next_head)
+                    next_groups[key] = next_groups.get(key, 0) | next_mask
+        groups = next_groups
+
+    # Lanes which ran out of steps
+    for (_pc, head), mask in groups.items():
+        for lane in _lanes(mask):
+            final_steps[lane], final_heads[lane] = step, head
+
+    return final_steps, final_heads, finished
+
+
+def _run_sliced(
+    program: Program,
+    cells: list[int],
+    heads: dict[int, int],
+    lanes: int,
+    max_steps: int,
+) -> LanesResult:
+    """Run the program on the transposed tape ``cells`` (see :func:`_slice`)."""
+    final_steps, final_heads, finished = _slice(program, cells, heads, lanes, max_steps)
+    tapes = []
+    for lane in range(lanes):
+        bits = [(cell >> lane) & 1 for cell in cells]
+        tapes.append(Tape(bits, pointer=final_heads[lane]))
+    return LanesResult(tapes, final_steps, finished)
+
+
+def run_lanes(
+    program: _ProgramInitType,
+    tapes: Sequence[_TapeInitType],
+    max_steps: int = 1000,
+) -> LanesResult:
+    """Run the program on each of the tapes, with the same result as calling
+    :func:`rbf_lang.run` on each of them. All the tapes must have the same size.
+
+    >>> result = run_lanes("(>*<)", ["00", "10", "11"])
+    >>> [str(tape) for tape in result.tapes]
+    ['00', '11', '10']
+    >>> result.steps
+    [1, 5, 5]
+    """
+    program = Program(program)
+    rows = [tape if isinstance(tape, Tape) else Tape(tape) for tape in tapes]
+    if len({len(row) for row in rows}) > 1:
+        raise ValueError("All tapes must have the same size.")
+    size = len(rows[0]) if rows else 0
+
+    cells = [0] * size
+    heads: dict[int, int] = {}
+    for lane, row in enumerate(rows):
+        for i, bit in enumerate(row._cells()):
+            if bit:
+                cells[i] |= 1 << lane
+        heads[row.pointer] = heads.get(row.pointer, 0) | (1 << lane)
+
+    return _run_sliced(program, cells, heads, len(rows), max_steps)
+
+
+def _exhaustive_cells(size: int) -> list[int]:
+    """Return the transposed tape of all the tapes of the given size, where lane ``L``
+    is the tape ``format(L, f"0{size}b")``."""
+    lanes = 1 << size
+    cells = []
+    for i in range(size):
+        # Lanes where cell i is set come in runs of `period` every `2 * period` lanes
+        period = 1 << (size - 1 - i)
+        pattern = ((1 << period) - 1) << period
+        width = 2 * period
+        while width < lanes:
+            pattern |= pattern << width
+            width *= 2
+        cells.append(pattern)
+    return cells
+
+
+def run_exhaustive(
+    program: _ProgramInitType,
+    size: int,
+    max_steps: int = 1000,
+) -> LanesResult:
+    """Run the program on every possible tape of the given size, all at once. Lane ``L``
+    starts with the tape ``format(L, f"0{size}b")``, i.e. cell 0 is the most significant
+    bit of the lane number.
+
+    >>> result = run_exhaustive("(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)", 3)
+    >>> [str(tape) for tape in result.tapes]
+    ['000', '001', '011', '101', '010', '100', '110', '111']
+    """
+    program = Program(program)
+    lanes = 1 << size
+    cells = _exhaustive_cells(size)
+    return _run_sliced(program, cells, {0: (1 << lanes) - 1}, lanes, max_steps)
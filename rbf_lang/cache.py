@@ -0,0 +1,235 @@
+"""Cache the results of :func:`rbf_lang.run`, in memory and optionally on disk.
+
+Results are keyed by a stable content hash of the program and the tape (see
+:func:`content_hash`), which is the same across processes and restarts, unlike
+:func:`hash`. The in-memory store is a bounded LRU, and the on-disk store is an sqlite
+database, so that results survive restarts and can be shared between processes.
+
+Each result also remembers the ``max_steps`` it was run with. A result which finished is
+valid for any ``max_steps`` at least as large as its step count. A result which ran out
+of steps is only valid for the same ``max_steps``, but a later call with a larger budget
+carries on from it rather than starting over.
+
+>>> cache = RunCache()
+>>> program, tape = cache.run("(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)", "100")
+>>> program, tape = cache.run("(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)", "100")
+>>> str(tape), cache.stats
+('010', CacheStats(hits=1, misses=1, size=1))
+"""
+
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Union
+
+from .program import Program, _ProgramInitType
+from .runner import ENGINES, run
+from .tape import PackedTape, Tape, _TapeInitType
+
+
+class CacheStats(NamedTuple):
+    """Statistics of a :class:`RunCache`."""
+
+    hits: int
+    """The number of runs answered from the cache."""
+    misses: int
+    """The number of runs which had to run (at least partly)."""
+    size: int
+    """The number of results in the in-memory store."""
+
+
+class _Entry(NamedTuple):
+    """A cached result, with the tape cells packed as in :meth:`PackedTape.to_bytes`."""
+
+    max_steps: int
+    pointer: int
+    steps: int
+    finished: bool
+    tape_pointer: int
+    cells: bytes
+
+    def usable(self, max_steps: int) -> bool:
+        """Whether the entry is the result of a run with ``max_steps``."""
+        if self.finished:
+            return self.steps <= max_steps
+        return self.max_steps == max_steps
+
+
+def _packed(tape: Tape) -> bytes:
+    return (
+        tape.to_bytes() if isinstance(tape, PackedTape) else PackedTape(tape).to_bytes()
+    )
+
+
+def content_hash(program: _ProgramInitType, tape: _TapeInitType) -> str:
+    """Return a stable hash of the state of a program and a tape, i.e. of everything
+    which the result of :func:`rbf_lang.run` depends on, apart from ``max_steps``.
+
+    >>> content_hash("*>", "10") == content_hash("*>", [True, False])
+    True
+    >>> content_hash("*>", "10") == content_hash("*>", "01")
+    False
+    """
+    program = program if isinstance(program, Program) else Program(program)
+    tape = tape if isinstance(tape, Tape) else Tape(tape)
+    digest = hashlib.blake2b(digest_size=16)
+    header = f"{program}|{program.pointer}|{program.steps}|{program.finished}|"
+    header += f"{len(tape)}|{tape.pointer}|"
+    digest.update(header.encode())
+    digest.update(_packed(tape))
+    return digest.hexdigest()
+
+
+class RunCache:
+    """A cache of the results of :func:`rbf_lang.run`. Keeps up to ``maxsize`` results in
+    memory, and all of them in the sqlite database at ``path``, if given."""
+
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        path: Optional[Union[str, "os.PathLike[str]"]] = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, _Entry] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, max_steps INTEGER, pointer INTEGER, "
+                    "steps INTEGER, finished INTEGER, tape_pointer INTEGER, cells BLOB)"
+                )
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, len(self._memory))
+
+    def _get(self, key: str) -> Optional[_Entry]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT max_steps, pointer, steps, finished, tape_pointer, cells "
+                "FROM results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                max_steps, pointer, steps, finished, tape_pointer, cells = row
+                entry = _Entry(
+                    max_steps, pointer, steps, bool(finished), tape_pointer, cells
+                )
+                self._remember(key, entry)
+                return entry
+        return None
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _put(self, key: str, entry: _Entry) -> None:
+        self._remember(key, entry)
+        if self._db is not None:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        entry.max_steps,
+                        entry.pointer,
+                        entry.steps,
+                        int(entry.finished),
+                        entry.tape_pointer,
+                        entry.cells,
+                    ),
+                )
+
+    def run(
+        self,
+        program: _ProgramInitType,
+        tape: _TapeInitType,
+        max_steps: int = 1000,
+        engine: str = "reference",
+    ) -> tuple[Program, Tape]:
+        """Run the program like :func:`rbf_lang.run`, or look up the result if the same
+        program has already run on the same tape. With the ``"fast"`` engine, which can
+        overshoot ``max_steps``, only results which finished are cached. Tapes which are
+        not circular are not supported, since the results are stored with the length of
+        the initial tape."""
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine!r}. Expected one of {ENGINES}.")
+        program = Program(program)
+        tape = tape.copy() if isinstance(tape, Tape) else Tape(tape)
+        if not tape.circular:
+            raise ValueError("Tapes which are not circular cannot be cached.")
+        key = content_hash(program, tape)
+
+        entry = self._get(key)
+        if entry is not None and entry.usable(max_steps):
+            self.hits += 1
+            return self._restore(program, tape, entry)
+
+        self.misses += 1
+        if entry is not None and not entry.finished and entry.max_steps < max_steps:
+            # Carry on from where the cached run ran out of steps
+            program, tape = self._restore(program, tape, entry)
+        program, tape = run(program, tape, max_steps, engine=engine)
+
+        # A finished result is never replaced, since it is valid for more budgets.
+        keep = entry is not None and entry.finished
+        if not keep and (program.finished or engine != "fast"):
+            self._put(
+                key,
+                _Entry(
+                    max_steps,
+                    program.pointer,
+                    program.steps,
+                    program.finished,
+                    tape.pointer,
+                    _packed(tape),
+                ),
+            )
+        return program, tape
+
+    @staticmethod
+    def _restore(program: Program, tape: Tape, entry: _Entry) -> tuple[Program, Tape]:
+        result = program.copy()
+        result._set_state(entry.pointer, entry.steps, entry.finished)
+        final_tape = tape.copy()
+        final_tape._load_cells(PackedTape.from_bytes(entry.cells, len(tape))._cells())
+        final_tape._move_to(entry.tape_pointer)
+        return result, final_tape
+
+    def clear(self) -> None:
+        """Remove all the results, from memory and from disk, and reset the statistics."""
+        self._memory.clear()
+        self.hits = 0
+        self.misses = 0
+        if self._db is not None:
+            with self._db:
+                self._db.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        """Close the on-disk store, if any."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self) -> "RunCache":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
@@ -1,6 +1,11 @@
 import logging
 import argparse
-from . import run, Program, Tape
+import sys
+from typing import Iterable, Iterator, Union
+from . import run, run_many, Program, Tape
+from .hooks import Hooks
+from .runner import ENGINES
+from .tape import TAPE_TYPES
 
 
 def main() -> None:
@@ -19,23 +24,186 @@ def main() -> None:
 
     run_parsr = subparsers.add_parser("run", help="Run a source code")
 
-    run_parsr.add_argument("source", help="The source code to run")
-    run_parsr.add_argument(
+    source_group = run_parsr.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("source", nargs="?", help="The source code to run")
+    source_group.add_argument(
+        "-f",
+        "--file",
+        help="Read the source code from a file instead. Comments and whitespace are "
+        "stripped as the file is read, so that it can be very large",
+    )
+    tape_group = run_parsr.add_mutually_exclusive_group()
+    tape_group.add_argument(
         "-t",
         "--tape",
-        help="The initial tape to use. Can be a string of 1s and 0s, or an integer to use as the tape size",
+        help="The initial tape to use. Can be a string of 1s and 0s, or an integer to use as the tape size. "
+        "Prefix it with a tape type and a colon, e.g. sparse:1000000 or growable:1, "
+        f"to choose the kind of tape ({', '.join(TAPE_TYPES)})",
         default="8",
     )
+    tape_group.add_argument(
+        "--stdin",
+        action="store_true",
+        help="Read initial tapes from stdin, one per line, and print one result per line",
+    )
     run_parsr.add_argument(
         "--max-steps",
         type=int,
         help="The maximum number of steps to run",
         default=10_000,
     )
+    engine_group = run_parsr.add_mutually_exclusive_group()
+    engine_group.add_argument(
+        "--engine",
+        choices=ENGINES,
+        help="The execution engine to use",
+        default="reference",
+    )
+    engine_group.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Run the peephole-optimized program. Same as --engine optimized",
+    )
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Run a source code on many tapes in parallel"
+    )
+
+    batch_parser.add_argument("source", help="The source code to run")
+    batch_parser.add_argument(
+        "--tapes",
+        help="File with one initial tape per line (see run --tape). Use - for stdin",
+        required=True,
+    )
+    batch_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="The number of worker processes. Defaults to the number of CPUs",
+        default=None,
+    )
+    batch_parser.add_argument(
+        "--max-steps",
+        type=int,
+        help="The maximum number of steps to run",
+        default=10_000,
+    )
+    batch_parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        help="The execution engine to use",
+        default="reference",
+    )
+
+    profile_parser = subparsers.add_parser(
+        "profile", help="Run a source code and show where its steps go"
+    )
+
+    profile_parser.add_argument("source", help="The source code to profile")
+    profile_parser.add_argument(
+        "-t",
+        "--tape",
+        help="The initial tape to use (see run --tape)",
+        default="8",
+    )
+    profile_parser.add_argument(
+        "--max-steps",
+        type=int,
+        help="The maximum number of steps to run",
+        default=10_000,
+    )
+    profile_parser.add_argument(
+        "--json",
+        help="Also write the profile to this file as JSON",
+        default=None,
+    )
+
+    debug_parser = subparsers.add_parser(
+        "debug", help="Step through a source code, forwards and backwards"
+    )
+
+    debug_parser.add_argument("source", help="The source code to debug")
+    debug_parser.add_argument(
+        "-t",
+        "--tape",
+        help="The initial tape to use (see run --tape)",
+        default="8",
+    )
+    debug_parser.add_argument(
+        "--max-steps",
+        type=int,
+        help="The maximum number of steps to run. Unlimited by default",
+        default=None,
+    )
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="Benchmark the engines and tape types on generated workloads"
+    )
+    bench_parser.add_argument(
+        "--workload",
+        action="append",
+        help="Only run this workload. Can be given more than once. All by default",
+    )
+    bench_parser.add_argument(
+        "--engine",
+        action="append",
+        choices=ENGINES,
+        help="Only use this engine. Can be given more than once. All by default",
+    )
+    bench_parser.add_argument(
+        "--tape-type",
+        action="append",
+        choices=TAPE_TYPES,
+        help="Only use this tape type. Can be given more than once. All by default",
+    )
+    bench_parser.add_argument(
+        "--repeat",
+        type=int,
+        help="The number of timed runs of each benchmark. The fastest one counts",
+        default=3,
+    )
+    bench_parser.add_argument(
+        "--scale",
+        type=float,
+        help="Scale the size of the workloads by this factor",
+        default=1.0,
+    )
+    bench_parser.add_argument(
+        "--json",
+        help="Write the results to this file as JSON",
+        default=None,
+    )
+    bench_parser.add_argument(
+        "--baseline",
+        help="Compare the results with the ones saved in this file (see --json), and "
+        "exit with status 1 if any of them got slower",
+        default=None,
+    )
+    bench_parser.add_argument(
+        "--tolerance",
+        type=float,
+        help="How much slower than the baseline a result can be before it counts as "
+        "slower, as a fraction",
+        default=0.1,
+    )
 
     reverse_parser = subparsers.add_parser("reverse", help="Reverse a source code")
 
-    reverse_parser.add_argument("source", help="The source code to reverse")
+    reverse_source_group = reverse_parser.add_mutually_exclusive_group(required=True)
+    reverse_source_group.add_argument(
+        "source", nargs="?", help="The source code to reverse"
+    )
+    reverse_source_group.add_argument(
+        "-f",
+        "--file",
+        help="Reverse the source code in a file instead. The file is read backwards in "
+        "chunks, so that it can be larger than the memory",
+    )
+    reverse_parser.add_argument(
+        "-o",
+        "--output",
+        help="Write the reversed source code to a file instead of printing it",
+    )
 
     args = parser.parse_args()
 
@@ -48,41 +216,191 @@ def main() -> None:
 
     if args.subcommand == "run":
         run_main(args, logger)
+    elif args.subcommand == "batch":
+        batch_main(args, logger)
+    elif args.subcommand == "profile":
+        profile_main(args, logger)
+    elif args.subcommand == "debug":
+        debug_main(args, logger)
+    elif args.subcommand == "bench":
+        bench_main(args, logger)
     elif args.subcommand == "reverse":
         reverse_main(args, logger)
     else:
         raise ValueError(f"Unknown subcommand: {args.subcommand}")
 
 
-def run_main(args: argparse.Namespace, logger: logging.Logger) -> None:
+def parse_tape(tape: str, logger: logging.Logger) -> Union[str, int, Tape]:
+    # Check for a tape type prefix, e.g. sparse:1000
+    if ":" in tape:
+        tape_type, tape = tape.split(":", 1)
+        if tape_type not in TAPE_TYPES:
+            raise ValueError(
+                f"Unknown tape type: {tape_type!r}. Expected one of {tuple(TAPE_TYPES)}."
+            )
+        logger.debug(f"Using a {tape_type} tape")
+        value = parse_tape(tape, logger)
+        return TAPE_TYPES[tape_type](value)
+
     # Check if tape is a string containing only 1s and 0s
-    if all(x in "01" for x in args.tape):
+    if all(x in "01" for x in tape):
         logger.debug("Using --tape as a string")
-        tape = args.tape
+        return tape
     else:
         logger.debug("Using --tape as an integer")
-        tape = int(args.tape)
+        return int(tape)
+
+
+def read_tapes(
+    lines: Iterable[str], logger: logging.Logger
+) -> Iterator[Union[str, int, Tape]]:
+    """Parse one tape per line, skipping blank lines."""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield parse_tape(line, logger)
 
-    def callback(program: Program, tape: Tape) -> bool:
+
+def run_main(args: argparse.Namespace, logger: logging.Logger) -> None:
+    # Parse and validate the program once, even if it runs on many tapes.
+    if args.file is not None:
+        program = Program.from_file(args.file)
+        logger.debug(f"Loaded {len(program)} commands from {args.file}")
+    else:
+        program = Program(args.source)
+
+    if args.stdin:
+        initial_tapes = read_tapes(sys.stdin, logger)
+    else:
+        initial_tapes = iter([parse_tape(args.tape, logger)])
+
+    if args.optimize:
+        args.engine = "optimized"
+
+    def trace(program: Program, tape: Tape) -> bool:
         logger.debug(
             f" {program.steps} {program.command.value} {program.pointer:02d} | {tape.pointer:02d} {tape}"
         )
         return False
 
-    _program, tape = run(
+    # Only trace the steps when they would be logged. Tracing also needs the reference
+    # engine, since the others do not run hooks.
+    hooks = Hooks()
+    if logger.isEnabledFor(logging.DEBUG) and args.engine == "reference":
+        hooks.every(1, trace)
+
+    for initial_tape in initial_tapes:
+        _program, tape = run(
+            program,
+            initial_tape,
+            max_steps=args.max_steps,
+            engine=args.engine,
+            hooks=hooks,
+        )
+
+        # With --stdin, another process may wait for each result before it sends the
+        # next tape, so the result must not stay in the buffer of a pipe
+        print(tape, flush=args.stdin)
+
+
+def batch_main(args: argparse.Namespace, logger: logging.Logger) -> None:
+    def read_file() -> Iterator[Union[str, int, Tape]]:
+        file = sys.stdin if args.tapes == "-" else open(args.tapes)
+        with file:
+            yield from read_tapes(file, logger)
+
+    results = run_many(
         args.source,
-        tape,
+        read_file(),
         max_steps=args.max_steps,
-        callback=callback,
+        workers=args.jobs,
+        engine=args.engine,
+    )
+    for _program, tape in results:
+        print(tape)
+
+
+def profile_main(args: argparse.Namespace, logger: logging.Logger) -> None:
+    import json
+    from .profiler import profile
+
+    result = profile(
+        args.source, parse_tape(args.tape, logger), max_steps=args.max_steps
+    )
+    print(result.listing())
+    print(result.tape)
+
+    if args.json is not None:
+        with open(args.json, "w") as file:
+            json.dump(result.to_dict(), file, indent=2)
+        logger.debug(f"Wrote the profile to {args.json}")
+
+
+def debug_main(args: argparse.Namespace, logger: logging.Logger) -> None:
+    from .debugger import Debugger
+
+    debugger = Debugger(
+        args.source, parse_tape(args.tape, logger), max_steps=args.max_steps
     )
+    debugger.show()
+    debugger.cmdloop()
 
-    print(tape)
+
+def bench_main(args: argparse.Namespace, logger: logging.Logger) -> None:
+    from . import bench
+
+    workloads = bench.workloads(args.scale)
+    if args.workload is not None:
+        names = [workload.name for workload in workloads]
+        unknown = set(args.workload) - set(names)
+        if unknown:
+            raise ValueError(
+                f"Unknown workload: {', '.join(sorted(unknown))}. Expected one of {names}."
+            )
+        workloads = [w for w in workloads if w.name in args.workload]
+
+    results = bench.benchmark(
+        workloads,
+        engines=args.engine or ENGINES,
+        tape_types=args.tape_type or TAPE_TYPES,
+        repeat=args.repeat,
+    )
+
+    comparisons = None
+    if args.baseline is not None:
+        comparisons = bench.compare(results, bench.load_results(args.baseline))
+    print(bench.table(results, comparisons))
+
+    if args.json is not None:
+        bench.save_results(results, args.json)
+        logger.debug(f"Wrote the results to {args.json}")
+
+    if comparisons is not None:
+        slower = [c for c in comparisons if c.regressed(args.tolerance)]
+        for comparison in slower:
+            print(
+                f"Slower than the baseline: {comparison.key} ({comparison.ratio:.2f}x)"
+            )
+        if slower:
+            sys.exit(1)
 
 
 def reverse_main(args: argparse.Namespace, logger: logging.Logger) -> None:
-    from .reverse import reverse_program
+    from .reverse import reverse_file, reverse_program
 
-    print(reverse_program(args.source))
+    if args.file is not None:
+        if args.output is not None:
+            reverse_file(args.file, args.output)
+        else:
+            sys.stdout.flush()
+            reverse_file(args.file, sys.stdout.buffer)
+            sys.stdout.buffer.write(b"\n")
+            sys.stdout.flush()
+    elif args.output is not None:
+        with open(args.output, "w") as file:
+            file.write(reverse_program(args.source))
+    else:
+        print(reverse_program(args.source))
 
 
 if __name__ == "__main__":
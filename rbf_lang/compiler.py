@@ -0,0 +1,202 @@
+"""Compile an RBF program into a specialised Python function.
+
+The generated code mirrors the nesting of the program: every ``(...)`` becomes an
+``if``/``while`` pair, the tape head and step counter are plain local integers and the
+tape is a ``bytearray``. Each straight-line run of commands, together with the bracket
+which ends it, is a *block* which is charged to the step counter in one go. If a block
+does not fit in the remaining step budget, the generated code stops at the start of that
+block and the reference interpreter in :mod:`rbf_lang.runner` executes the last few steps
+one by one, so ``steps`` and ``max_steps`` behave exactly as they do there.
+"""
+
+from typing import Callable
+
+from .command import Command
+from .program import Program
+from .tape import Tape
+
+_CompiledFunction = Callable[[bytearray, int, int, int, int], tuple[int, int]]
+
+_MAX_NESTING = 16
+"""Loops nested deeper than this are split off into their own functions. CPython does not
+allow more than 20 statically nested loops in a single function."""
+
+_INDENT = "    "
+
+
+class _OutOfSteps(Exception):
+    """Raised by the generated code when the next block does not fit in the step budget."""
+
+    def __init__(self, pointer: int, tape_pointer: int, steps: int) -> None:
+        self.pointer = pointer
+        self.tape_pointer = tape_pointer
+        self.steps = steps
+
+
+# A loop is a (start, end, inner loops) tuple, where start and end are the indices of
+# its brackets.
+_Loop = tuple[int, int, list]
+
+
+def _parse(program: Program) -> list[_Loop]:
+    """Return the top-level loops of the program, each with its own nested loops."""
+    stack: list[tuple[int, list[_Loop]]] = [(-1, [])]
+    for index, command in enumerate(program):
+        if command == Command.LOOP_START:
+            stack.append((index, []))
+        elif command == Command.LOOP_END:
+            start, inner = stack.pop()
+            stack[-1][1].append((start, index, inner))
+    return stack[0][1]
+
+
+def _move(offset: int) -> str:
+    sign = "+" if offset > 0 else "-"
+    return f"p = (p {sign} {abs(offset)}) % n"
+
+
+def _straight_line(program: Program, start: int, stop: int) -> list[str]:
+    """Generate the statements for a straight-line run of commands. Consecutive moves and
+    toggles are merged since the whole run is charged to the step counter at once."""
+    lines = []
+    move = 0
+    toggle = False
+    for index in range(start, stop):
+        command = program[index]
+        if command == Command.TOGGLE:
+            if move:
+                lines.append(_move(move))
+                move = 0
+            toggle = not toggle
+        else:
+            if toggle:
+                lines.append("t[p] ^= 1")
+                toggle = False
+            move += 1 if command == Command.TAPE_RIGHT else -1
+    if toggle:
+        lines.append("t[p] ^= 1")
+    if move:
+        lines.append(_move(move))
+    return lines
+
+
+class _CodeGenerator:
+    def __init__(self, program: Program) -> None:
+        self.program = program
+        self.functions: list[list[str]] = []
+
+    def block(self, start: int, stop: int, weight: int, level: int) -> list[str]:
+        """Budget check and step accounting for a block starting at ``start``."""
+        indent = _INDENT * level
+        lines = [
+            f"if steps > max_steps - {weight}:",
+            f"{_INDENT}raise _OutOfSteps({start}, p, steps)",
+            f"steps += {weight}",
+        ]
+        lines += _straight_line(self.program, start, stop)
+        return [indent + line for line in lines]
+
+    def body(
+        self, begin: int, end: int, loops: list[_Loop], level: int, depth: int
+    ) -> list[str]:
+        """Generate the code for the commands between ``begin`` and ``end``, which is
+        either the index of the closing bracket of the enclosing loop, or the length of
+        the program at the top level."""
+        lines: list[str] = []
+        indent = _INDENT * level
+        cursor = begin  # Start of the straight-line run which has not been emitted yet
+        for start, stop, inner in loops:
+            lines += self.block(cursor, start, start - cursor + 1, level)
+            lines.append(f"{indent}if t[p]:")
+            if depth + 1 < _MAX_NESTING:
+                lines += self.loop(start, stop, inner, level + 1, depth + 1)
+            else:
+                name = self.function(start, stop, inner)
+                lines.append(
+                    f"{indent}{_INDENT}p, steps = {name}(t, n, p, steps, max_steps)"
+                )
+            cursor = stop + 1
+
+        if end == len(self.program):
+            # Top level: the final straight-line run is terminated by the end of program
+            if cursor < end:
+                lines += self.block(cursor, end, end - cursor, level)
+        else:
+            # Loop body: the final run is terminated by the closing bracket
+            lines += self.block(cursor, end, end - cursor + 1, level)
+            lines.append(f"{indent}if t[p]:")
+            lines.append(f"{indent}{_INDENT}break")
+        return lines
+
+    def loop(
+        self, start: int, stop: int, inner: list, level: int, depth: int
+    ) -> list[str]:
+        lines = [f"{_INDENT * level}while True:"]
+        lines += self.body(start + 1, stop, inner, level + 1, depth)
+        return lines
+
+    def function(self, start: int, stop: int, inner: list) -> str:
+        """Emit a loop as a separate function, to reset the nesting depth."""
+        name = f"_loop_{start}"
+        lines = [f"def {name}(t, n, p, steps, max_steps):"]
+        lines += self.loop(start, stop, inner, 1, 0)
+        lines.append(f"{_INDENT}return p, steps")
+        self.functions.append(lines)
+        return name
+
+    def generate(self) -> str:
+        main = ["def _run(t, n, p, steps, max_steps):"]
+        main += self.body(0, len(self.program), _parse(self.program), 1, 0)
+        main.append(f"{_INDENT}return p, steps")
+        functions = self.functions + [main]
+        return "\n\n".join("\n".join(lines) for lines in functions) + "\n"
+
+
+def generate_source(program: Program) -> str:
+    """Generate the Python source code of the compiled program. The source defines a
+    function ``_run(t, n, p, steps, max_steps)`` which runs the program on the tape
+    ``t`` of length ``n``, starting with the tape head at ``p``, and returns the final
+    tape head position and step count."""
+    return _CodeGenerator(program).generate()
+
+
+def _compile(program: Program) -> _CompiledFunction:
+    namespace: dict = {"_OutOfSteps": _OutOfSteps}
+    # Name the code after the start of the program, without building its whole source
+    name = program.code.opcodes[:32].decode("ascii")
+    code = compile(generate_source(program), f"<rbf {name!r}>", "exec")
+    exec(code, namespace)
+    return namespace["_run"]  # type: ignore[no-any-return]
+
+
+def compile_program(program: Program) -> _CompiledFunction:
+    """Compile the program into a Python function (see :func:`generate_source`).
+    Compiled functions are kept with the program's :class:`rbf_lang.program.Code`, so
+    compiling the same program again is cheap."""
+    function: _CompiledFunction = program.code._compiled(
+        "compiled", lambda: _compile(program)
+    )
+    return function
+
+
+def run_compiled(program: Program, tape: Tape, max_steps: int) -> bool:
+    """Run the program in place with the compiled engine. Return True if the program
+    has finished, or False if the step budget ran out before the end of a block, in which
+    case the program pointer is left at the start of that block."""
+    function = compile_program(program)
+    data = tape._cells()
+    try:
+        tape_pointer, steps = function(
+            data, len(data), tape.pointer, program.steps, max_steps
+        )
+        # Past the last command
+        pointer = len(program)
+        finished = True
+    except _OutOfSteps as e:
+        pointer, tape_pointer, steps = e.pointer, e.tape_pointer, e.steps
+        finished = False
+
+    program._set_state(pointer, steps, finished)
+    tape._load_cells(data)
+    tape._move_to(tape_pointer)
+    return finished
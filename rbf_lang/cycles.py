@@ -0,0 +1,119 @@
+"""Cycle detection for :func:`rbf_lang.run`.
+
+Every RBF command is reversible, so each state of a run (program pointer, tape pointer
+and tape) has at most one predecessor. A run which repeats a state must therefore come
+back to the state it *started* in, and there is no need for Brent's or Floyd's algorithm
+to find where the cycle begins: it is enough to compare each state with the start state.
+A run starting at the first command can never cycle at all, since nothing jumps back to
+the first command.
+
+The states are compared by a Zobrist hash, which is updated in constant time with each
+step: the xor of a random key for each set cell, for the tape pointer, and for the
+program pointer. Only when the hash matches is the state compared cell by cell.
+"""
+
+import random
+from typing import NamedTuple, Optional
+
+from .command import Command
+from .program import Program
+from .tape import Tape
+
+
+class Cycle(NamedTuple):
+    """A cycle found by :func:`run_detecting_cycles`."""
+
+    start: int
+    """The step at which the cycle was entered."""
+    period: int
+    """The number of steps of one round of the cycle."""
+
+    def __str__(self) -> str:
+        return f"cycle of period {self.period} entered at step {self.start}"
+
+
+def _keys(rng: random.Random, n: int) -> list[int]:
+    return [rng.getrandbits(64) for _ in range(n)]
+
+
+def run_detecting_cycles(
+    program: Program,
+    tape: Tape,
+    max_steps: int,
+) -> Optional[Cycle]:
+    """Run the program in place until it finishes, runs out of steps, or comes back to its
+    start state. Return the cycle in the last case, with the program and tape back in the
+    start state (after one round of the cycle), or else None.
+
+    >>> program, tape = Program("(>)", pointer=1), Tape("000")
+    >>> run_detecting_cycles(program, tape, 1000)
+    Cycle(start=0, period=6)
+    >>> program.steps
+    6
+    """
+    commands = program._opcodes
+    jumps = program._jumps
+    length = len(commands)
+    if length == 0:
+        return None
+
+    data = tape._cells()
+    n = len(data)
+    rng = random.Random(0)
+    cell_keys = _keys(rng, n)
+    head_keys = _keys(rng, n)
+    pc_keys = _keys(rng, length)
+
+    pc, p, steps = program.pointer, tape.pointer, program.steps
+    start_pc, start_p, start_steps = pc, p, steps
+    initial = bytes(data)
+    start_hash = head_keys[p] ^ pc_keys[pc]
+    for i, bit in enumerate(data):
+        if bit:
+            start_hash ^= cell_keys[i]
+    h = start_hash
+
+    # The opcodes of the commands
+    TOGGLE, TAPE_RIGHT, TAPE_LEFT = (
+        ord(Command.TOGGLE.value),
+        ord(Command.TAPE_RIGHT.value),
+        ord(Command.TAPE_LEFT.value),
+    )
+    cycle = None
+    finished = False
+    while steps < max_steps:
+        command = commands[pc]
+        if command == TOGGLE:
+            data[p] ^= 1
+            h ^= cell_keys[p]
+            next_pc = pc + 1
+        elif command == TAPE_RIGHT:
+            h ^= head_keys[p]
+            p = (p + 1) % n
+            h ^= head_keys[p]
+            next_pc = pc + 1
+        elif command == TAPE_LEFT:
+            h ^= head_keys[p]
+            p = (p - 1) % n
+            h ^= head_keys[p]
+            next_pc = pc + 1
+        else:
+            # Both brackets continue if the current bit is set, and otherwise jump to
+            # just after their matching bracket.
+            next_pc = pc + 1 if data[p] else jumps[pc] + 1
+        steps += 1
+
+        if next_pc == length:
+            finished = True
+            break
+        h ^= pc_keys[pc] ^ pc_keys[next_pc]
+        pc = next_pc
+
+        if h == start_hash and pc == start_pc and p == start_p and data == initial:
+            cycle = Cycle(start_steps, steps - start_steps)
+            break
+
+    program._set_state(pc, steps, finished)
+    tape._load_cells(data)
+    tape._move_to(p)
+    return cycle
@@ -0,0 +1,244 @@
+"""Interactive debugger for RBF programs.
+
+Runs go forward with :func:`rbf_lang.run`, and stop at breakpoints through its hooks.
+Going backwards uses :meth:`rbf_lang.Program.step_back`, which undoes each step exactly
+from the current state. Nothing is recorded while running, so the debugger only ever
+holds one program and one tape, however long the run and however far back we go.
+
+Breakpoints can be set on the program pointer, on the position of the tape head, or on
+the value of a tape cell. Like with hooks, the run stops just *before* the step at which
+a breakpoint matches.
+"""
+
+import cmd
+import sys
+from typing import IO, NamedTuple, Optional
+
+from .hooks import Hooks
+from .program import Program, ProgramPointerError, _ProgramInitType
+from .runner import run, run_backward
+from .tape import Tape, _TapeInitType
+
+
+class Breakpoint(NamedTuple):
+    """A breakpoint of the :class:`Debugger`."""
+
+    kind: str
+    """``"pc"`` for the program pointer, ``"head"`` for the tape head, or ``"cell"`` for
+    the value of a tape cell."""
+    position: int
+    """The program pointer, tape head position, or tape cell to break at."""
+    value: bool = True
+    """The value of the tape cell to break at (only for ``"cell"`` breakpoints)."""
+
+    def matches(self, program: Program, tape: Tape) -> bool:
+        if self.kind == "pc":
+            return not program.finished and program.pointer == self.position
+        elif self.kind == "head":
+            return tape.pointer == self.position
+        else:
+            return 0 <= self.position < len(tape) and tape[self.position] == self.value
+
+    def __str__(self) -> str:
+        if self.kind == "cell":
+            return f"cell {self.position} {int(self.value)}"
+        return f"{self.kind} {self.position}"
+
+
+class Debugger(cmd.Cmd):
+    """Command loop of ``rbf debug``. Type ``help`` for the list of commands."""
+
+    prompt = "(rbf) "
+
+    program: Program
+    tape: Tape
+    max_steps: int
+    breakpoints: dict[int, Breakpoint]
+
+    def __init__(
+        self,
+        program: _ProgramInitType,
+        tape: _TapeInitType,
+        max_steps: Optional[int] = None,
+        stdin: Optional[IO[str]] = None,
+        stdout: Optional[IO[str]] = None,
+    ) -> None:
+        super().__init__(stdin=stdin, stdout=stdout)
+        if stdin is not None:
+            self.use_rawinput = False
+        self.program = Program(program)
+        self.tape = tape.copy() if isinstance(tape, Tape) else Tape(tape)
+        self.max_steps = sys.maxsize if max_steps is None else max_steps
+        self.breakpoints = {}
+        self._next_breakpoint = 1
+
+    def _print(self, message: str) -> None:
+        self.stdout.write(message + "\n")
+
+    def _count(self, arg: str) -> Optional[int]:
+        """Parse the optional step count argument of a command."""
+        try:
+            count = int(arg) if arg.strip() else 1
+        except ValueError:
+            count = -1
+        if count < 0:
+            self._print(f"Invalid count: {arg!r}")
+            return None
+        return count
+
+    def _hit(self) -> Optional[int]:
+        """Return the number of the first breakpoint which matches the current state."""
+        for number, point in self.breakpoints.items():
+            if point.matches(self.program, self.tape):
+                return number
+        return None
+
+    def show(self) -> None:
+        """Print the current state."""
+        program, tape = self.program, self.tape
+        if len(program) == 0:
+            location = "empty program"
+        elif program.finished:
+            location = "finished"
+        else:
+            location = f"{program.pointer:02d} {program.command.value}"
+        self._print(f"steps {program.steps} | {location} | {tape.pointer:02d} {tape}")
+
+    def _forward(self, max_steps: int, hooks: Optional[Hooks] = None) -> None:
+        # Without any breakpoints to check, we can use a faster engine, as long as it can
+        # run on the tape.
+        tape = self.tape
+        fast = not hooks and tape.circular and tape.dense
+        engine = "optimized" if fast else "reference"
+        self.program, self.tape = run(
+            self.program, self.tape, max_steps, engine=engine, hooks=hooks
+        )
+
+    def emptyline(self) -> bool:
+        # Unlike the default, an empty line does not repeat the last command.
+        return False
+
+    def default(self, line: str) -> None:
+        self._print(f"Unknown command: {line!r}. Type 'help' for the list of commands.")
+
+    def do_step(self, arg: str) -> None:
+        """step [N]: Run the next N steps (1 by default)."""
+        count = self._count(arg)
+        if count is None:
+            return
+        if not self.program.finished:
+            self._forward(min(self.program.steps + count, self.max_steps))
+        self.show()
+
+    def do_continue(self, arg: str) -> None:
+        """continue: Run until a breakpoint, the end of the program or the maximum number
+        of steps."""
+        # Always make one step first, so that we do not stop at the same breakpoint again
+        if self.program.finished or self.program.steps >= self.max_steps:
+            self.show()
+            return
+        self._forward(self.program.steps + 1)
+
+        hooks = Hooks()
+        for point in self.breakpoints.values():
+            if point.kind == "pc":
+                hooks.at(point.position, lambda program, tape: True)
+            else:
+                hooks.every(1, point.matches)
+        self._forward(self.max_steps, hooks)
+        self._report()
+
+    def do_rstep(self, arg: str) -> None:
+        """rstep [N]: Undo the last N steps (1 by default)."""
+        count = self._count(arg)
+        if count is None or not self._can_go_back():
+            return
+        self.program, self.tape = run_backward(self.program, self.tape, count)
+        self.show()
+
+    def do_rcontinue(self, arg: str) -> None:
+        """rcontinue: Go back until a breakpoint or the start of the run."""
+        if not self._can_go_back():
+            return
+        program, tape = self.program, self.tape
+        try:
+            program.step_back(tape)
+            while program.steps > 0 and self._hit() is None:
+                program.step_back(tape)
+        except ProgramPointerError:
+            # Already at the start of the run
+            pass
+        self._report()
+
+    def _can_go_back(self) -> bool:
+        if not self.tape.circular:
+            self._print("Cannot go back on a tape which is not circular")
+            return False
+        return True
+
+    def _report(self) -> None:
+        number = self._hit()
+        if number is not None and not self.program.finished:
+            self._print(f"Breakpoint {number}: {self.breakpoints[number]}")
+        elif self.program.steps >= self.max_steps and not self.program.finished:
+            self._print(f"Reached the maximum number of steps ({self.max_steps})")
+        self.show()
+
+    def do_break(self, arg: str) -> None:
+        """break PC | break head I | break cell I [0|1]: Break at a program pointer, when
+        the tape head is at cell I, or when tape cell I has the given value (1 by default).
+        Without arguments, list the breakpoints."""
+        args = arg.split()
+        if not args:
+            self.do_info("")
+            return
+        try:
+            if len(args) == 1:
+                point = Breakpoint("pc", int(args[0]))
+            elif args[0] == "head" and len(args) == 2:
+                point = Breakpoint("head", int(args[1]))
+            elif args[0] == "cell" and len(args) in (2, 3):
+                value = args[2] if len(args) == 3 else "1"
+                if value not in ("0", "1"):
+                    raise ValueError(value)
+                point = Breakpoint("cell", int(args[1]), value == "1")
+            else:
+                raise ValueError(arg)
+        except ValueError:
+            self._print(f"Invalid breakpoint: {arg!r}")
+            return
+        number = self._next_breakpoint
+        self._next_breakpoint += 1
+        self.breakpoints[number] = point
+        self._print(f"Breakpoint {number}: {point}")
+
+    def do_delete(self, arg: str) -> None:
+        """delete N: Delete breakpoint N."""
+        try:
+            del self.breakpoints[int(arg)]
+        except (ValueError, KeyError):
+            self._print(f"No breakpoint {arg!r}")
+
+    def do_info(self, arg: str) -> None:
+        """info: List the breakpoints."""
+        if not self.breakpoints:
+            self._print("No breakpoints")
+        for number, point in self.breakpoints.items():
+            self._print(f"{number}: {point}")
+
+    def do_print(self, arg: str) -> None:
+        """print: Show the current state."""
+        self.show()
+
+    def do_quit(self, arg: str) -> bool:
+        """quit: Exit the debugger."""
+        return True
+
+    do_s = do_step
+    do_c = do_continue
+    do_rs = do_rstep
+    do_rc = do_rcontinue
+    do_b = do_break
+    do_p = do_print
+    do_q = do_quit
+    do_EOF = do_quit
@@ -8,3 +8,12 @@ class ProgramPointerError(RBFError):
 
 class InvalidProgramError(RBFError):
     """Raised when the program is invalid."""
+
+
+class NonTerminationError(RBFError):
+    """Raised when a run with cycle detection enters a cycle, so it would never finish."""
+
+    def __init__(self, start: int, period: int) -> None:
+        super().__init__(f"Cycle of period {period} entered at step {start}.")
+        self.start = start
+        self.period = period
@@ -0,0 +1,82 @@
+"""Event hooks for :func:`rbf_lang.run`.
+
+Rather than calling a callback before every step, the runner only checks for the events
+which something has subscribed to. All hooks are called *before* the step which triggers
+them, with the program and tape in their current state, and like the ``callback`` of
+:func:`rbf_lang.run`, the run stops if a hook returns True.
+
+>>> hooks = Hooks()
+>>> entered = []
+>>> hooks.on_loop_enter(lambda program, tape: entered.append(program.pointer) or False)
+>>> from rbf_lang import run
+>>> _ = run("(>)", "10010", hooks=hooks)
+>>> entered
+[0]
+"""
+
+from typing import Callable
+
+from .program import Program
+from .tape import Tape
+
+Hook = Callable[[Program, Tape], bool]
+"""Signature of a hook. Return True to stop the run."""
+
+
+class Hooks:
+    """A set of hooks, grouped by the event they are subscribed to."""
+
+    every_n: list[tuple[int, Hook]]
+    loop_enter: list[Hook]
+    loop_exit: list[Hook]
+    wrap: list[Hook]
+    at_pointer: dict[int, list[Hook]]
+
+    def __init__(self) -> None:
+        self.every_n = []
+        self.loop_enter = []
+        self.loop_exit = []
+        self.wrap = []
+        self.at_pointer = {}
+
+    def every(self, n: int, hook: Hook) -> None:
+        """Call the hook before every step whose step count is a multiple of ``n``.
+        ``every(1, hook)`` is called before every step."""
+        if n < 1:
+            raise ValueError("n must be at least 1.")
+        self.every_n.append((n, hook))
+
+    def on_loop_enter(self, hook: Hook) -> None:
+        """Call the hook before a ``(`` which enters its loop (the current bit is set)."""
+        self.loop_enter.append(hook)
+
+    def on_loop_exit(self, hook: Hook) -> None:
+        """Call the hook before a ``)`` which exits its loop (the current bit is set)."""
+        self.loop_exit.append(hook)
+
+    def on_wrap(self, hook: Hook) -> None:
+        """Call the hook before a move which wraps the tape head around the tape."""
+        self.wrap.append(hook)
+
+    def at(self, pointer: int, hook: Hook) -> None:
+        """Call the hook before every execution of the command at ``pointer``."""
+        self.at_pointer.setdefault(pointer, []).append(hook)
+
+    def copy(self) -> "Hooks":
+        """Return a copy with the same subscriptions."""
+        hooks = Hooks()
+        hooks.every_n = self.every_n.copy()
+        hooks.loop_enter = self.loop_enter.copy()
+        hooks.loop_exit = self.loop_exit.copy()
+        hooks.wrap = self.wrap.copy()
+        hooks.at_pointer = {k: v.copy() for k, v in self.at_pointer.items()}
+        return hooks
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.every_n
+            or self.loop_enter
+            or self.loop_exit
+            or self.wrap
+            or self.at_pointer
+        )
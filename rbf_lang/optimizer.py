@@ -0,0 +1,382 @@
+"""Peephole optimizer which lowers a :class:`Program` to a list of fused instructions.
+
+Every straight-line run of ``*``, ``>`` and ``<`` between brackets is collapsed into a
+single instruction with the same net effect: a *block*, which toggles a fixed set of
+cells relative to the tape head and then moves the tape head, so that the body of a loop
+like ``(>>*<<)`` runs as one instruction per iteration. Runs which only move become a
+single move, and runs which cancel out entirely (``><``, ``**``, ``>*<<*>``, ...) are
+removed. Every instruction keeps the number of source commands it stands for as its
+``weight``, so the step count stays exactly the same as with the reference interpreter.
+The weight of the removed commands is carried by the next instruction.
+
+Loops whose body only moves the tape head, like ``(>)`` or ``(<<)``, scan the tape for
+the next set cell with a fixed stride. Their opening bracket becomes a ``SCAN``
+instruction, which finds that cell directly and credits all the iterations at once. The
+scan cannot go on forever on the circular tape: the loop is only entered if the current
+cell is set, and it ends by the time it gets back there.
+
+Each instruction also remembers the index of its first source command. If the next
+instruction does not fit in the remaining step budget, :func:`run_optimized` runs its
+commands one by one from there, and picks the instructions up again at the start of the
+next one. :func:`run_slices` does the same in many slices, keeping its place in the
+instructions between them.
+"""
+
+import enum
+import math
+from typing import Generator, NamedTuple, Optional, Sequence
+
+from .command import Command
+from .program import Program
+from .tape import Tape
+
+
+class OpCode(enum.Enum):
+    """Enumeration of the optimizer instructions."""
+
+    TOGGLE = "*"
+    """Toggle the current bit."""
+
+    MOVE = ">"
+    """Move the tape head by ``arg`` cells (to the left if negative)."""
+
+    BLOCK = "#"
+    """Toggle the cells at ``offsets`` from the tape head, and then move the tape head by
+    ``arg`` cells."""
+
+    LOOP_START = "("
+    """If the current bit is zero, jump to instruction ``arg``. Else, continue."""
+
+    LOOP_END = ")"
+    """If the current bit is zero, jump to instruction ``arg``. Else, continue."""
+
+    SCAN = "/"
+    """A ``LOOP_START`` whose loop body is a single ``MOVE`` (see :func:`_scan`)."""
+
+
+class Op(NamedTuple):
+    """A single optimizer instruction."""
+
+    code: OpCode
+    arg: int
+    """The offset of a move, or the instruction to jump to for a loop."""
+    weight: int
+    """The number of source commands (and so of steps) this instruction stands for."""
+    pointer: int
+    """The index of the first source command of this instruction."""
+    offsets: tuple[int, ...] = ()
+    """The offsets of the cells toggled by a block."""
+
+
+_BRACKETS = (Command.LOOP_START, Command.LOOP_END)
+
+
+def _summarize(program: Program, start: int, stop: int) -> tuple[tuple[int, ...], int]:
+    """Summarize a straight-line run of commands by its net effect: the offsets (from the
+    starting tape head position) of the cells it toggles an odd number of times, and the
+    net offset by which it moves the tape head."""
+    toggled: set[int] = set()
+    position = 0
+    for index in range(start, stop):
+        command = program[index]
+        if command == Command.TOGGLE:
+            toggled ^= {position}
+        elif command == Command.TAPE_RIGHT:
+            position += 1
+        else:
+            position -= 1
+    return tuple(sorted(toggled)), position
+
+
+def _lower(program: Program) -> list[Op]:
+    ops: list[Op] = []
+    open_loops: list[int] = []  # Indices of the LOOP_START instructions
+    start = 0
+    for index in [*(i for i, c in enumerate(program) if c in _BRACKETS), None]:
+        stop = len(program) if index is None else index
+        offsets, shift = _summarize(program, start, stop)
+        weight = stop - start
+        carry = 0
+        if not offsets and not shift:
+            # Everything cancelled out, so the weight is carried by the next instruction.
+            carry = weight
+        elif not offsets:
+            ops.append(Op(OpCode.MOVE, shift, weight, start))
+        elif offsets == (0,) and not shift:
+            ops.append(Op(OpCode.TOGGLE, 0, weight, start))
+        else:
+            ops.append(Op(OpCode.BLOCK, shift, weight, start, offsets))
+
+        # The bracket carries any commands before it which cancelled out. It is only
+        # ever reached by going through them, since jumps land just *after* brackets.
+        pointer = start if carry else stop
+        if index is None:
+            if carry:
+                # Nothing left to carry the cancelled commands at the end of the program
+                ops.append(Op(OpCode.MOVE, 0, carry, pointer))
+            break
+        elif program[index] == Command.LOOP_START:
+            open_loops.append(len(ops))
+            ops.append(Op(OpCode.LOOP_START, -1, carry + 1, pointer))
+        else:
+            match = open_loops.pop()
+            ops.append(Op(OpCode.LOOP_END, match + 1, carry + 1, pointer))
+            ops[match] = ops[match]._replace(arg=len(ops))
+            if len(ops) - match == 3 and ops[match + 1].code == OpCode.MOVE:
+                ops[match] = ops[match]._replace(code=OpCode.SCAN)
+        start = index + 1
+
+    return ops
+
+
+def optimize(program: Program) -> tuple[Op, ...]:
+    """Lower the program to a sequence of fused instructions. The result is kept with the
+    program's :class:`rbf_lang.program.Code`, so optimizing the same program again is
+    cheap.
+
+    >>> for op in optimize(Program("*>>><(**><)")):
+    ...     print(op.code.value, op.arg, op.weight, op.pointer, op.offsets)
+    # 2 5 0 (0,)
+    ( 3 1 5 ()
+    ) 2 5 6 ()
+    """
+    ops: tuple[Op, ...] = program.code._compiled(
+        "optimized", lambda: tuple(_lower(program))
+    )
+    return ops
+
+
+def _scan(data: bytearray, p: int, shift: int, limit: Optional[int] = None) -> int:
+    """Return the number of iterations of a scan loop, i.e. the smallest ``j >= 1`` for
+    which the cell ``p + j * shift`` (around the tape) is set, or 0 if there is none, and
+    so the loop never ends. If the cell ``p`` itself is set (the loop was just entered),
+    the scan always ends by the time it gets back there. With a ``limit``, only the first
+    ``limit`` iterations are searched, and 0 is returned if the scan goes on past them.
+
+    The cells are searched in runs which do not wrap around the tape, each with a strided
+    slice and :meth:`bytearray.find`, so that the search itself runs at C speed.
+
+    >>> _scan(bytearray([1, 0, 0, 1, 0]), 0, 1), _scan(bytearray([1, 0, 0, 1, 0]), 0, -1)
+    (3, 2)
+    >>> _scan(bytearray([0, 1, 0, 0]), 0, 2), _scan(bytearray([1, 0, 0, 1, 0]), 0, 1, 2)
+    (0, 0)
+    """
+    n = len(data)
+    stride = shift % n
+    if stride == 0:
+        return 1 if data[p] and limit != 0 else 0
+    # The loop visits the same cells again after this many iterations
+    orbit = n // math.gcd(n, stride)
+    if limit is not None:
+        orbit = min(orbit, limit)
+    if orbit <= 0:
+        return 0
+    # Scan in whichever direction has the smaller stride
+    forward = stride <= n - stride
+    if not forward:
+        stride = n - stride
+
+    iterations = 0
+    position = p
+    while True:
+        # Only slice as many cells as are left to search
+        remaining = orbit - iterations
+        if forward:
+            start = position + stride
+            if start >= n:
+                start -= n
+            run = data[start : start + remaining * stride : stride]
+        else:
+            start = position - stride
+            if start < 0:
+                start += n
+            stop = start - remaining * stride
+            run = data[start : stop if stop >= 0 else None : -stride]
+        index = run.find(1)
+        if index >= 0:
+            return iterations + index + 1
+        iterations += len(run)
+        if iterations >= orbit:
+            return 0
+        position = start + (len(run) - 1) * (stride if forward else -stride)
+
+
+def _starts(program: Program) -> dict[int, int]:
+    """Map the index of the first source command of each instruction to the instruction.
+    Kept with the program's :class:`rbf_lang.program.Code`, like the instructions."""
+    starts: dict[int, int] = program.code._compiled(
+        "optimized_starts",
+        lambda: {op.pointer: i for i, op in enumerate(optimize(program))},
+    )
+    return starts
+
+
+def run_optimized(
+    program: Program,
+    tape: Tape,
+    max_steps: int,
+    exact: bool = True,
+) -> bool:
+    """Run the program in place on its optimized form. Return True if the program has
+    finished, or False if it stopped because of the step budget.
+
+    If ``exact`` is True, the run stops at exactly ``max_steps``: the commands of an
+    instruction which does not fit in the step budget are run one by one. Otherwise the
+    last instruction is executed in full, and ``steps`` can overshoot ``max_steps`` by a
+    few steps.
+    """
+    slices = run_slices(program, tape, exact)
+    next(slices)
+    return slices.send(max_steps)
+
+
+def run_slices(
+    program: Program,
+    tape: Tape,
+    exact: bool = True,
+) -> Generator[bool, int, None]:
+    """Run the program in place on its optimized form, one slice at a time. After the
+    first ``next()``, send the step count to run up to (the ``max_steps`` of the run so
+    far) to run each slice. Each slice yields whether the program has finished.
+
+    The cells are copied out of the tape once, and the run carries on with the same copy
+    and position in the instructions from one slice to the next, so that a run in many
+    slices takes about as long as one in a single slice. The program and tape are
+    updated at the end of each slice, with only the cells which the slice toggled, and
+    they must not be changed in between.
+
+    >>> program, tape = Program("(>)"), Tape("1" + "0" * 9999)
+    >>> slices = run_slices(program, tape)
+    >>> next(slices), slices.send(101), slices.send(202)
+    (False, False, False)
+    >>> program.steps, tape.pointer
+    (202, 101)
+    """
+    ops = optimize(program)
+    starts = _starts(program)
+    opcodes, jumps = program._opcodes, program._jumps
+    length = len(opcodes)
+    data = tape._cells()
+    n = len(data)
+    p = tape.pointer
+    steps = program.steps
+    pointer = program.pointer
+    finished = program.finished
+    # The next instruction, or -1 while the commands run one by one to the next one
+    i = starts.get(pointer, -1)
+    TOGGLE, MOVE, BLOCK, SCAN = OpCode.TOGGLE, OpCode.MOVE, OpCode.BLOCK, OpCode.SCAN
+    # The bodies of the scan loops, where a run which stopped part way through one of
+    # them carries on with the rest of its iterations
+    bodies = {j + 1 for j, op in enumerate(ops) if op.code is SCAN}
+
+    # Past this many toggles, copying all the cells back is cheaper than toggling them
+    limit = n // 8
+
+    max_steps = yield finished
+    while True:
+        toggled: list[int] = []
+        copy_all = False
+        if not finished and i in bodies:
+            p, steps, i = _scan_loop(data, p, steps, max_steps, ops, i - 1)
+
+        while not finished:
+            if i < 0:
+                # Run the commands one by one, until the start of the next instruction or
+                # the end of the step budget
+                if steps >= max_steps:
+                    break
+                command = opcodes[pointer]
+                if command == 42:  # *
+                    data[p] ^= 1
+                    toggled.append(p)
+                    pointer += 1
+                elif command == 62:  # >
+                    p = p + 1 if p + 1 < n else 0
+                    pointer += 1
+                elif command == 60:  # <
+                    p = p - 1 if p else n - 1
+                    pointer += 1
+                else:  # ( or )
+                    pointer = (pointer if data[p] else jumps[pointer]) + 1
+                steps += 1
+                if pointer == length:
+                    finished = True
+                else:
+                    i = starts.get(pointer, -1)
+                    if i in bodies:
+                        p, steps, i = _scan_loop(data, p, steps, max_steps, ops, i - 1)
+                continue
+            if i == len(ops):
+                finished = True
+                break
+            code, arg, weight, op_pointer, offsets = ops[i]
+            if steps + weight > max_steps:
+                # In the fast mode, start the instruction as long as there is any budget
+                # left. Otherwise run as many of its commands as fit, one by one.
+                if steps >= max_steps:
+                    break
+                if exact:
+                    pointer, i = op_pointer, -1
+                    continue
+            steps += weight
+            if code is TOGGLE:
+                data[p] ^= 1
+                toggled.append(p)
+                i += 1
+            elif code is MOVE:
+                p = (p + arg) % n
+                i += 1
+            elif code is BLOCK:
+                for offset in offsets:
+                    q = (p + offset) % n
+                    data[q] ^= 1
+                    toggled.append(q)
+                p = (p + arg) % n
+                i += 1
+            elif code is SCAN and data[p]:
+                p, steps, i = _scan_loop(data, p, steps, max_steps, ops, i)
+            else:
+                # Both brackets continue if the current bit is set, and jump otherwise.
+                if data[p]:
+                    i += 1
+                elif arg in bodies:
+                    p, steps, i = _scan_loop(data, p, steps, max_steps, ops, arg - 1)
+                else:
+                    i = arg
+                # Only loops can toggle without bound, so this keeps the list bounded
+                if len(toggled) > limit:
+                    copy_all = True
+                    toggled.clear()
+
+        if i >= 0 and not finished:
+            pointer = ops[i].pointer
+        program._set_state(pointer, steps, finished)
+        if copy_all or len(toggled) > limit:
+            tape._load_cells(data)
+        else:
+            # Toggle the changed cells in the tape rather than copying all of them back
+            for q in toggled:
+                tape._toggle_at(q)
+        tape._move_to(p)
+        max_steps = yield finished
+
+
+def _scan_loop(
+    data: bytearray, p: int, steps: int, max_steps: int, ops: Sequence[Op], i: int
+) -> tuple[int, int, int]:
+    """Run all the remaining iterations of the scan loop of the ``SCAN`` instruction
+    ``ops[i]`` at once, or as many as fit in the budget, and return the new tape head
+    position, step count and next instruction. Each iteration is the move followed by the
+    closing bracket."""
+    shift = ops[i + 1].arg
+    cost = ops[i + 1].weight + ops[i + 2].weight
+    budget = max(max_steps - steps, 0) // cost
+    iterations = _scan(data, p, shift, budget)
+    if 0 < iterations <= budget:
+        return (
+            (p + iterations * shift) % len(data),
+            steps + iterations * cost,
+            ops[i].arg,
+        )
+    # Stop at the start of the loop body, so the remaining steps go one by one
+    return (p + budget * shift) % len(data), steps + budget * cost, i + 1
@@ -0,0 +1,172 @@
+"""Run one program over many tapes in a pool of worker processes.
+
+Unlike the lockstep runners in :mod:`rbf_lang.batch` and :mod:`rbf_lang.bitslice`, every
+tape runs independently, so tapes which take very different numbers of steps do not
+hold each other up. The program is sent to each worker once, when the worker starts,
+and the tapes are sent in chunks. Only a bounded number of chunks are in flight at any
+time, so the tapes can come from a lazy iterable of any length.
+"""
+
+import itertools
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, Literal, Optional, Union, overload
+
+from .program import Program, _ProgramInitType
+from .runner import ENGINES, run
+from .tape import Tape, _TapeInitType
+
+_ChunkResult = list[tuple[int, int, bool, Tape]]
+
+_worker_program: Optional[Program] = None
+
+
+def _init_worker(program: Program) -> None:
+    global _worker_program
+    _worker_program = program
+
+
+def _run_chunk(tapes: list[Tape], max_steps: int, engine: str) -> _ChunkResult:
+    """Run the worker's program on a chunk of tapes. Only the final state of the program
+    is sent back, not the whole program."""
+    assert _worker_program is not None, "Worker was not initialized."
+    results = []
+    for tape in tapes:
+        program, tape = run(_worker_program, tape, max_steps=max_steps, engine=engine)
+        results.append((program.pointer, program.steps, program.finished, tape))
+    return results
+
+
+def _results(
+    program: Program, future: "Future[_ChunkResult]"
+) -> Iterator[tuple[Program, Tape]]:
+    """Yield the results of a chunk, with the programs rebuilt from the final pointer,
+    step count and finished flag which the worker sent back."""
+    for pointer, steps, finished, tape in future.result():
+        result = program.copy()
+        result._set_state(pointer, steps, finished)
+        yield result, tape
+
+
+@overload
+def run_many(
+    program: _ProgramInitType,
+    tapes: Iterable[_TapeInitType],
+    max_steps: int = ...,
+    workers: Optional[int] = ...,
+    chunksize: int = ...,
+    engine: str = ...,
+    ordered: Literal[True] = ...,
+) -> Iterator[tuple[Program, Tape]]: ...
+
+
+@overload
+def run_many(
+    program: _ProgramInitType,
+    tapes: Iterable[_TapeInitType],
+    max_steps: int = ...,
+    workers: Optional[int] = ...,
+    chunksize: int = ...,
+    engine: str = ...,
+    *,
+    ordered: Literal[False],
+) -> Iterator[tuple[int, tuple[Program, Tape]]]: ...
+
+
+def run_many(
+    program: _ProgramInitType,
+    tapes: Iterable[_TapeInitType],
+    max_steps: int = 1000,
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    engine: str = "reference",
+    ordered: bool = True,
+) -> Union[Iterator[tuple[Program, Tape]], Iterator[tuple[int, tuple[Program, Tape]]]]:
+    """Run the program on each of the tapes in a pool of ``workers`` processes (one per
+    CPU by default). Yield the same ``(program, tape)`` results as :func:`rbf_lang.run`.
+
+    If ``ordered`` is True, the results are yielded in the order of the tapes. Otherwise
+    they are yielded as soon as they are done, as ``(index, (program, tape))`` pairs.
+    """
+    program = Program(program)
+    workers = workers or os.cpu_count() or 1
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r}. Expected one of {ENGINES}.")
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1.")
+    if ordered:
+        return _run_ordered(program, tapes, max_steps, workers, chunksize, engine)
+    else:
+        return _run_unordered(program, tapes, max_steps, workers, chunksize, engine)
+
+
+def _chunks(tapes: Iterable[_TapeInitType], chunksize: int) -> Iterator[list[Tape]]:
+    iterator = iter(tapes)
+    while True:
+        chunk = [
+            tape if isinstance(tape, Tape) else Tape(tape)
+            for tape in itertools.islice(iterator, chunksize)
+        ]
+        if not chunk:
+            return
+        yield chunk
+
+
+def _run_ordered(
+    program: Program,
+    tapes: Iterable[_TapeInitType],
+    max_steps: int,
+    workers: int,
+    chunksize: int,
+    engine: str,
+) -> Iterator[tuple[Program, Tape]]:
+    executor = ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(program,)
+    )
+    try:
+        pending: deque[Future[_ChunkResult]] = deque()
+        for chunk in _chunks(tapes, chunksize):
+            pending.append(executor.submit(_run_chunk, chunk, max_steps, engine))
+            if len(pending) >= 2 * workers:
+                # Wait for the oldest chunk to keep a bounded number of chunks in flight
+                yield from _results(program, pending.popleft())
+        while pending:
+            yield from _results(program, pending.popleft())
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _run_unordered(
+    program: Program,
+    tapes: Iterable[_TapeInitType],
+    max_steps: int,
+    workers: int,
+    chunksize: int,
+    engine: str,
+) -> Iterator[tuple[int, tuple[Program, Tape]]]:
+    executor = ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(program,)
+    )
+    try:
+        pending: dict[Future[_ChunkResult], int] = {}
+        chunks = _chunks(tapes, chunksize)
+        offset = 0
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    future = executor.submit(_run_chunk, chunk, max_steps, engine)
+                    pending[future] = offset
+                    offset += len(chunk)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start = pending.pop(future)
+                yield from enumerate(_results(program, future), start)
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,143 @@
+"""The permutation of the tape states computed by a program.
+
+Since RBF is reversible, a program which finishes on every tape of ``n`` cells maps the
+``2**n`` possible tapes onto each other one to one, i.e. it is a permutation of them. The
+tapes are numbered by reading them as binary numbers, with cell 0 as the most
+significant bit, so tape ``"100"`` is state 4. The tape head always starts at cell 0,
+and its final position is not part of the permutation.
+
+The permutation is computed for all the tapes at once with the bit-sliced interpreter of
+:mod:`rbf_lang.bitslice`, and stored as a NumPy array, so that running the program again
+on a tape of the same size is an array lookup.
+"""
+
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    raise ImportError(
+        "rbf_lang.permutation requires numpy. Install it with `pip install rbf-lang[numpy]`."
+    ) from None
+
+from .bitslice import _exhaustive_cells, _slice
+from .program import Program, _ProgramInitType
+from .tape import Tape, _TapeInitType
+
+
+def _dtype(size: int) -> "np.dtype[Any]":
+    """The smallest unsigned integer type which can hold the states of ``size`` cells."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if size <= 8 * np.dtype(dtype).itemsize:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+class Permutation:
+    """A permutation of the tape states of ``size`` cells. ``mapping[state]`` is the state
+    which ``state`` is mapped to.
+
+    >>> move = program_permutation("(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)", 3)
+    >>> move.mapping.tolist()
+    [0, 1, 3, 5, 2, 4, 6, 7]
+    >>> move.compose(move.invert()) == Permutation.identity(3)
+    True
+    """
+
+    mapping: "np.ndarray"
+    size: int
+
+    def __init__(self, mapping: "np.ndarray", size: int) -> None:
+        mapping = np.asarray(mapping)
+        if mapping.shape != (1 << size,):
+            raise ValueError(f"Expected {1 << size} states for a tape of {size} cells.")
+        counts = np.bincount(mapping.astype(np.intp), minlength=len(mapping))
+        if len(counts) != len(mapping) or np.any(counts != 1):
+            raise ValueError("The mapping is not a permutation.")
+        self.mapping = mapping.astype(_dtype(size))
+        self.mapping.flags.writeable = False
+        self.size = size
+
+    @classmethod
+    def identity(cls, size: int) -> "Permutation":
+        """The permutation which maps every state to itself."""
+        return cls(np.arange(1 << size), size)
+
+    def compose(self, other: "Permutation") -> "Permutation":
+        """Return the permutation of applying this one, and then ``other``."""
+        if other.size != self.size:
+            raise ValueError("Cannot compose permutations of different sizes.")
+        return Permutation(other.mapping[self.mapping], self.size)
+
+    def invert(self) -> "Permutation":
+        """Return the permutation which undoes this one."""
+        inverse = np.empty_like(self.mapping)
+        inverse[self.mapping] = np.arange(len(self.mapping), dtype=self.mapping.dtype)
+        return Permutation(inverse, self.size)
+
+    def __call__(self, tape: _TapeInitType) -> Tape:
+        """Return the tape which ``tape`` is mapped to, with the tape head at cell 0."""
+        tape = tape if isinstance(tape, Tape) else Tape(tape)
+        if len(tape) != self.size:
+            raise ValueError(f"Expected a tape of {self.size} cells.")
+        state = int(self.mapping[int(str(tape), 2)])
+        return Tape(format(state, f"0{self.size}b"))
+
+    def __len__(self) -> int:
+        return len(self.mapping)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Permutation):
+            return self.size == other.size and bool(
+                np.array_equal(self.mapping, other.mapping)
+            )
+        return False
+
+    def __hash__(self) -> int:
+        return hash((self.size, self.mapping.tobytes()))
+
+    def __repr__(self) -> str:
+        return f"Permutation({self.mapping.tolist()!r}, {self.size})"
+
+
+def program_permutation(
+    program: _ProgramInitType,
+    size: int,
+    max_steps: int = 1000,
+) -> Permutation:
+    """Run the program on every tape of ``size`` cells at once, and return the permutation
+    of the tape states which it computes. Raises a ValueError if the program does not
+    finish within ``max_steps`` on every tape, or if it is not a permutation of the tapes
+    alone (when the final tape head position is needed to tell two results apart).
+    """
+    if size < 1:
+        raise ValueError("The tape must have at least one cell.")
+    program = Program(program)
+    lanes = 1 << size
+    cells = _exhaustive_cells(size)
+    _steps, _heads, finished = _slice(
+        program, cells, {0: (1 << lanes) - 1}, lanes, max_steps
+    )
+    if not all(finished):
+        raise ValueError(
+            f"The program does not finish within {max_steps} steps on "
+            f"{finished.count(False)} of the {lanes} tapes."
+        )
+
+    # Transpose the cells back. Bit L of cells[i] is cell i of lane L.
+    nbytes = (lanes + 7) // 8
+    mapping = np.zeros(lanes, dtype=np.uint64)
+    for i, cell in enumerate(cells):
+        bits = np.unpackbits(
+            np.frombuffer(cell.to_bytes(nbytes, "little"), dtype=np.uint8),
+            bitorder="little",
+        )[:lanes]
+        mapping |= bits.astype(np.uint64) << np.uint64(size - 1 - i)
+
+    try:
+        return Permutation(mapping, size)
+    except ValueError:
+        raise ValueError(
+            "The program is not a permutation of the tapes alone, since the final tape "
+            "head position differs between tapes."
+        ) from None
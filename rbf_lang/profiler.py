@@ -0,0 +1,206 @@
+"""Profile a run of a program, to find out where its steps go.
+
+The profile counts how many times each command was executed and, for each loop, how
+many times each of its brackets jumped, and how many iterations each pass through the
+loop took. A pass which skips the loop altogether counts as 0 iterations.
+
+>>> result = profile("(>)", "10010")
+>>> result.counts
+[1, 3, 3]
+>>> loop = result.loops[0]
+>>> loop.entered, loop.skipped, loop.repeated, loop.exited
+(1, 0, 2, 1)
+>>> dict(loop.iterations)
+{3: 1}
+"""
+
+import math
+from collections import Counter
+from typing import Any
+
+from .command import Command
+from .hooks import Hooks
+from .program import Program, _ProgramInitType
+from .runner import run
+from .tape import Tape, _TapeInitType
+
+
+class LoopStats:
+    """The counts for one ``(``/``)`` pair."""
+
+    start: int
+    """The index of the ``(``."""
+    end: int
+    """The index of the matching ``)``."""
+    entered: int
+    """How many times the ``(`` continued into the loop (the bit was set)."""
+    skipped: int
+    """How many times the ``(`` jumped past the loop (the bit was not set)."""
+    repeated: int
+    """How many times the ``)`` jumped back to the start of the loop (the bit was not set)."""
+    exited: int
+    """How many times the ``)`` continued out of the loop (the bit was set)."""
+    iterations: "Counter[int]"
+    """Histogram of the number of iterations of each completed pass through the loop."""
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+        self.entered = 0
+        self.skipped = 0
+        self.repeated = 0
+        self.exited = 0
+        self.iterations = Counter()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "start": self.start,
+            "end": self.end,
+            "entered": self.entered,
+            "skipped": self.skipped,
+            "repeated": self.repeated,
+            "exited": self.exited,
+            "iterations": {str(k): v for k, v in sorted(self.iterations.items())},
+        }
+
+
+class Profile:
+    """The result of :func:`profile`."""
+
+    program: Program
+    """The final state of the program, as returned by :func:`rbf_lang.run`."""
+    tape: Tape
+    """The final tape, as returned by :func:`rbf_lang.run`."""
+    initial_tape: Tape
+    max_steps: int
+    counts: list[int]
+    """How many times each command was executed."""
+    loops: dict[int, LoopStats]
+    """The loop counts, keyed by the index of the ``(`` of each loop."""
+
+    def __init__(
+        self,
+        program: Program,
+        tape: Tape,
+        initial_tape: Tape,
+        max_steps: int,
+        counts: list[int],
+        loops: dict[int, LoopStats],
+    ) -> None:
+        self.program = program
+        self.tape = tape
+        self.initial_tape = initial_tape
+        self.max_steps = max_steps
+        self.counts = counts
+        self.loops = loops
+
+    def _rows(self) -> list[tuple[int, int]]:
+        """Split the program into ``(start, stop)`` rows for the listing. Brackets get a
+        row of their own, and runs of other commands which ran equally often share one."""
+        rows: list[tuple[int, int]] = []
+        start = 0
+        for index in range(1, len(self.counts) + 1):
+            if (
+                index == len(self.counts)
+                or self.program[index] in (Command.LOOP_START, Command.LOOP_END)
+                or self.program[start] in (Command.LOOP_START, Command.LOOP_END)
+                or self.counts[index] != self.counts[start]
+            ):
+                rows.append((start, index))
+                start = index
+        return rows
+
+    def listing(self, width: int = 10) -> str:
+        """Return the annotated source listing, with the execution count and a heat bar
+        of up to ``width`` characters for each command, and the loop counts next to the
+        brackets."""
+        source = str(self.program)
+        peak = max(self.counts, default=0)
+        lines = [f"steps: {self.program.steps} (max {self.max_steps})"]
+        lines.append(f"{'index':>9}  {'command':<10} {'count':>8}  heat")
+        for start, stop in self._rows():
+            count = self.counts[start]
+            heat = "#" * math.ceil(width * count / peak) if peak else ""
+            index = str(start) if stop - start == 1 else f"{start}-{stop - 1}"
+            commands = source[start:stop]
+            if len(commands) > 10:
+                commands = commands[:7] + "..."
+            line = f"{index:>9}  {commands:<10} {count:>8}  {heat:<{width}}"
+
+            command = self.program[start]
+            if command == Command.LOOP_START:
+                loop = self.loops[start]
+                histogram = " ".join(
+                    f"{k}x{v}" for k, v in sorted(loop.iterations.items())
+                )
+                line += f"  enter {loop.entered} skip {loop.skipped}"
+                line += f" | iterations {histogram or '-'}"
+            elif command == Command.LOOP_END:
+                loop = self.loops[self.program._jumps[start]]
+                line += f"  repeat {loop.repeated} exit {loop.exited}"
+            lines.append(line.rstrip())
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the profile as a JSON-serializable dict."""
+        return {
+            "program": str(self.program),
+            "tape": str(self.initial_tape),
+            "max_steps": self.max_steps,
+            "steps": self.program.steps,
+            "counts": self.counts,
+            "loops": [loop.to_dict() for _start, loop in sorted(self.loops.items())],
+        }
+
+
+def profile(
+    program: _ProgramInitType,
+    tape: _TapeInitType,
+    max_steps: int = 1000,
+) -> Profile:
+    """Run the program with the reference interpreter like :func:`rbf_lang.run`, and
+    profile the run. Passes through a loop which are still going when the run stops
+    are not included in the iteration histograms."""
+    program = Program(program)
+    initial_tape = tape.copy() if isinstance(tape, Tape) else Tape(tape)
+
+    commands = program.program
+    jumps = program._jumps
+    counts = [0] * len(commands)
+    loops = {
+        start: LoopStats(start, end)
+        for start, (command, end) in enumerate(zip(commands, jumps))
+        if command == Command.LOOP_START
+    }
+    # Iterations so far of the passes in progress, keyed by the start of the loop
+    passes: dict[int, int] = {}
+
+    def record(program: Program, tape: Tape) -> bool:
+        pointer = program.pointer
+        counts[pointer] += 1
+        command = commands[pointer]
+        if command == Command.LOOP_START:
+            loop = loops[pointer]
+            if tape.bit:
+                loop.entered += 1
+                passes[pointer] = 1
+            else:
+                loop.skipped += 1
+                loop.iterations[0] += 1
+        elif command == Command.LOOP_END:
+            start = jumps[pointer]
+            loop = loops[start]
+            if tape.bit:
+                loop.exited += 1
+                # The pass may have started before the run, if the program did not start at 0
+                loop.iterations[passes.pop(start, 1)] += 1
+            else:
+                loop.repeated += 1
+                passes[start] = passes.get(start, 1) + 1
+        return False
+
+    hooks = Hooks()
+    if commands:
+        hooks.every(1, record)
+    final_program, final_tape = run(program, initial_tape, max_steps, hooks=hooks)
+    return Profile(final_program, final_tape, initial_tape, max_steps, counts, loops)
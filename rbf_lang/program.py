@@ -1,18 +1,241 @@
+import mmap
+import os
+import re
+import threading
 import warnings
 
-from typing import Sequence, Union, overload, Optional
+from array import array
+from typing import IO, Any, Callable, Iterator, Sequence, Union, overload, Optional
 from .command import Command
 from .exceptions import InvalidProgramError, ProgramPointerError
+from .tape import Tape
 
-_ProgramInitType = Union[str, Sequence[Command], "Program"]
+_ProgramInitType = Union[str, Sequence[Command], "Code", "Program"]
 
+_CHUNK_SIZE = 1 << 20
+"""Number of bytes of a source file which are processed at a time."""
+_COMMAND_BYTES = "".join(command.value for command in Command).encode()
+_WHITESPACE_BYTES = b" \t\r\n"
+_OPCODES = {ord(command.value): command for command in Command}
+"""The commands by opcode. The opcode of a command is the byte of its character."""
+_INVALID = re.compile(r"[^*<>()]")
+_BRACKETS = re.compile(rb"[()]")
 
-class Program(Sequence[Command]):
-    """RBF program."""
 
-    _program: list[Command]
+class CommandView(Sequence[Command]):
+    """Read-only view of the commands of a :class:`Program`, which shares the program's
+    opcode buffer instead of copying it. Slicing a view gives another view.
+
+    >>> view = Program("*>(<)").program[1:4]
+    >>> view
+    CommandView('>(<')
+    >>> view[0], len(view)
+    (<Command.TAPE_RIGHT: '>'>, 3)
+    """
+
+    __slots__ = ("_code",)
+
+    _code: memoryview
+
+    def __init__(self, code: Union[bytes, memoryview]) -> None:
+        self._code = memoryview(code).toreadonly()
+
+    def __len__(self) -> int:
+        return len(self._code)
+
+    @overload
+    def __getitem__(self, index: int) -> Command: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "CommandView": ...
+
+    def __getitem__(
+        self, index_or_slice: Union[int, slice]
+    ) -> Union[Command, "CommandView"]:
+        if isinstance(index_or_slice, int):
+            return _OPCODES[self._code[index_or_slice]]
+        elif isinstance(index_or_slice, slice):
+            return CommandView(self._code[index_or_slice])
+        else:
+            raise TypeError("Index must be an int or a slice.")
+
+    def __iter__(self) -> Iterator[Command]:
+        return map(_OPCODES.__getitem__, self._code)
+
+    def tobytes(self) -> bytes:
+        """Return a copy of the opcodes, i.e. the commands as ASCII characters."""
+        return self._code.tobytes()
+
+    def __str__(self) -> str:
+        return self.tobytes().decode("ascii")
+
+    def __repr__(self) -> str:
+        return f"CommandView({str(self)!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CommandView):
+            return self._code == other._code
+        elif isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        else:
+            return False
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class Code:
+    """The immutable code of an RBF program: its validated opcodes (see
+    :class:`CommandView`), the bracket jump table, and the compiled forms of the program,
+    which are built the first time an engine needs them.
+
+    A code object never changes, so it can be shared by any number of programs, also
+    between threads. Running a program only changes its :class:`ExecutionState`.
+
+    >>> code = Code("*>(<)")
+    >>> first, second = Program(code), Program(code)
+    >>> first.code is second.code
+    True
+    """
+
+    __slots__ = ("_opcodes", "_jumps", "_source", "_cache", "_lock")
+
+    _opcodes: bytes
+    _jumps: "array[int]"
+    _source: Optional[str]
+    _cache: dict[str, Any]
+    _lock: threading.Lock
+
+    def __init__(self, program: Union[str, Sequence[Command]]) -> None:
+        if isinstance(program, str):
+            program = preprocess_program(program)
+        elif not isinstance(program, Sequence):
+            raise TypeError("Program must be initialized with a string or a sequence.")
+        opcodes, jumps = _validate_program(program)
+        self._setup(opcodes, jumps, program if isinstance(program, str) else None)
+
+    def _setup(
+        self, opcodes: bytes, jumps: "array[int]", source: Optional[str] = None
+    ) -> None:
+        self._opcodes = opcodes
+        self._jumps = jumps
+        self._source = source
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _from_opcodes(cls, opcodes: bytes) -> "Code":
+        """Create the code of opcodes which are known to be valid commands."""
+        code = cls.__new__(cls)
+        code._setup(opcodes, _jump_table(opcodes))
+        return code
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # The lock and the compiled forms are not sent along
+        return _restore_code, (self._opcodes, self._jumps, self._source)
+
+    @property
+    def opcodes(self) -> bytes:
+        """The opcodes, i.e. the commands as ASCII characters."""
+        return self._opcodes
+
+    def _compiled(self, kind: str, build: Callable[[], Any]) -> Any:
+        """Return a compiled form of the code, calling ``build`` to make it the first time
+        it is asked for."""
+        try:
+            return self._cache[kind]
+        except KeyError:
+            pass
+        with self._lock:
+            if kind not in self._cache:
+                self._cache[kind] = build()
+            return self._cache[kind]
+
+    def __len__(self) -> int:
+        return len(self._opcodes)
+
+    def __str__(self) -> str:
+        # The string is only built once, and only if needed.
+        if self._source is None:
+            self._source = self._opcodes.decode("ascii")
+        return self._source
+
+    def __repr__(self) -> str:
+        return f"Code({str(self)!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Code):
+            return self._opcodes == other._opcodes
+        return False
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+
+def _restore_code(opcodes: bytes, jumps: "array[int]", source: Optional[str]) -> Code:
+    code = Code.__new__(Code)
+    code._setup(opcodes, jumps, source)
+    return code
+
+
+class ExecutionState:
+    """The state of a run of a program: the program pointer, the step count, and whether
+    the program has finished. It is what a run changes, so it is kept small."""
+
+    __slots__ = ("_pointer", "_steps", "_finished")
+
     _pointer: int
     _steps: int
+    _finished: bool
+
+    def __init__(
+        self, pointer: int = 0, steps: int = 0, finished: bool = False
+    ) -> None:
+        self._pointer = pointer
+        self._steps = steps
+        self._finished = finished
+
+    @property
+    def pointer(self) -> int:
+        """Return the program pointer position -- 0-based index of the current command."""
+        return self._pointer
+
+    @property
+    def steps(self) -> int:
+        return self._steps
+
+    @property
+    def finished(self) -> bool:
+        """Whether the program has run past its last command. The program pointer is then
+        left at the last command. An empty program is always finished."""
+        return self._finished
+
+    def _set_state(self, pointer: int, steps: int, finished: bool) -> None:
+        """Set the state at the end of a run by an engine which keeps its own copy of it.
+        A finished run leaves the pointer at the last command, like the reference
+        interpreter, whatever the given ``pointer``."""
+        self._pointer = self._last_pointer() if finished else pointer
+        self._steps = steps
+        self._finished = finished
+
+    def _last_pointer(self) -> int:
+        """The pointer of a finished run."""
+        return 0
+
+
+class Program(ExecutionState, Sequence[Command]):
+    """RBF program, i.e. its :class:`Code` together with the :class:`ExecutionState` of a
+    run of it.
+
+    The commands are stored as a compact buffer of opcodes, one byte each. Copies of a
+    program share the code, so cloning and comparing programs is cheap however long they
+    are, and the copies can run independently, e.g. in different threads.
+    """
+
+    __slots__ = ("_code", "_opcodes", "_jumps")
+
+    _code: Code
+    _opcodes: bytes
+    _jumps: "array[int]"
 
     def __init__(
         self,
@@ -20,61 +243,80 @@ class Program(Sequence[Command]):
         pointer: Optional[int] = None,
     ) -> None:
         if isinstance(program, Program):
-            self._program = list(program.program)
-            self._pointer = program.pointer
-            self._steps = program.steps
+            self._share(program._code)
+            super().__init__(program._pointer, program._steps, program._finished)
             if pointer is not None:
                 warnings.warn(
                     "Pointer argument is ignored when initializing Program with another Program. Set it to None to disable this warning.",
                     stacklevel=2,
                 )
-        elif isinstance(program, str) or isinstance(program, Sequence):
-            if isinstance(program, str):
-                program = preprocess_program(program)
-            validated_program = validate_program(program)
-            self._program = validated_program
-            pointer = 0 if pointer is None else pointer
-            self._pointer = pointer
-            self._steps = 0
+        elif isinstance(program, (Code, str, Sequence)):
+            self._share(program if isinstance(program, Code) else Code(program))
+            # An empty program has nothing to run, so it is finished from the start
+            super().__init__(
+                0 if pointer is None else pointer, finished=not self._opcodes
+            )
         else:
             raise TypeError("Program must be initialized with a string or a sequence.")
 
-    @property
-    def program(self) -> Sequence[Command]:
-        """Return a copy of the program commands."""
-        return self._program.copy()
+    def _share(self, code: Code) -> None:
+        self._code = code
+        # Shortcuts to the parts of the code which are needed at every step
+        self._opcodes = code._opcodes
+        self._jumps = code._jumps
+
+    @classmethod
+    def from_file(
+        cls,
+        file: Union[str, "os.PathLike[str]", IO[bytes]],
+        pointer: Optional[int] = None,
+    ) -> "Program":
+        """Load a program from a source file, given by its path or as a binary file object.
+        The source is preprocessed as it is read (see :func:`read_program`), so that even
+        very large sources are never held in memory with their comments and whitespace.
+        """
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "rb") as f:
+                opcodes = _read_code(f)
+        else:
+            opcodes = _read_code(file)
+        return cls(Code._from_opcodes(opcodes), pointer)
 
     @property
-    def pointer(self) -> int:
-        """Return the program pointer position -- 0-based index of the current command."""
-        return self._pointer
+    def code(self) -> Code:
+        """The code of the program, which is shared by all its copies."""
+        return self._code
 
     @property
-    def steps(self) -> int:
-        return self._steps
+    def program(self) -> CommandView:
+        """Return a read-only view of the program commands."""
+        return CommandView(self._opcodes)
 
     def __len__(self) -> int:
-        return len(self._program)
+        return len(self._opcodes)
 
     @overload
     def __getitem__(self, index: int) -> Command: ...
 
     @overload
-    def __getitem__(self, index: slice) -> Sequence[Command]: ...
+    def __getitem__(self, index: slice) -> CommandView: ...
 
     def __getitem__(
         self,
         index_or_slice: Union[int, slice],
-    ) -> Union[Command, Sequence[Command]]:
+    ) -> Union[Command, CommandView]:
         if isinstance(index_or_slice, int):
-            return self._program[index_or_slice]
+            return _OPCODES[self._opcodes[index_or_slice]]
         elif isinstance(index_or_slice, slice):
-            return self._program[index_or_slice]
+            return CommandView(self._opcodes)[index_or_slice]
         else:
             raise TypeError("Index must be an int or a slice.")
 
+    def __iter__(self) -> Iterator[Command]:
+        return map(_OPCODES.__getitem__, self._opcodes)
+
     def _single_char_repr(self) -> str:
-        return "".join(command.value for command in self._program)
+        return str(self._code)
 
     def __repr__(self) -> str:
         return f"Program({self._single_char_repr()!r})"
@@ -82,11 +324,15 @@ class Program(Sequence[Command]):
     def __str__(self) -> str:
         return self._single_char_repr()
 
+    def _last_pointer(self) -> int:
+        return max(len(self) - 1, 0)
+
     def _move_right_nostep(self) -> None:
         """Move the program pointer to the right without incrementing the step counter."""
         if self._pointer < len(self) - 1:
             self._pointer += 1
         else:
+            self._finished = True
             raise ProgramPointerError("Program pointer overflow.")
 
     def move_right(self, N: int = 1) -> None:
@@ -117,19 +363,8 @@ class Program(Sequence[Command]):
         self._steps += 1
 
         if not current_bit:
-            try:
-                # The current bit is zero, so we jump past the matching ).
-                bracket_depth = 1
-                while bracket_depth > 0:
-                    self._move_right_nostep()
-                    if self.command == Command.LOOP_START:
-                        bracket_depth += 1
-                    elif self.command == Command.LOOP_END:
-                        bracket_depth -= 1
-
-            except ProgramPointerError:
-                # We've hit the end of the program without finding the matching ).
-                raise InvalidProgramError("Unmatched loop start.")
+            # The current bit is zero, so we jump to the matching ).
+            self._pointer = self._jumps[self._pointer]
 
         # We are now at the matching ), but we need to move past it, so move right once more.
         try:
@@ -147,18 +382,8 @@ class Program(Sequence[Command]):
         self._steps += 1
 
         if not current_bit:
-            try:
-                # The current bit is zero, so we jump back to just after the matching (.
-                bracket_depth = 1
-                while bracket_depth > 0:
-                    self._move_left_nostep()
-                    if self._program[self._pointer] == Command.LOOP_START:
-                        bracket_depth -= 1
-                    elif self._program[self._pointer] == Command.LOOP_END:
-                        bracket_depth += 1
-
-            except ProgramPointerError:
-                raise InvalidProgramError("Unmatched loop end.")
+            # The current bit is zero, so we jump back to the matching (.
+            self._pointer = self._jumps[self._pointer]
 
         # We are now at the matching (, but we need to move just after it, so move right once.
         # NOTE: We don't need to worry about hitting the end of the program here.
@@ -168,6 +393,48 @@ class Program(Sequence[Command]):
         """Reset the program pointer and step counter."""
         self._pointer = 0
         self._steps = 0
+        self._finished = not self._opcodes
+
+    def step_back(self, tape: Tape) -> None:
+        """Undo the last step of a run on ``tape``, in place. Since every command is
+        reversible, the previous state is recovered exactly from the current one, without
+        any history. Raises :class:`rbf_lang.exceptions.ProgramPointerError` if there is
+        no step to undo, and a ValueError if the tape is not circular, since the cells which
+        a growable tape has grown by cannot be taken away again.
+
+        >>> from rbf_lang import run
+        >>> program, tape = run("*>*", "000")
+        >>> program.step_back(tape)
+        >>> program.pointer, program.steps, str(tape)
+        (2, 2, '100')
+        """
+        if self._steps == 0:
+            raise ProgramPointerError("No step to undo.")
+        if not tape.circular:
+            raise ValueError("Steps on tapes which are not circular cannot be undone.")
+
+        # The position just after the previous command
+        position = len(self) if self._finished else self._pointer
+        if position == 0:
+            raise ProgramPointerError("Program pointer underflow.")
+        previous = position - 1
+        command = _OPCODES[self._opcodes[previous]]
+
+        if command == Command.TOGGLE:
+            tape.toggle()
+        elif command == Command.TAPE_RIGHT:
+            tape.move_left()
+        elif command == Command.TAPE_LEFT:
+            tape.move_right()
+        elif not tape.bit:
+            # Brackets do not change the tape, so the bit tells how we got past this one.
+            # If it is set, the bracket itself continued. Otherwise, the matching bracket
+            # jumped to just after it (a ) looping back, or a ( skipping its loop).
+            previous = self._jumps[previous]
+
+        self._pointer = previous
+        self._steps -= 1
+        self._finished = False
 
     @property
     def command(self) -> Command:
@@ -175,11 +442,11 @@ class Program(Sequence[Command]):
         if the program is empty."""
         if len(self) == 0:
             raise ProgramPointerError("Program is empty.")
-        return self._program[self._pointer]
+        return _OPCODES[self._opcodes[self._pointer]]
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, Program):
-            return self._program == other.program
+            return self._opcodes == other._opcodes
         elif isinstance(other, str):
             return str(self) == other
         else:
@@ -223,6 +490,77 @@ def preprocess_program(program: str) -> str:
     # ValueError: Invalid RBF command: '+'
 
 
+def _chunks(file: IO[bytes]) -> Iterator[bytes]:
+    """Yield the contents of a binary file in chunks. Regular files are memory-mapped, and
+    anything else (pipes, empty files, in-memory files) is read chunk by chunk."""
+    try:
+        fileno = file.fileno()
+        size = os.fstat(fileno).st_size
+    except (AttributeError, OSError, ValueError):
+        # io.UnsupportedOperation is both an OSError and a ValueError
+        size = 0
+    if size > 0:
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(0, len(mapped), _CHUNK_SIZE):
+                yield mapped[start : start + _CHUNK_SIZE]
+    else:
+        while chunk := file.read(_CHUNK_SIZE):
+            yield chunk
+
+
+def _read_code(file: IO[bytes]) -> bytes:
+    """Read the opcodes of the program in a source file. See :func:`read_program`."""
+    commands = bytearray()
+    in_comment = False
+    offset = 0  # Offset of the current chunk in the file
+    for chunk in _chunks(file):
+        position = 0
+        while position < len(chunk):
+            if in_comment:
+                end = chunk.find(b"\n", position)
+                if end < 0:
+                    # The comment goes on into the next chunk
+                    break
+                in_comment = False
+            else:
+                end = chunk.find(b"#", position)
+                if end < 0:
+                    end = len(chunk)
+                else:
+                    in_comment = True
+                segment = chunk[position:end].translate(None, _WHITESPACE_BYTES)
+                invalid = segment.translate(None, _COMMAND_BYTES)
+                if invalid:
+                    index = chunk.index(invalid[:1], position)
+                    character = chunk[index : index + 1].decode(
+                        "ascii", "backslashreplace"
+                    )
+                    raise InvalidProgramError(
+                        f"{character!r} is not a valid Command (at byte {offset + index})"
+                    )
+                commands += segment
+            position = end + 1
+        offset += len(chunk)
+    return bytes(commands)
+
+
+def read_program(file: IO[bytes]) -> str:
+    """Read RBF source from a binary file, and preprocess and check it in a single pass, like
+    :func:`preprocess_program` (but also skipping tabs and carriage returns). Only the
+    commands are kept, at one byte each, and the file is read a chunk at a time.
+
+    >>> import io
+    >>> source = b"(>>*<<)  # set f if x is set\\r\\n\\t>>(<(>*<)*<*(>>*<<)>>)<(>*<)"
+    >>> read_program(io.BytesIO(source))
+    '(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)'
+    >>> read_program(io.BytesIO(b"*+*"))
+    Traceback (most recent call last):
+        ...
+    rbf_lang.exceptions.InvalidProgramError: '+' is not a valid Command (at byte 1)
+    """
+    return _read_code(file).decode("ascii")
+
+
 def validate_program(program: Union[str, Sequence[Command]]) -> list[Command]:
     """Check all commands are valid and that brackets are balanced. Return a list of Commands.
 
@@ -234,29 +572,65 @@ def validate_program(program: Union[str, Sequence[Command]]) -> list[Command]:
     rbf_lang.exceptions.InvalidProgramError: '+' is not a valid Command
     """
 
-    parsed_commands: Sequence[Command]
-    if isinstance(program, str):
-        # Remove any characters that are not RBF commands.
-        # Convert the string to a list of Commands.
-        try:
-            parsed_commands = [Command(command) for command in program]
-        except ValueError as e:
-            raise InvalidProgramError(str(e))
-    else:
-        # The program is already a list of Commands.
-        parsed_commands = list(program)
+    return list(map(_OPCODES.__getitem__, _validate_program(program)[0]))
 
-    bracket_depth = 0  # Keep track of the depth of the brackets.
-    for command in parsed_commands:
-        if command == Command.LOOP_START:
-            bracket_depth += 1
-        elif command == Command.LOOP_END:
-            bracket_depth -= 1
 
-        if bracket_depth < 0:
-            raise InvalidProgramError("Unmatched loop end.")
+def _validate_program(
+    program: Union[str, Sequence[Command]],
+) -> tuple[bytes, "array[int]"]:
+    """Validate the program, and return its opcodes and its bracket jump table.
+
+    >>> _validate_program("(*)")[0]
+    b'(*)'
+    """
+
+    if isinstance(program, str):
+        invalid = _INVALID.search(program)
+        if invalid is not None:
+            raise InvalidProgramError(f"{invalid.group()!r} is not a valid Command")
+        code = program.encode("ascii")
+    elif isinstance(program, CommandView):
+        code = program.tobytes()
+    else:
+        try:
+            code = "".join(command.value for command in program).encode("ascii")
+        except (AttributeError, TypeError, UnicodeEncodeError):
+            raise InvalidProgramError(
+                "Program must be a sequence of Commands."
+            ) from None
+        # Other enums with a value, e.g. the optimizer opcodes, are not Commands
+        others = code.translate(None, _COMMAND_BYTES)
+        if others:
+            raise InvalidProgramError(f"{chr(others[0])!r} is not a valid Command")
+
+    return code, _jump_table(code)
+
+
+def _jump_table(code: bytes) -> "array[int]":
+    """Build the bracket jump table of the opcodes. The jump table maps the index of each
+    bracket to the index of its matching bracket (other commands map to -1), so that loops
+    can jump in constant time. Raises InvalidProgramError if the brackets do not match.
+
+    >>> _jump_table(b"(*)").tolist()
+    [2, -1, 0]
+    """
+    # The smallest array type which can hold the indices
+    typecode = "i" if len(code) < 1 << 31 else "q"
+    jumps = array(typecode, [-1]) * len(code)
+    open_brackets: list[int] = []  # Stack of the indices of the unmatched (s.
+    # Only the brackets need to be visited to match them up.
+    for bracket in _BRACKETS.finditer(code):
+        index = bracket.start()
+        if bracket.group() == b"(":
+            open_brackets.append(index)
+        else:
+            if not open_brackets:
+                raise InvalidProgramError("Unmatched loop end.")
+            match = open_brackets.pop()
+            jumps[match] = index
+            jumps[index] = match
 
-    if bracket_depth != 0:
+    if open_brackets:
         raise InvalidProgramError("Unmatched loop start.")
 
-    return parsed_commands
+    return jumps
@@ -1,8 +1,21 @@
-from typing import Sequence, Union, overload
+import mmap
+import os
+from itertools import accumulate
+from typing import IO, Sequence, Union, overload
 from functools import singledispatch
 
 from .command import Command
-from .program import Program
+from .exceptions import InvalidProgramError
+from .program import (
+    _CHUNK_SIZE,
+    _COMMAND_BYTES,
+    _INVALID,
+    _WHITESPACE_BYTES,
+    Code,
+    CommandView,
+    Program,
+    preprocess_program,
+)
 
 import logging
 
@@ -18,6 +31,28 @@ _COMMAND_TRANSLATION = {
 
 _STRING_TRANSLATION = {k.value: v.value for k, v in _COMMAND_TRANSLATION.items()}
 
+_STRING_TABLE = str.maketrans(_STRING_TRANSLATION)
+
+_OPCODE_TRANSLATION = bytes.maketrans(
+    "".join(_STRING_TRANSLATION).encode(),
+    "".join(_STRING_TRANSLATION.values()).encode(),
+)
+
+_BRACKET_DEPTHS = {ord("("): 1, ord(")"): -1}
+"""How each bracket changes the nesting depth."""
+
+
+def _check_brackets(code: bytes, depth: int = 0) -> int:
+    """Check that the brackets of ``code`` can be matched up, after ``depth`` unmatched
+    ``(`` before it. Return the depth at its end."""
+    brackets = code.translate(None, b"*<>")
+    if not brackets:
+        return depth
+    depths = list(accumulate(map(_BRACKET_DEPTHS.__getitem__, brackets), initial=depth))
+    if min(depths) < 0:
+        raise InvalidProgramError("Unmatched loop end.")
+    return depths[-1]
+
 
 # mypy x singledispatch
 # https://github.com/python/mypy/issues/8356#issuecomment-884548381
@@ -38,15 +73,26 @@ def _(program: list) -> list:
 
 @_reverse_program.register
 def _(program: str) -> str:
-    _program = Program(program)
-    return str(reverse_program(_program))
+    # Check the source as Program would, but translate the text directly
+    source = preprocess_program(program)
+    invalid = _INVALID.search(source)
+    if invalid is not None:
+        raise InvalidProgramError(f"{invalid.group()!r} is not a valid Command")
+    if _check_brackets(source.encode("ascii")):
+        raise InvalidProgramError("Unmatched loop start.")
+    return source.translate(_STRING_TABLE)[::-1]
+
+
+@_reverse_program.register
+def _(program: CommandView) -> CommandView:
+    return CommandView(program.tobytes()[::-1].translate(_OPCODE_TRANSLATION))
 
 
 @_reverse_program.register
 def _(program: Program) -> Program:
-    _program = _reverse_program(program.program)
-    return Program(_program)
-    # return Program(reverse_program(program.program))
+    # Reverse the opcodes directly, rather than going through the Commands
+    opcodes = program._opcodes[::-1].translate(_OPCODE_TRANSLATION)
+    return Program(Code._from_opcodes(opcodes))
 
 
 @overload
@@ -65,3 +111,65 @@ def reverse_program(
     program: Union[str, Sequence[Command], Program],
 ) -> Union[str, Sequence[Command], Program]:
     return _reverse_program(program)
+
+
+def reverse_file(
+    source: Union[str, "os.PathLike[str]"],
+    destination: Union[str, "os.PathLike[str]", IO[bytes]],
+) -> None:
+    """Reverse the program in the ``source`` file, and write it to ``destination``, given
+    by its path or as a binary file object. Comments and whitespace are stripped like in
+    :meth:`rbf_lang.Program.from_file`.
+
+    The source is memory-mapped and read backwards a line, or a chunk of a long line, at a
+    time, so that files much larger than the available memory can be reversed. If the
+    source is not a valid program, the output written so far is removed (or left as it is
+    in a file object), and InvalidProgramError is raised.
+    """
+    if isinstance(destination, (str, os.PathLike)):
+        try:
+            with open(destination, "wb") as file:
+                _reverse_file(source, file)
+        except InvalidProgramError:
+            os.remove(destination)
+            raise
+    else:
+        _reverse_file(source, destination)
+
+
+def _reverse_file(source: Union[str, "os.PathLike[str]"], output: IO[bytes]) -> None:
+    with open(source, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Depth of the unmatched ( of the output so far, i.e. ) of the input
+            depth = 0
+            end = len(mapped)
+            while end > 0:
+                line_start = mapped.rfind(b"\n", 0, end) + 1
+                comment = mapped.find(b"#", line_start, end)
+                stop = end if comment < 0 else comment
+                # Go through the commands of the line backwards, a chunk at a time
+                while stop > line_start:
+                    start = max(line_start, stop - _CHUNK_SIZE)
+                    segment = mapped[start:stop].translate(None, _WHITESPACE_BYTES)
+                    invalid = segment.translate(None, _COMMAND_BYTES)
+                    if invalid:
+                        index = mapped.find(invalid[:1], start, stop)
+                        character = mapped[index : index + 1].decode(
+                            "ascii", "backslashreplace"
+                        )
+                        raise InvalidProgramError(
+                            f"{character!r} is not a valid Command (at byte {index})"
+                        )
+                    reversed_segment = segment[::-1].translate(_OPCODE_TRANSLATION)
+                    try:
+                        depth = _check_brackets(reversed_segment, depth)
+                    except InvalidProgramError:
+                        # An unmatched ) of the output is an unmatched ( of the input
+                        raise InvalidProgramError("Unmatched loop start.") from None
+                    output.write(reversed_segment)
+                    stop = start
+                end = line_start - 1
+            if depth:
+                raise InvalidProgramError("Unmatched loop end.")
@@ -1,7 +1,12 @@
-from typing import Callable, Optional
+from typing import Callable, Generator, NamedTuple, Optional
 from .command import Command
+from .exceptions import NonTerminationError
+from .hooks import Hooks
 from .program import Program, ProgramPointerError, _ProgramInitType
-from .tape import Tape, _TapeInitType
+from .tape import TAPE_TYPES, Tape, _TapeInitType
+
+ENGINES = ("reference", "compiled", "optimized", "fast")
+"""Names of the available execution engines. See :func:`run`."""
 
 
 def run(
@@ -9,15 +14,99 @@ def run(
     tape: _TapeInitType,
     max_steps: int = 1000,
     callback: Optional[Callable[[Program, Tape], bool]] = None,
+    engine: str = "reference",
+    hooks: Optional[Hooks] = None,
+    detect_cycles: bool = False,
+    tape_type: Optional[str] = None,
+    in_place: bool = False,
 ) -> tuple[Program, Tape]:
-    """Run the RBF program. The program will run until it reaches the maximum number of steps or the callback returns True."""
+    """Run the RBF program. The program will run until it reaches the maximum number of steps or the callback returns True.
+
+    The callback is called before every step. To only be called on specific events (every
+    N steps, loop entry or exit, ...), subscribe to them with ``hooks`` instead (see
+    :class:`rbf_lang.hooks.Hooks`). Without either, the run does no per-step checks.
+
+    The ``engine`` selects how the program is executed:
+
+    - ``"reference"`` interprets the program one command at a time.
+    - ``"compiled"`` compiles the program into a Python function first (see
+      :mod:`rbf_lang.compiler`). It produces the same result and step count, but only
+      applies to programs starting at the first command.
+    - ``"optimized"`` runs the program on its peephole-optimized form (see
+      :mod:`rbf_lang.optimizer`), with the same result and step count.
+    - ``"fast"`` is like ``"optimized"``, but does not stop exactly at ``max_steps``, so the
+      step count can overshoot it slightly. Use it when only the final tape matters.
+
+    Engines other than ``"reference"`` do not support the callback or hooks.
+
+    With ``detect_cycles``, a run which would never finish stops as soon as it has gone
+    round its cycle once, and raises :class:`rbf_lang.exceptions.NonTerminationError` (see
+    :mod:`rbf_lang.cycles`). This is only supported by the reference engine, without
+    hooks. Runs which start at the first command always finish, so they run as usual.
+
+    The ``tape_type`` converts the tape to one of :data:`rbf_lang.tape.TAPE_TYPES`, e.g.
+    ``"sparse"`` for a :class:`rbf_lang.tape.SparseTape`, or ``"growable"`` for a tape
+    which grows instead of wrapping around. Otherwise a :class:`Tape` is kept as it is,
+    and anything else becomes a :class:`Tape`. Growable and sparse tapes are only
+    supported by the reference engine.
+
+    The program and tape are copied, so that the ones passed in are left as they are.
+    With ``in_place``, a :class:`Program` and a :class:`Tape` (of the ``tape_type``, if
+    given) are run in place instead, and returned. Copying a program is cheap, since the
+    copies share its :class:`rbf_lang.program.Code`, but copying a tape is not.
+    """
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r}. Expected one of {ENGINES}.")
+
+    if not (in_place and isinstance(program, Program)):
+        program = Program(program)
+    if tape_type is not None:
+        if tape_type not in TAPE_TYPES:
+            raise ValueError(
+                f"Unknown tape type: {tape_type!r}. Expected one of {tuple(TAPE_TYPES)}."
+            )
+        if not (in_place and type(tape) is TAPE_TYPES[tape_type]):
+            tape = TAPE_TYPES[tape_type](tape)
+    elif not (in_place and isinstance(tape, Tape)):
+        # Copying keeps the type of the tape, e.g. a PackedTape stays packed
+        tape = tape.copy() if isinstance(tape, Tape) else Tape(tape)
+    _check_tape(tape, engine, detect_cycles)
+    if program.finished:
+        # There is nothing left to run
+        return program, tape
+
+    if callback is not None:
+        # The callback is just a hook which is called before every step
+        hooks = hooks.copy() if hooks else Hooks()
+        hooks.every_n.insert(0, (1, callback))
+    active_hooks = hooks if hooks else None
+
+    if detect_cycles and (engine != "reference" or active_hooks is not None):
+        raise ValueError(
+            "Cycle detection is only supported by the reference engine without hooks."
+        )
+    if detect_cycles and program.pointer != 0:
+        from .cycles import run_detecting_cycles
+
+        cycle = run_detecting_cycles(program, tape, max_steps)
+        if cycle is not None:
+            raise NonTerminationError(cycle.start, cycle.period)
+        return program, tape
+
+    if engine != "reference":
+        if active_hooks is not None:
+            raise ValueError(
+                f"The {engine} engine does not support callbacks or hooks."
+            )
+        if _run_engine(engine, program, tape, max_steps):
+            return program, tape
+        # Otherwise, the remaining steps are run by the reference interpreter below.
 
-    program = Program(program)
-    tape = Tape(tape)
     try:
         while program.steps < max_steps:
-            # Run the callback and break if it returns True
-            if callback and callback(program, tape):
+            # Run the hooks and break if any of them returns True
+            if active_hooks is not None and _fire_hooks(active_hooks, program, tape):
                 break
 
             command = program.command
@@ -44,3 +133,197 @@ def run(
         pass
 
     return program, tape
+
+
+def run_backward(
+    program: _ProgramInitType,
+    tape: _TapeInitType,
+    steps: int,
+) -> tuple[Program, Tape]:
+    """Undo up to ``steps`` steps of a run, by running the inverse of each command (see
+    :meth:`Program.step_back`). The state of the program and tape before those steps is
+    recovered exactly, without any history, so this works after runs of any length. Stops
+    early at the start of the run (when the step count gets to 0). Runs on tapes which are
+    not circular cannot be undone (see :meth:`Program.step_back`).
+
+    >>> program, tape = run("(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)", "100")
+    >>> str(tape)
+    '010'
+    >>> program, tape = run_backward(program, tape, program.steps)
+    >>> program.pointer, program.steps, str(tape)
+    (0, 0, '100')
+    """
+    program = Program(program)
+    tape = tape.copy() if isinstance(tape, Tape) else Tape(tape)
+    if not tape.circular:
+        raise ValueError("Runs on tapes which are not circular cannot be undone.")
+
+    for _ in range(min(steps, program.steps)):
+        program.step_back(tape)
+
+    return program, tape
+
+
+class Progress(NamedTuple):
+    """The state of a run after each slice of :func:`iter_run`."""
+
+    program: Program
+    """The program being run. It is the same object after every slice."""
+    tape: Tape
+    """The tape being run on. It is the same object after every slice."""
+    steps: int
+    """The step count of the program after the slice."""
+    ran: int
+    """How many steps the slice ran."""
+    finished: bool
+    """Whether the program has finished."""
+
+
+def iter_run(
+    program: _ProgramInitType,
+    tape: _TapeInitType,
+    slice_steps: int = 1000,
+    max_steps: Optional[int] = None,
+    engine: str = "reference",
+    hooks: Optional[Hooks] = None,
+    tape_type: Optional[str] = None,
+    in_place: bool = False,
+) -> Generator[Progress, Optional[int], None]:
+    """Run the program ``slice_steps`` steps at a time, yielding a :class:`Progress`
+    after each slice. Each slice carries on with the same program and tape, which are
+    only copied once at the start like in :func:`run` (or not at all, with
+    ``in_place``), so runs can be interleaved by a scheduler at the cost of one call
+    per slice.
+
+    The run ends when the program finishes, when it reaches ``max_steps`` (if given), or
+    when a hook asks to stop. It can be cancelled at any time with ``close()``, which
+    leaves the program and tape as they were after the last slice, and the size of the
+    following slices can be changed by sending it with ``send()``. The ``engine``,
+    ``hooks`` and ``tape_type`` are as in :func:`run`, but the ``"compiled"`` engine is
+    not supported, since it only runs programs from the first command. The
+    ``"optimized"`` and ``"fast"`` engines keep their own copy of the cells between the
+    slices (see :func:`rbf_lang.optimizer.run_slices`), so the program and tape must not
+    be changed while they run.
+
+    >>> slices = iter_run("(>>*<<)>>(<(>*<)*<*(>>*<<)>>)<(>*<)", "100", slice_steps=10)
+    >>> first = next(slices)
+    >>> first.steps
+    10
+    >>> slices.send(3).steps  # The following slices are 3 steps long
+    13
+    >>> [(progress.steps, progress.finished) for progress in slices]
+    [(16, False), (19, False), (22, False), (25, True)]
+    >>> str(first.tape)  # The same tape, which has been run on since
+    '010'
+    """
+    if slice_steps < 1:
+        raise ValueError("slice_steps must be at least 1.")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r}. Expected one of {ENGINES}.")
+    if engine != "reference" and hooks:
+        raise ValueError(f"The {engine} engine does not support callbacks or hooks.")
+    if engine == "compiled":
+        raise ValueError(
+            "The compiled engine cannot run in slices. Use the optimized engine instead."
+        )
+    # Convert (or copy) the program and tape once, with an empty run
+    program, tape = run(program, tape, 0, tape_type=tape_type, in_place=in_place)
+    _check_tape(tape, engine)
+    return _iter_run(program, tape, slice_steps, max_steps, engine, hooks)
+
+
+def _iter_run(
+    program: Program,
+    tape: Tape,
+    slice_steps: int,
+    max_steps: Optional[int],
+    engine: str,
+    hooks: Optional[Hooks],
+) -> Generator[Progress, Optional[int], None]:
+    engine_slices = None
+    if engine != "reference":
+        from .optimizer import run_slices
+
+        engine_slices = run_slices(program, tape, exact=engine == "optimized")
+        next(engine_slices)
+
+    while not program.finished and (max_steps is None or program.steps < max_steps):
+        start = program.steps
+        stop = start + slice_steps
+        if max_steps is not None:
+            stop = min(stop, max_steps)
+        if engine_slices is not None:
+            engine_slices.send(stop)
+        else:
+            run(program, tape, stop, hooks=hooks, in_place=True)
+        # A slice which stopped short without finishing was stopped by a hook
+        stopped = not program.finished and program.steps < stop
+        budget = yield Progress(
+            program, tape, program.steps, program.steps - start, program.finished
+        )
+        if stopped:
+            return
+        if budget is not None:
+            if budget < 1:
+                raise ValueError("slice_steps must be at least 1.")
+            slice_steps = budget
+
+
+def _check_tape(tape: Tape, engine: str, detect_cycles: bool = False) -> None:
+    """Raise a ValueError if the engine, or cycle detection, cannot run on the tape. They
+    work on a copy of all the cells of a circular tape, so they need a dense, circular
+    one."""
+    if engine == "reference" and not detect_cycles:
+        return
+    if not tape.circular:
+        raise ValueError(
+            "Tapes which are not circular are only supported by the reference engine, "
+            "without cycle detection."
+        )
+    if not tape.dense:
+        raise ValueError(
+            "Sparse tapes are only supported by the reference engine, without cycle "
+            "detection."
+        )
+
+
+def _fire_hooks(hooks: Hooks, program: Program, tape: Tape) -> bool:
+    """Call the hooks subscribed to the events of the next step. Return True if any of
+    them asks to stop."""
+    steps = program.steps
+    for n, hook in hooks.every_n:
+        if steps % n == 0 and hook(program, tape):
+            return True
+
+    for hook in hooks.at_pointer.get(program.pointer, ()):
+        if hook(program, tape):
+            return True
+
+    command = program.command
+    if command == Command.LOOP_START:
+        triggered = hooks.loop_enter if tape.bit else []
+    elif command == Command.LOOP_END:
+        triggered = hooks.loop_exit if tape.bit else []
+    elif command == Command.TAPE_RIGHT:
+        wraps = tape.circular and tape.pointer == len(tape) - 1
+        triggered = hooks.wrap if wraps else []
+    elif command == Command.TAPE_LEFT:
+        triggered = hooks.wrap if tape.circular and tape.pointer == 0 else []
+    else:
+        triggered = []
+    return any(hook(program, tape) for hook in triggered)
+
+
+def _run_engine(engine: str, program: Program, tape: Tape, max_steps: int) -> bool:
+    """Run the program in place with one of the non-reference engines. Return True if
+    the program has finished."""
+    if engine == "compiled":
+        if program.pointer != 0:
+            return False
+        from .compiler import run_compiled
+
+        return run_compiled(program, tape, max_steps)
+    else:
+        from .optimizer import run_optimized
+
+        return run_optimized(program, tape, max_steps, exact=engine == "optimized")
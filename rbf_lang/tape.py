@@ -1,5 +1,5 @@
 import warnings
-from typing import Sequence, Union, overload, Optional
+from typing import Iterable, Sequence, Union, overload, Optional
 
 _TAPE_SIZE = 8
 
@@ -12,6 +12,13 @@ class Tape(Sequence[bool]):
     _tape: list[bool]
     _pointer: int
 
+    circular = True
+    """Whether moving off either end of the tape wraps around to the other end."""
+    dense = True
+    """Whether the tape stores every cell. The execution engines other than the reference
+    interpreter work on a copy of all the cells (see :meth:`_cells`), so they only run on
+    dense tapes."""
+
     def __init__(
         self,
         tape: _TapeInitType = _TAPE_SIZE,
@@ -25,7 +32,7 @@ class Tape(Sequence[bool]):
             self._tape = [bool(int(x)) for x in tape]
         elif isinstance(tape, Tape):
             # Copy the tape
-            self._tape = tape._tape.copy()
+            self._tape = list(tape.tape)
             if pointer is not None:
                 warnings.warn(
                     "Pointer argument is ignored when initializing Tape with another Tape. Set it to None to disable this warning.",
@@ -72,6 +79,16 @@ class Tape(Sequence[bool]):
         """Toggle the current cell."""
         self._tape[self._pointer] = not self._tape[self._pointer]
 
+    def _toggle_at(self, index: int) -> None:
+        """Toggle the cell at ``index`` without moving the tape head. Used by the execution
+        engines which only write back the cells they changed."""
+        self._tape[index] = not self._tape[index]
+
+    def _move_to(self, index: int) -> None:
+        """Move the tape head to the cell at ``index``. Used by the execution engines which
+        keep their own copy of the tape head."""
+        self._pointer = index
+
     def move_right(self, N: int = 1) -> None:
         """Move the tape head to the right."""
         self._pointer = (self._pointer + N) % len(self)
@@ -113,4 +130,495 @@ class Tape(Sequence[bool]):
 
     def copy(self) -> "Tape":
         """Return a copy of the tape."""
-        return Tape(self)
+        return type(self)(self)
+
+    def _cells(self) -> bytearray:
+        """Return the cells as a bytearray with one byte (0 or 1) per cell. Used by the
+        execution engines which work on the raw cells."""
+        return bytearray(self._tape)
+
+    def _load_cells(self, cells: bytearray) -> None:
+        """Replace the cells with the contents of a bytearray as returned by
+        :meth:`_cells`."""
+        self._tape = list(map(bool, cells))
+
+
+_BIT_TO_ASCII = bytes.maketrans(b"\x00\x01", b"01")
+_ASCII_TO_BIT = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class PackedTape(Tape):
+    """Tape which stores 8 cells per byte in a bytearray. It has the same API as
+    :class:`Tape`, but takes 1 bit per cell rather than 8 bytes, and equality,
+    serialization and conversion to a string run at C speed over the packed bytes.
+
+    Cell ``i`` is stored in bit ``7 - i % 8`` of byte ``i // 8``, so the packed bytes
+    read the same as the tape string, and unused bits in the last byte are always 0.
+    """
+
+    _data: bytearray
+    _length: int
+    _pointer: int
+    _hash: Optional[int]
+
+    def __init__(
+        self,
+        tape: _TapeInitType = _TAPE_SIZE,
+        pointer: Optional[int] = None,
+    ) -> None:
+        if isinstance(tape, int):
+            # Initialize the tape with all 0s
+            self._data = bytearray((tape + 7) // 8)
+            self._length = tape
+        elif isinstance(tape, str):
+            # Initialize the tape with the given string of 0s and 1s
+            self._set_string(tape)
+        elif isinstance(tape, Tape):
+            # Copy the tape
+            if isinstance(tape, PackedTape):
+                self._data = tape._data.copy()
+                self._length = tape._length
+            else:
+                self._load_cells(tape._cells())
+            if pointer is not None:
+                warnings.warn(
+                    "Pointer argument is ignored when initializing Tape with another Tape. Set it to None to disable this warning.",
+                    stacklevel=2,
+                )
+            pointer = tape._pointer
+        elif isinstance(tape, Sequence):
+            # Initialize the tape with the given sequence
+            self._load_cells(bytearray(bool(x) for x in tape))
+        else:
+            raise TypeError("Tape must be initialized with an int or a sequence.")
+
+        self._pointer = 0 if pointer is None else pointer
+        self._hash = None
+
+    @classmethod
+    def from_bytes(
+        cls,
+        data: bytes,
+        length: Optional[int] = None,
+        pointer: Optional[int] = None,
+    ) -> "PackedTape":
+        """Create a tape from packed bytes, as returned by :meth:`to_bytes`. By default
+        the tape is ``8 * len(data)`` cells long.
+
+        >>> PackedTape.from_bytes(b"\\xa0", 4)
+        PackedTape('1010')
+        """
+        length = 8 * len(data) if length is None else length
+        if not 0 <= length <= 8 * len(data):
+            raise ValueError(
+                f"Cannot make a tape of {length} cells from {len(data)} bytes."
+            )
+        tape = cls(0, pointer)
+        tape._data = bytearray(data[: (length + 7) // 8])
+        tape._length = length
+        if length % 8:
+            # Clear the unused bits in the last byte
+            tape._data[-1] &= (0xFF << (8 - length % 8)) & 0xFF
+        return tape
+
+    def to_bytes(self) -> bytes:
+        """Return the packed cells. See :meth:`from_bytes`."""
+        return bytes(self._data)
+
+    def _set_string(self, tape: str) -> None:
+        length = len(tape)
+        nbytes = (length + 7) // 8
+        value = int(tape.ljust(8 * nbytes, "0"), 2) if tape else 0
+        self._data = bytearray(value.to_bytes(nbytes, "big"))
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def tape(self) -> Sequence[bool]:
+        return list(map(bool, self._cells()))
+
+    @overload
+    def __getitem__(self, index: int) -> bool: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[bool]: ...
+
+    def __getitem__(
+        self, index_or_slice: Union[int, slice]
+    ) -> Union[bool, Sequence[bool]]:
+        if isinstance(index_or_slice, int):
+            index = index_or_slice
+            if index < 0:
+                index += self._length
+            if not 0 <= index < self._length:
+                raise IndexError("Tape index out of range.")
+            return bool(self._data[index >> 3] & (0x80 >> (index & 7)))
+        elif isinstance(index_or_slice, slice):
+            return [self[i] for i in range(*index_or_slice.indices(self._length))]
+        else:
+            raise TypeError("Index must be an int or a slice.")
+
+    def toggle(self) -> None:
+        """Toggle the current cell."""
+        self._data[self._pointer >> 3] ^= 0x80 >> (self._pointer & 7)
+        self._hash = None
+
+    def _toggle_at(self, index: int) -> None:
+        self._data[index >> 3] ^= 0x80 >> (index & 7)
+        self._hash = None
+
+    def _single_char_repr(self) -> str:
+        if not self._length:
+            return ""
+        value = int.from_bytes(self._data, "big")
+        return format(value, f"0{8 * len(self._data)}b")[: self._length]
+
+    def __repr__(self) -> str:
+        return f"PackedTape({self._single_char_repr()!r})"
+
+    def reset(self) -> None:
+        """Reset the tape to all 0s and move the head to the first cell."""
+        self._data = bytearray(len(self._data))
+        self._pointer = 0
+        self._hash = None
+
+    @property
+    def bit(self) -> bool:
+        return bool(self._data[self._pointer >> 3] & (0x80 >> (self._pointer & 7)))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PackedTape):
+            return self._length == other._length and self._data == other._data
+        elif isinstance(other, Tape):
+            return self._length == len(other) and self._cells() == other._cells()
+        elif isinstance(other, str):
+            return self._single_char_repr() == other
+        elif isinstance(other, Sequence):
+            return self.tape == [bool(x) for x in other]
+        else:
+            return False
+
+    def __hash__(self) -> int:
+        # Consistent with the equality with strings. Cached until the tape changes.
+        if self._hash is None:
+            self._hash = hash(self._single_char_repr())
+        return self._hash
+
+    def _cells(self) -> bytearray:
+        return bytearray(self._single_char_repr().encode().translate(_ASCII_TO_BIT))
+
+    def _load_cells(self, cells: bytearray) -> None:
+        self._set_string(cells.translate(_BIT_TO_ASCII).decode())
+        self._hash = None
+
+
+class SparseTape(Tape):
+    """Circular tape which only stores the positions of its set cells, so that it takes
+    memory in proportion to the number of 1s rather than to its size. Suited to very
+    large, mostly-zero tapes. It has the same API as :class:`Tape`, but only the
+    reference interpreter runs on it. Hashing it builds the tape string, like the other
+    tapes, so that equal tapes hash the same, but the hash is cached until the tape
+    changes.
+
+    >>> tape = SparseTape.from_ones([3, 10**9 - 1], 10**9)
+    >>> tape.move_left()
+    >>> tape.bit, tape.pointer
+    (True, 999999999)
+    >>> tape
+    SparseTape.from_ones([3, 999999999], 1000000000)
+    """
+
+    _ones: set[int]
+    _length: int
+    _pointer: int
+    _hash: Optional[int]
+
+    dense = False
+
+    def __init__(
+        self,
+        tape: _TapeInitType = _TAPE_SIZE,
+        pointer: Optional[int] = None,
+    ) -> None:
+        if isinstance(tape, int):
+            # Initialize the tape with all 0s
+            self._ones = set()
+            self._length = tape
+        elif isinstance(tape, str):
+            # Initialize the tape with the given string of 0s and 1s
+            self._ones = {i for i, x in enumerate(tape) if x == "1"}
+            self._length = len(tape)
+        elif isinstance(tape, Tape):
+            # Copy the tape
+            if isinstance(tape, SparseTape):
+                self._ones = tape._ones.copy()
+                self._length = tape._length
+            else:
+                self._load_cells(tape._cells())
+            if pointer is not None:
+                warnings.warn(
+                    "Pointer argument is ignored when initializing Tape with another Tape. Set it to None to disable this warning.",
+                    stacklevel=2,
+                )
+            pointer = tape._pointer
+        elif isinstance(tape, Sequence):
+            # Initialize the tape with the given sequence
+            self._ones = {i for i, x in enumerate(tape) if x}
+            self._length = len(tape)
+        else:
+            raise TypeError("Tape must be initialized with an int or a sequence.")
+
+        self._pointer = 0 if pointer is None else pointer
+        self._hash = None
+
+    @classmethod
+    def from_ones(
+        cls,
+        ones: Iterable[int],
+        length: int,
+        pointer: Optional[int] = None,
+    ) -> "SparseTape":
+        """Create a tape of ``length`` cells, where the cells at ``ones`` are set."""
+        tape = cls(length, pointer)
+        tape._ones = set(ones)
+        if any(not 0 <= i < length for i in tape._ones):
+            raise ValueError(f"Cell positions must be between 0 and {length - 1}.")
+        return tape
+
+    @property
+    def ones(self) -> list[int]:
+        """The positions of the set cells, in order."""
+        return sorted(self._ones)
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def tape(self) -> Sequence[bool]:
+        return list(map(bool, self._cells()))
+
+    @overload
+    def __getitem__(self, index: int) -> bool: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[bool]: ...
+
+    def __getitem__(
+        self, index_or_slice: Union[int, slice]
+    ) -> Union[bool, Sequence[bool]]:
+        if isinstance(index_or_slice, int):
+            index = index_or_slice
+            if index < 0:
+                index += self._length
+            if not 0 <= index < self._length:
+                raise IndexError("Tape index out of range.")
+            return index in self._ones
+        elif isinstance(index_or_slice, slice):
+            return [self[i] for i in range(*index_or_slice.indices(self._length))]
+        else:
+            raise TypeError("Index must be an int or a slice.")
+
+    def toggle(self) -> None:
+        """Toggle the current cell."""
+        self._ones ^= {self._pointer}
+        self._hash = None
+
+    def _toggle_at(self, index: int) -> None:
+        self._ones ^= {index}
+        self._hash = None
+
+    def _single_char_repr(self) -> str:
+        return self._cells().translate(_BIT_TO_ASCII).decode()
+
+    def __repr__(self) -> str:
+        return f"SparseTape.from_ones({self.ones!r}, {self._length})"
+
+    def reset(self) -> None:
+        """Reset the tape to all 0s and move the head to the first cell."""
+        self._ones = set()
+        self._pointer = 0
+        self._hash = None
+
+    @property
+    def bit(self) -> bool:
+        return self._pointer in self._ones
+
+    def __eq__(self, other: object) -> bool:
+        # Compare without expanding this tape, since it can be much larger than its 1s
+        if isinstance(other, SparseTape):
+            return self._length == other._length and self._ones == other._ones
+        elif isinstance(other, Tape):
+            if self._length != len(other):
+                return False
+            cells = other._cells()
+            return cells.count(1) == len(self._ones) and all(
+                cells[i] for i in self._ones
+            )
+        elif isinstance(other, str):
+            return (
+                len(other) == self._length
+                and other.count("1") == len(self._ones)
+                and other.count("0") == self._length - len(self._ones)
+                and all(other[i] == "1" for i in self._ones)
+            )
+        elif isinstance(other, Sequence):
+            return len(other) == self._length and self._ones == {
+                i for i, x in enumerate(other) if x
+            }
+        else:
+            return False
+
+    def __hash__(self) -> int:
+        # Consistent with the equality with strings. Cached until the tape changes.
+        if self._hash is None:
+            self._hash = hash(self._single_char_repr())
+        return self._hash
+
+    def _cells(self) -> bytearray:
+        cells = bytearray(self._length)
+        for i in self._ones:
+            cells[i] = 1
+        return cells
+
+    def _load_cells(self, cells: bytearray) -> None:
+        ones = set()
+        i = cells.find(1)
+        while i >= 0:
+            ones.add(i)
+            i = cells.find(1, i + 1)
+        self._ones = ones
+        self._length = len(cells)
+        self._hash = None
+
+
+class GrowableTape(Tape):
+    """Tape which grows instead of wrapping around. Moving off either end adds 0 cells
+    there, so the tape is as long as the stretch the head has visited. Growing to the left
+    shifts the cells to the right, so that the first cell is always cell 0.
+
+    The execution engines other than the reference interpreter assume a circular tape, so
+    they cannot run on a growable tape.
+
+    >>> tape = GrowableTape("1")
+    >>> tape.move_left()
+    >>> tape.toggle()
+    >>> tape.move_right(3)
+    >>> tape, tape.pointer
+    (GrowableTape('1100'), 3)
+    """
+
+    _offset: int
+    """The number of spare cells at the start of ``_tape``. Growing to the left uses them
+    up, and doubles them when they run out, so that it takes amortized constant time."""
+
+    circular = False
+
+    def __init__(
+        self,
+        tape: _TapeInitType = _TAPE_SIZE,
+        pointer: Optional[int] = None,
+    ) -> None:
+        super().__init__(tape, pointer)
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return len(self._tape) - self._offset
+
+    @property
+    def tape(self) -> Sequence[bool]:
+        return self._tape[self._offset :]
+
+    @overload
+    def __getitem__(self, index: int) -> bool: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[bool]: ...
+
+    def __getitem__(
+        self, index_or_slice: Union[int, slice]
+    ) -> Union[bool, Sequence[bool]]:
+        if isinstance(index_or_slice, int):
+            index = index_or_slice
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("Tape index out of range.")
+            return self._tape[self._offset + index]
+        elif isinstance(index_or_slice, slice):
+            return self._tape[self._offset :][index_or_slice]
+        else:
+            raise TypeError("Index must be an int or a slice.")
+
+    def toggle(self) -> None:
+        """Toggle the current cell."""
+        index = self._offset + self._pointer
+        self._tape[index] = not self._tape[index]
+
+    def _toggle_at(self, index: int) -> None:
+        index += self._offset
+        self._tape[index] = not self._tape[index]
+
+    @property
+    def bit(self) -> bool:
+        return self._tape[self._offset + self._pointer]
+
+    def move_right(self, N: int = 1) -> None:
+        """Move the tape head to the right, growing the tape if needed."""
+        self._pointer += N
+        if self._pointer >= len(self):
+            self._tape.extend([False] * (self._pointer - len(self) + 1))
+
+    def move_left(self, N: int = 1) -> None:
+        """Move the tape head to the left, growing the tape if needed."""
+        self._pointer -= N
+        if self._pointer < 0:
+            grow = -self._pointer
+            if grow > self._offset:
+                spare = max(grow - self._offset, len(self._tape))
+                self._tape[:0] = [False] * spare
+                self._offset += spare
+            self._offset -= grow
+            self._pointer = 0
+
+    def _single_char_repr(self) -> str:
+        return "".join("1" if bit else "0" for bit in self.tape)
+
+    def __repr__(self) -> str:
+        return f"GrowableTape({self._single_char_repr()!r})"
+
+    def reset(self) -> None:
+        """Reset the tape to all 0s and move the head to the first cell."""
+        self._tape = [False] * len(self)
+        self._offset = 0
+        self._pointer = 0
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Tape):
+            return len(self) == len(other) and self._cells() == other._cells()
+        elif isinstance(other, str):
+            return str(self) == other
+        elif isinstance(other, Sequence):
+            return self.tape == [bool(x) for x in other]
+        else:
+            return False
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def _cells(self) -> bytearray:
+        return bytearray(self.tape)
+
+    def _load_cells(self, cells: bytearray) -> None:
+        self._tape = list(map(bool, cells))
+        self._offset = 0
+
+
+TAPE_TYPES: dict[str, type[Tape]] = {
+    "list": Tape,
+    "packed": PackedTape,
+    "sparse": SparseTape,
+    "growable": GrowableTape,
+}
+"""The kinds of tape, by name. See ``tape_type`` in :func:`rbf_lang.run`."""
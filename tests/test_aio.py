@@ -0,0 +1,149 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+import pytest
+
+from rbf_lang import Program, Tape, run
+from rbf_lang.aio import arun
+from rbf_lang.hooks import Hooks
+from rbf_lang.bench import MOVE_RIGHT
+
+
+@pytest.mark.parametrize("pool", [None, "thread", "process"])
+def test_arun(pool: Optional[str]) -> None:
+    async def main() -> tuple[Program, Tape]:
+        if pool == "thread":
+            with ThreadPoolExecutor(2) as executor:
+                return await arun(MOVE_RIGHT, "100", slice_steps=3, executor=executor)
+        elif pool == "process":
+            with ProcessPoolExecutor(1) as process_executor:
+                return await arun(
+                    MOVE_RIGHT, "100", slice_steps=3, executor=process_executor
+                )
+        return await arun(MOVE_RIGHT, "100", slice_steps=3)
+
+    program, tape = asyncio.run(main())
+    expected_program, expected_tape = run(MOVE_RIGHT, "100")
+    assert tape == expected_tape == "010"
+    assert program.steps == expected_program.steps
+    assert program.finished
+
+
+def test_arun_yields() -> None:
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def main() -> None:
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0)
+        await arun("*(>)", 1000, max_steps=10_000, slice_steps=100)
+        ticker.cancel()
+
+    asyncio.run(main())
+    # The other task ran after each of the slices
+    assert ticks >= 20
+
+
+@pytest.mark.parametrize("pool", [None, "thread"])
+def test_arun_cancel(pool: Optional[str]) -> None:
+    program, tape = Program("*(>)"), Tape(1_000_000)
+    # Slices in a thread take long enough to be cancelled while they run
+    slice_steps = 10_000 if pool == "thread" else 100
+
+    async def main(executor: Optional[ThreadPoolExecutor]) -> None:
+        task = asyncio.create_task(
+            arun(
+                program,
+                tape,
+                max_steps=10**9,
+                slice_steps=slice_steps,
+                in_place=True,
+                executor=executor,
+            )
+        )
+        for _ in range(10):
+            await asyncio.sleep(0.001 if executor else 0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    if pool == "thread":
+        with ThreadPoolExecutor(1) as executor:
+            asyncio.run(main(executor))
+            steps, pointer = program.steps, tape.pointer
+            # Nothing runs on the program and tape after the task stops
+            time.sleep(0.05)
+            assert (program.steps, tape.pointer) == (steps, pointer)
+    else:
+        asyncio.run(main(None))
+    # The run stopped at the end of a slice
+    assert 0 < program.steps < 10**9
+    assert program.steps % 100 == 0
+    assert not program.finished
+
+
+def test_arun_limiter() -> None:
+    order: list[int] = []
+
+    def recorder(index: int) -> Hooks:
+        def record(program: Program, tape: Tape) -> bool:
+            order.append(index)
+            return False
+
+        hooks = Hooks()
+        hooks.every(10, record)
+        return hooks
+
+    async def main(limit: Optional[int]) -> None:
+        limiter = asyncio.Semaphore(limit) if limit is not None else None
+        await asyncio.gather(
+            *(
+                arun(
+                    "*(>)",
+                    100,
+                    slice_steps=20,
+                    hooks=recorder(index),
+                    limiter=limiter,
+                )
+                for index in range(2)
+            )
+        )
+
+    # Without a limiter, the runs take turns slice by slice
+    asyncio.run(main(None))
+    assert order[:4] == [0, 0, 1, 1]
+
+    # With a limiter of 1, the second run only starts after the first one
+    order.clear()
+    asyncio.run(main(1))
+    assert order == sorted(order)
+    assert set(order) == {0, 1}
+
+
+def test_arun_invalid() -> None:
+    async def main() -> None:
+        with pytest.raises(ValueError):
+            await arun(MOVE_RIGHT, "100", engine="unknown")
+        with pytest.raises(ValueError):
+            await arun(MOVE_RIGHT, "100", slice_steps=0)
+        with ProcessPoolExecutor(1) as executor:
+            with pytest.raises(ValueError):
+                await arun(
+                    Program(MOVE_RIGHT), Tape("100"), executor=executor, in_place=True
+                )
+            # The compiled engine runs the whole program in the pool, but not in slices
+            _program, tape = await arun(
+                MOVE_RIGHT, "100", engine="compiled", executor=executor
+            )
+            assert tape == "010"
+        with pytest.raises(ValueError):
+            await arun(MOVE_RIGHT, "100", engine="compiled")
+
+    asyncio.run(main())
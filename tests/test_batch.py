@@ -0,0 +1,52 @@
+import pytest
+from rbf_lang import run, Tape
+
+np = pytest.importorskip("numpy")
+
+from rbf_lang.batch import run_batch
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def test_move_right_all_inputs() -> None:
+    tapes = [format(i, "03b") for i in range(8)]
+    result = run_batch(MOVE_RIGHT, tapes)
+
+    for i, tape in enumerate(tapes):
+        program, expected = run(MOVE_RIGHT, tape)
+        assert result.tape(i) == expected
+        assert result.steps[i] == program.steps
+        assert result.pointers[i] == expected.pointer
+    assert result.finished.all()
+
+
+def test_diverging_loops() -> None:
+    # Scan right for the next set bit. Each row loops a different number of times.
+    tapes = ["10000001", "11000000", "10001000", "10000000"]
+    result = run_batch("(>)", tapes)
+
+    for i, tape in enumerate(tapes):
+        program, expected = run("(>)", tape)
+        assert result.steps[i] == program.steps
+        assert result.pointers[i] == expected.pointer
+
+
+def test_max_steps() -> None:
+    tapes = np.array([[1, 0, 0, 0, 0, 0, 0, 0], [1, 1, 0, 0, 0, 0, 0, 0]])
+    result = run_batch("(>)", tapes, max_steps=5)
+
+    assert result.steps.tolist() == [5, 3]
+    assert result.finished.tolist() == [False, True]
+    assert result.pointers.tolist() == [2, 1]
+
+
+def test_tape_pointers() -> None:
+    result = run_batch("*", [Tape("000", pointer=1), Tape("000", pointer=2)])
+    assert result.tapes.tolist() == [[0, 1, 0], [0, 0, 1]]
+
+    result = run_batch("*", np.zeros((2, 3)), pointers=[2, 0])
+    assert result.tapes.tolist() == [[0, 0, 1], [1, 0, 0]]
+
+
+def test_mismatched_tapes() -> None:
+    with pytest.raises(ValueError):
+        run_batch("*", ["000", "0000"])
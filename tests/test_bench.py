@@ -0,0 +1,96 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from rbf_lang import bench, run
+from rbf_lang.bench import (
+    MOVE_RIGHT,
+    Result,
+    benchmark,
+    compare,
+    load_results,
+    measure,
+    save_results,
+    table,
+    workloads,
+)
+
+
+def test_workloads() -> None:
+    for workload in workloads(scale=0.01):
+        program, _tape = run(workload.program, workload.tape, workload.max_steps)
+        assert program.steps > 0
+
+    move_right = workloads(scale=0.1)[0]
+    assert move_right.program == MOVE_RIGHT * 10
+    _program, tape = run(move_right.program, move_right.tape, move_right.max_steps)
+    assert tape == "0" * 10 + "10"
+
+
+def test_measure() -> None:
+    workload = workloads(scale=0.01)[0]
+    result = measure(workload, "optimized", "packed", repeat=2)
+    assert result.key == "move_right/optimized/packed"
+    assert result.steps == 25
+    assert result.seconds > 0
+    assert result.steps_per_second > 0
+    assert result.peak_memory > 0
+
+
+def test_measure_warm_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = []
+
+    def counting_run(*args: Any, **kwargs: Any) -> Any:
+        calls.append(kwargs["engine"])
+        return run(*args, **kwargs)
+
+    monkeypatch.setattr(bench, "run", counting_run)
+    measure(workloads(scale=0.01)[0], "compiled", "list", repeat=1)
+    # One run to warm up, one timed, and one to measure the memory
+    assert calls == ["compiled"] * 3
+
+
+def test_benchmark() -> None:
+    results = benchmark(
+        workloads(scale=0.01)[:2],
+        engines=["reference", "fast"],
+        tape_types=["list", "sparse", "growable"],
+        repeat=1,
+    )
+    # Sparse and growable tapes are only supported by the reference engine
+    assert [result.key for result in results] == [
+        "move_right/reference/list",
+        "move_right/reference/sparse",
+        "move_right/reference/growable",
+        "move_right/fast/list",
+        "nested/reference/list",
+        "nested/reference/sparse",
+        "nested/reference/growable",
+        "nested/fast/list",
+    ]
+    assert "move_right   reference  list" in table(results)
+
+
+def test_compare(tmp_path: Path) -> None:
+    baseline = [
+        Result("scan", "reference", "list", 1000, 0.01, 100),
+        Result("scan", "optimized", "list", 1000, 0.001, 100),
+    ]
+    path = tmp_path / "baseline.json"
+    save_results(baseline, path)
+    assert load_results(path) == baseline
+
+    results = [
+        Result("scan", "reference", "list", 1000, 0.005, 100),
+        Result("scan", "optimized", "list", 1000, 0.002, 100),
+        Result("scan", "fast", "list", 1000, 0.001, 100),
+    ]
+    comparisons = compare(results, load_results(path))
+    assert [(c.key, c.ratio) for c in comparisons] == [
+        ("scan/reference/list", 2.0),
+        ("scan/optimized/list", 0.5),
+    ]
+    assert [c.regressed(0.1) for c in comparisons] == [False, True]
+    assert not comparisons[1].regressed(0.6)
+    assert "2.00x" in table(results, comparisons)
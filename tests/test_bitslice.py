@@ -0,0 +1,37 @@
+from rbf_lang import run, Tape
+from rbf_lang.bitslice import run_exhaustive, run_lanes
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def test_same_as_run() -> None:
+    tapes = [Tape("10010", pointer=0), Tape("01100", pointer=3), Tape("11111")]
+    for source in [MOVE_RIGHT, "(>)", "*(*>)", "(>>*<<(>))"]:
+        result = run_lanes(source, tapes, max_steps=200)
+        for i, tape in enumerate(tapes):
+            program, expected = run(source, tape, max_steps=200)
+            assert result.tapes[i] == expected
+            assert result.tapes[i].pointer == expected.pointer
+            assert result.steps[i] == program.steps
+
+
+def test_max_steps() -> None:
+    result = run_lanes("(>)", ["10000000", "11000000"], max_steps=5)
+    assert result.steps == [5, 3]
+    assert result.finished == [False, True]
+    assert [tape.pointer for tape in result.tapes] == [2, 1]
+
+
+def test_exhaustive() -> None:
+    size = 4
+    result = run_exhaustive(MOVE_RIGHT, size)
+    assert all(result.finished)
+    for lane in range(2**size):
+        program, expected = run(MOVE_RIGHT, format(lane, f"0{size}b"))
+        assert result.tapes[lane] == expected
+        assert result.steps[lane] == program.steps
+
+
+def test_empty_program() -> None:
+    result = run_lanes("", ["01", "10"])
+    assert result.steps == [0, 0]
+    assert result.finished == [True, True]
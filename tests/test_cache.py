@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import pytest
+
+from rbf_lang import run, Program, PackedTape, GrowableTape
+from rbf_lang.cache import CacheStats, RunCache, content_hash
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def test_content_hash() -> None:
+    # The hash does not depend on the process, so it can be stored
+    assert content_hash("*>", "10") == "e8475c394a00b5d6e9ddb8893cc10dfb"
+    assert content_hash("*>", "10") == content_hash(Program("*>"), PackedTape("10"))
+    assert content_hash("*>", "10") != content_hash("*>", "100")
+    assert content_hash("*>", "10") != content_hash("*<", "10")
+
+    program, tape = run("*>", "10", max_steps=1)
+    assert content_hash(program, tape) != content_hash("*>", tape)
+
+
+def test_cache_hits() -> None:
+    cache = RunCache()
+    expected_program, expected_tape = run(MOVE_RIGHT, "100")
+    for _ in range(3):
+        program, tape = cache.run(MOVE_RIGHT, "100")
+        assert program.steps == expected_program.steps
+        assert program.pointer == expected_program.pointer
+        assert program.finished
+        assert tape == expected_tape
+        assert tape.pointer == expected_tape.pointer
+    assert cache.stats == CacheStats(hits=2, misses=1, size=1)
+
+    # The tape type is kept
+    _program, tape = cache.run(MOVE_RIGHT, PackedTape("100"))
+    assert isinstance(tape, PackedTape)
+    assert tape == "010"
+    assert cache.stats.hits == 3
+
+    cache.clear()
+    assert cache.stats == CacheStats(hits=0, misses=0, size=0)
+
+
+def test_cache_lru() -> None:
+    cache = RunCache(maxsize=2)
+    cache.run(MOVE_RIGHT, "100")
+    cache.run(MOVE_RIGHT, "000")
+    cache.run(MOVE_RIGHT, "100")
+    cache.run(MOVE_RIGHT, "110")  # Evicts "000", the least recently used
+    assert cache.stats == CacheStats(hits=1, misses=3, size=2)
+
+    cache.run(MOVE_RIGHT, "100")
+    cache.run(MOVE_RIGHT, "000")
+    assert cache.stats == CacheStats(hits=2, misses=4, size=2)
+
+
+def test_cache_max_steps() -> None:
+    cache = RunCache()
+    program, _tape = cache.run(MOVE_RIGHT, "100", max_steps=10)
+    assert program.steps == 10
+    assert not program.finished
+
+    # A run which ran out of steps is only valid for the same max_steps
+    program, _tape = cache.run(MOVE_RIGHT, "100", max_steps=10)
+    assert cache.stats.hits == 1
+    program, _tape = cache.run(MOVE_RIGHT, "100", max_steps=5)
+    assert program.steps == 5
+    assert cache.stats.misses == 2
+
+    # Carries on from the cached state with a larger budget
+    program, tape = cache.run(MOVE_RIGHT, "100", max_steps=1000)
+    assert program.finished
+    assert program.steps == 25
+    assert tape == "010"
+    assert cache.stats.misses == 3
+
+    # A finished run is valid for any large enough max_steps
+    cache.run(MOVE_RIGHT, "100", max_steps=25)
+    cache.run(MOVE_RIGHT, "100", max_steps=10**6)
+    assert cache.stats.hits == 3
+    program, _tape = cache.run(MOVE_RIGHT, "100", max_steps=24)
+    assert program.steps == 24
+    assert not program.finished
+    assert cache.stats.misses == 4
+
+    # ... and it is not replaced by a shorter run
+    program, _tape = cache.run(MOVE_RIGHT, "100", max_steps=100)
+    assert program.finished
+    assert cache.stats.hits == 4
+
+
+def test_cache_fast() -> None:
+    cache = RunCache()
+    cache.run(MOVE_RIGHT, "100", max_steps=10, engine="fast")
+    assert cache.stats.size == 0
+    cache.run(MOVE_RIGHT, "100", engine="fast")
+    assert cache.stats.size == 1
+
+
+def test_cache_growable() -> None:
+    # The result depends on how far the tape grows, which the cache does not store
+    cache = RunCache()
+    with pytest.raises(ValueError):
+        cache.run(">>>*", GrowableTape("1"), 100)
+    assert cache.stats == CacheStats(hits=0, misses=0, size=0)
+
+
+def test_cache_disk(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite"
+    with RunCache(path=path) as cache:
+        cache.run(MOVE_RIGHT, "100")
+        cache.run(MOVE_RIGHT, "000", max_steps=5)
+
+    # A new cache, e.g. after a restart, finds the results on disk
+    with RunCache(path=path) as cache:
+        program, tape = cache.run(MOVE_RIGHT, "100")
+        assert program.finished
+        assert tape == "010"
+        assert tape.pointer == 1
+        program, tape = cache.run(MOVE_RIGHT, "000", max_steps=5)
+        assert program.steps == 5
+        assert cache.stats == CacheStats(hits=2, misses=0, size=2)
+
+        cache.clear()
+
+    with RunCache(path=path) as cache:
+        cache.run(MOVE_RIGHT, "100")
+        assert cache.stats.misses == 1
@@ -0,0 +1,119 @@
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from rbf_lang import cli
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def run_cli(monkeypatch: pytest.MonkeyPatch, *args: str, stdin: str = "") -> list[str]:
+    monkeypatch.setattr(sys, "argv", ["rbf", *args])
+    monkeypatch.setattr(sys, "stdin", io.StringIO(stdin))
+    output = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", output)
+    cli.main()
+    return output.getvalue().split()
+
+
+def test_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert run_cli(monkeypatch, "run", "-t", "100", MOVE_RIGHT) == ["010"]
+
+
+def test_run_stdin(monkeypatch: pytest.MonkeyPatch) -> None:
+    stdin = "100\n000\n\n4\n"
+    output = run_cli(monkeypatch, "run", "--stdin", MOVE_RIGHT, stdin=stdin)
+    assert output == ["010", "000", "0000"]
+
+
+def test_run_stdin_flush(monkeypatch: pytest.MonkeyPatch) -> None:
+    class Output(io.StringIO):
+        flushed = ""
+
+        def flush(self) -> None:
+            self.flushed = self.getvalue()
+
+    output = Output()
+
+    def lines() -> Iterator[str]:
+        yield "100\n"
+        # The first result is written out before the next tape is read
+        assert output.flushed.split() == ["010"]
+        yield "000\n"
+
+    monkeypatch.setattr(sys, "argv", ["rbf", "run", "--stdin", MOVE_RIGHT])
+    monkeypatch.setattr(sys, "stdin", lines())
+    monkeypatch.setattr(sys, "stdout", output)
+    cli.main()
+    assert output.flushed.split() == ["010", "000"]
+
+
+def test_run_file(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    path = tmp_path / "move_right.rbf"
+    path.write_text("# move right\n" + MOVE_RIGHT + "  # done\n")
+    assert run_cli(monkeypatch, "run", "-t", "100", "-f", str(path)) == ["010"]
+
+    # Either a source or a file is required, but not both
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, "run", "-t", "100")
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, "run", "-t", "100", "-f", str(path), MOVE_RIGHT)
+
+
+def test_reverse(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    move_left = "(>*<)>(<<(>>*<<)*>*(>*<)>)<<(>>*<<)"
+    assert run_cli(monkeypatch, "reverse", MOVE_RIGHT) == [move_left]
+
+    source = tmp_path / "move_right.rbf"
+    destination = tmp_path / "move_left.rbf"
+    source.write_text("# move right\n" + MOVE_RIGHT + "\n")
+    run_cli(monkeypatch, "reverse", "-f", str(source), "-o", str(destination))
+    assert destination.read_text() == move_left
+    run_cli(monkeypatch, "reverse", move_left, "-o", str(destination))
+    assert destination.read_text() == MOVE_RIGHT
+
+
+def test_bench(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    path = tmp_path / "bench.json"
+    args = ["bench", "--scale", "0.01", "--repeat", "1", "--workload", "scan"]
+    args += ["--engine", "optimized", "--tape-type", "packed"]
+    output = run_cli(monkeypatch, *args, "--json", str(path))
+    assert output[:6] == ["workload", "engine", "tape", "steps", "steps/s", "peak"]
+    assert json.loads(path.read_text())["results"][0]["workload"] == "scan"
+
+    # The same results pass, with a generous tolerance for timing noise
+    run_cli(monkeypatch, *args, "--baseline", str(path), "--tolerance", "0.99")
+    # A baseline which was 1000 times as fast is a regression
+    data = json.loads(path.read_text())
+    data["results"][0]["seconds"] /= 1000
+    path.write_text(json.dumps(data))
+    with pytest.raises(SystemExit):
+        run_cli(monkeypatch, *args, "--baseline", str(path))
+
+
+def test_run_tape_types(monkeypatch: pytest.MonkeyPatch) -> None:
+    output = run_cli(monkeypatch, "run", "-t", "sparse:100", MOVE_RIGHT)
+    assert output == ["010"]
+    output = run_cli(monkeypatch, "run", "-t", "growable:0", "<*>>*")
+    assert output == ["101"]
+    with pytest.raises(ValueError):
+        run_cli(monkeypatch, "run", "-t", "infinite:8", MOVE_RIGHT)
+
+
+def test_profile(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    path = tmp_path / "profile.json"
+    output = run_cli(
+        monkeypatch, "profile", "-t", "100", MOVE_RIGHT, "--json", str(path)
+    )
+    assert output[-1] == "010"
+    assert json.loads(path.read_text())["steps"] == 25
+
+
+def test_debug(monkeypatch: pytest.MonkeyPatch) -> None:
+    output = run_cli(monkeypatch, "debug", "-t", "100", MOVE_RIGHT, stdin="c\nrs 2\n")
+    # The state after continuing to the end, then after going back 2 steps
+    lines = " ".join(output).split("(rbf)")
+    assert lines[1].split() == ["steps", "25", "|", "finished", "|", "01", "010"]
+    assert lines[2].split() == ["steps", "23", "|", "33", "<", "|", "02", "010"]
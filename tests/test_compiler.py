@@ -0,0 +1,55 @@
+import pytest
+from rbf_lang import run
+from rbf_lang.bench import MOVE_RIGHT
+from rbf_lang.compiler import generate_source
+from rbf_lang.program import Program
+
+
+@pytest.mark.parametrize(
+    "source, tape",
+    [
+        ("*>" * 8, 8),
+        ("()", 8),
+        ("*(>)", 8),
+        ("*(*)", 3),
+        (MOVE_RIGHT, "100"),
+        (MOVE_RIGHT * 3, "1000"),
+        ("", 4),
+    ],
+)
+@pytest.mark.parametrize("max_steps", [0, 1, 5, 17, 100, 1000])
+def test_same_as_reference(source: str, tape: str, max_steps: int) -> None:
+    expected_program, expected_tape = run(source, tape, max_steps=max_steps)
+    program, tape_ = run(source, tape, max_steps=max_steps, engine="compiled")
+
+    assert program.steps == expected_program.steps
+    assert program.pointer == expected_program.pointer
+    assert tape_ == expected_tape
+    assert tape_.pointer == expected_tape.pointer
+
+
+def test_deep_nesting() -> None:
+    # Deeper than the number of nested loops allowed in one Python function
+    source = "*" + "(*" * 40 + ">" + ")*" * 40
+    for max_steps in (10, 100, 1000):
+        expected_program, expected_tape = run(source, "11111", max_steps=max_steps)
+        program, tape = run(source, "11111", max_steps=max_steps, engine="compiled")
+        assert program.steps == expected_program.steps
+        assert tape == expected_tape
+
+
+def test_generate_source() -> None:
+    source = generate_source(Program("*>>(<)"))
+    assert "while True:" in source
+    assert "p = (p + 2) % n" in source
+    compile(source, "<test>", "exec")
+
+
+def test_callback_not_supported() -> None:
+    with pytest.raises(ValueError):
+        run("*", 8, callback=lambda program, tape: False, engine="compiled")
+
+
+def test_unknown_engine() -> None:
+    with pytest.raises(ValueError):
+        run("*", 8, engine="turbo")
@@ -0,0 +1,63 @@
+import pytest
+
+from rbf_lang import run, Program, Tape
+from rbf_lang.cycles import Cycle, run_detecting_cycles
+from rbf_lang.exceptions import NonTerminationError
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def test_cycle() -> None:
+    # Scanning for a set bit on a tape without any never finishes
+    program = Program("(>)", pointer=1)
+    with pytest.raises(NonTerminationError) as info:
+        run(program, 1000, max_steps=10**9, detect_cycles=True)
+    assert info.value.start == 0
+    assert info.value.period == 2000
+    assert str(info.value) == "Cycle of period 2000 entered at step 0."
+
+
+def test_cycle_in_place() -> None:
+    program = Program(MOVE_RIGHT, pointer=12)
+    tape = Tape("100")
+    cycle = run_detecting_cycles(program, tape, 1000)
+    assert cycle == Cycle(0, 28)
+    assert str(cycle) == "cycle of period 28 entered at step 0"
+
+    # Back in the start state
+    assert program.pointer == 12
+    assert program.steps == 28
+    assert tape == "100"
+    assert tape.pointer == 0
+
+
+def test_cycle_later_start() -> None:
+    program, tape = run(Program(MOVE_RIGHT, pointer=12), "100", max_steps=5)
+    with pytest.raises(NonTerminationError) as info:
+        run(program, tape, detect_cycles=True)
+    assert info.value.start == 5
+    assert info.value.period == 28
+
+
+def test_no_cycle() -> None:
+    source = "*>(*<)"
+    for pointer in range(len(source)):
+        for initial in ["0110", "0000", "1000"]:
+            expected_program, expected_tape = run(Program(source, pointer), initial)
+            program, tape = run(Program(source, pointer), initial, detect_cycles=True)
+            assert program.steps == expected_program.steps
+            assert program.pointer == expected_program.pointer
+            assert program.finished == expected_program.finished
+            assert tape == expected_tape
+            assert tape.pointer == expected_tape.pointer
+
+
+def test_no_cycle_max_steps() -> None:
+    program = Program("(>)", pointer=1)
+    program, tape = run(program, 1000, max_steps=100, detect_cycles=True)
+    assert program.steps == 100
+    assert tape.pointer == 50
+
+
+def test_cycle_engines() -> None:
+    with pytest.raises(ValueError):
+        run("*", 8, engine="compiled", detect_cycles=True)
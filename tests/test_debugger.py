@@ -0,0 +1,141 @@
+import io
+
+from rbf_lang import GrowableTape, run
+from rbf_lang.debugger import Breakpoint, Debugger
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def make_debugger(tape: str = "100") -> tuple[Debugger, io.StringIO]:
+    output = io.StringIO()
+    debugger = Debugger(MOVE_RIGHT, tape, stdin=io.StringIO(), stdout=output)
+    return debugger, output
+
+
+def test_debugger_step() -> None:
+    debugger, output = make_debugger()
+    debugger.onecmd("step 3")
+    assert debugger.program.steps == 3
+    assert output.getvalue().splitlines()[-1] == "steps 3 | 03 * | 02 100"
+
+    debugger.onecmd("rstep")
+    assert debugger.program.steps == 2
+    assert debugger.tape.pointer == 1
+
+    # Going back past the start stops at the start
+    debugger.onecmd("rstep 10")
+    assert debugger.program.steps == 0
+
+    debugger.onecmd("step -1")
+    assert output.getvalue().splitlines()[-1] == "Invalid count: '-1'"
+
+
+def test_debugger_continue() -> None:
+    debugger, output = make_debugger()
+    debugger.onecmd("continue")
+    program, tape = run(MOVE_RIGHT, "100")
+    assert debugger.program.finished
+    assert debugger.program.steps == program.steps
+    assert debugger.tape == tape
+    assert output.getvalue().splitlines()[-1].endswith("| finished | 01 010")
+
+    # And all the way back
+    debugger.onecmd("rcontinue")
+    assert debugger.program.steps == 0
+    assert debugger.tape == "100"
+
+
+def test_debugger_step_past_end() -> None:
+    debugger, output = make_debugger()
+    debugger.onecmd("continue")
+    steps = debugger.program.steps
+
+    # Stepping a finished program does nothing
+    debugger.onecmd("step")
+    debugger.onecmd("step 5")
+    assert debugger.program.finished
+    assert debugger.program.steps == steps
+    assert output.getvalue().splitlines()[-1] == f"steps {steps} | finished | 01 010"
+
+    # So going back still gets to the start
+    debugger.onecmd("rcontinue")
+    assert debugger.program.steps == 0
+    assert debugger.program.pointer == 0
+    assert debugger.tape == "100"
+
+
+def test_debugger_breakpoints() -> None:
+    debugger, output = make_debugger()
+    debugger.onecmd("break 4")
+    debugger.onecmd("break cell 2")
+    assert debugger.breakpoints == {
+        1: Breakpoint("pc", 4),
+        2: Breakpoint("cell", 2, True),
+    }
+
+    debugger.onecmd("continue")
+    assert debugger.program.pointer == 4
+    assert output.getvalue().splitlines()[-2] == "Breakpoint 1: pc 4"
+
+    debugger.onecmd("continue")
+    assert debugger.tape[2]
+    assert output.getvalue().splitlines()[-2] == "Breakpoint 2: cell 2 1"
+
+    # Back to the program pointer breakpoint
+    debugger.onecmd("rcontinue")
+    assert debugger.program.pointer == 4
+    assert debugger.program.steps == 4
+
+    debugger.onecmd("delete 1")
+    debugger.onecmd("delete 2")
+    assert debugger.breakpoints == {}
+    debugger.onecmd("continue")
+    assert debugger.program.finished
+
+
+def test_debugger_break_head() -> None:
+    debugger, _output = make_debugger()
+    debugger.onecmd("break head 2")
+    debugger.onecmd("continue")
+    assert debugger.tape.pointer == 2
+    assert debugger.program.steps == 3
+
+
+def test_debugger_invalid_breakpoint() -> None:
+    debugger, output = make_debugger()
+    for arg in ["x", "cell 1 2", "head"]:
+        debugger.onecmd(f"break {arg}")
+        assert output.getvalue().splitlines()[-1] == f"Invalid breakpoint: {arg!r}"
+    assert debugger.breakpoints == {}
+
+
+def test_debugger_max_steps() -> None:
+    output = io.StringIO()
+    debugger = Debugger(MOVE_RIGHT, "100", max_steps=5, stdout=output)
+    debugger.onecmd("continue")
+    assert debugger.program.steps == 5
+    assert (
+        output.getvalue().splitlines()[-2] == "Reached the maximum number of steps (5)"
+    )
+
+
+def test_debugger_cmdloop() -> None:
+    output = io.StringIO()
+    commands = io.StringIO("b 4\nc\nrs\nq\n")
+    debugger = Debugger(MOVE_RIGHT, "100", stdin=commands, stdout=output)
+    debugger.cmdloop()
+    assert debugger.program.steps == 3
+
+
+def test_debugger_growable() -> None:
+    output = io.StringIO()
+    debugger = Debugger("<*", GrowableTape("0"), stdin=io.StringIO(), stdout=output)
+    debugger.onecmd("step")
+    assert debugger.tape == "00"
+
+    # Going back is not possible, since the tape has grown
+    for command in ("rstep", "rcontinue"):
+        debugger.onecmd(command)
+        assert output.getvalue().splitlines()[-1] == (
+            "Cannot go back on a tape which is not circular"
+        )
+        assert debugger.program.steps == 1
@@ -0,0 +1,112 @@
+from typing import Callable
+
+import pytest
+
+from rbf_lang import run, Hooks, Program, Tape
+from rbf_lang.hooks import Hook
+
+
+def recorder(seen: list[int], key: Callable[[Program, Tape], int]) -> Hook:
+    """Make a hook which records ``key`` every time it is called."""
+
+    def hook(program: Program, tape: Tape) -> bool:
+        seen.append(key(program, tape))
+        return False
+
+    return hook
+
+
+def test_hooks_empty() -> None:
+    hooks = Hooks()
+    assert not hooks
+
+    program, tape = run("(>)", "10010", hooks=hooks)
+    assert program.steps == 7
+    assert tape == "10010"
+
+
+def test_hooks_every() -> None:
+    hooks = Hooks()
+    seen: list[int] = []
+    hooks.every(3, recorder(seen, lambda program, tape: program.steps))
+    assert hooks
+
+    program, _tape = run("*>" * 5, 8, hooks=hooks)
+    assert program.steps == 10
+    assert seen == [0, 3, 6, 9]
+
+    with pytest.raises(ValueError):
+        hooks.every(0, lambda program, tape: False)
+
+
+def test_hooks_loop_enter_exit() -> None:
+    hooks = Hooks()
+    entered: list[int] = []
+    exited: list[int] = []
+    hooks.on_loop_enter(recorder(entered, lambda program, tape: tape.pointer))
+    hooks.on_loop_exit(recorder(exited, lambda program, tape: tape.pointer))
+
+    run("(>)", "10010", hooks=hooks)
+    assert entered == [0]
+    assert exited == [3]
+
+    # A loop which is skipped is neither entered nor exited
+    entered.clear()
+    exited.clear()
+    run("(>)", "00010", hooks=hooks)
+    assert entered == []
+    assert exited == []
+
+
+def test_hooks_wrap() -> None:
+    hooks = Hooks()
+    wrapped: list[int] = []
+    hooks.on_wrap(recorder(wrapped, lambda program, tape: program.pointer))
+
+    run(">>><", 3, hooks=hooks)
+    assert wrapped == [2, 3]
+
+
+def test_hooks_at() -> None:
+    hooks = Hooks()
+    seen: list[int] = []
+    hooks.at(1, recorder(seen, lambda program, tape: tape.pointer))
+
+    run("(>)", "10010", hooks=hooks)
+    assert seen == [0, 1, 2]
+
+
+def test_hooks_stop() -> None:
+    hooks = Hooks()
+    hooks.on_loop_exit(lambda program, tape: True)
+
+    program, tape = run("(>)", "10010", hooks=hooks)
+    # Stopped just before the loop end which would exit the loop
+    assert program.pointer == 2
+    assert tape.pointer == 3
+
+
+def test_hooks_with_callback() -> None:
+    hooks = Hooks()
+    seen: list[int] = []
+    hooks.every(2, recorder(seen, lambda program, tape: program.steps))
+
+    def callback(program: Program, tape: Tape) -> bool:
+        return program.steps == 5
+
+    program, _tape = run("*>" * 8, 8, hooks=hooks, callback=callback)
+    assert program.steps == 5
+    assert seen == [0, 2, 4]
+    # The callback is not added to the given hooks
+    assert len(hooks.every_n) == 1
+
+
+def test_hooks_engines() -> None:
+    hooks = Hooks()
+    hooks.on_wrap(lambda program, tape: False)
+    with pytest.raises(ValueError):
+        run("*>", 8, engine="compiled", hooks=hooks)
+
+    # Empty hooks are fine with any engine
+    program, _tape = run("*>", 8, engine="compiled", hooks=Hooks())
+    assert program.steps == 2
@@ -0,0 +1,189 @@
+import pytest
+from rbf_lang import run, Program, PackedTape, Tape
+from rbf_lang.tape import _TapeInitType
+from rbf_lang.optimizer import OpCode, _scan, optimize, run_slices
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def test_fused_moves() -> None:
+    ops = optimize(Program(">>>><<"))
+    assert len(ops) == 1
+    assert ops[0].code == OpCode.MOVE
+    assert ops[0].arg == 2
+    assert ops[0].weight == 6
+
+
+def test_cancelled_commands() -> None:
+    # Everything cancels out, but the steps are still accounted for
+    ops = optimize(Program("*><**>**<*"))
+    assert len(ops) == 1
+    assert ops[0].code == OpCode.MOVE
+    assert ops[0].arg == 0
+    assert ops[0].weight == 10
+
+    # The cancelled commands inside the loop are carried by the closing bracket
+    ops = optimize(Program("(**><)"))
+    assert [op.code for op in ops] == [OpCode.LOOP_START, OpCode.LOOP_END]
+    assert [op.weight for op in ops] == [1, 5]
+    assert ops[1].pointer == 1
+
+
+def test_jump_targets() -> None:
+    ops = optimize(Program("*(>(<)*)>"))
+    codes = [op.code for op in ops]
+    assert codes[ops[1].arg - 1] == OpCode.LOOP_END
+    assert ops[ops[1].arg - 1].arg == 2
+
+
+@pytest.mark.parametrize(
+    "source, tape",
+    [
+        ("*>" * 8, 8),
+        ("*(>)", 8),
+        ("*(>>*<<>*<)", 5),
+        (MOVE_RIGHT * 3, "1000"),
+        ("*><*", 2),
+    ],
+)
+@pytest.mark.parametrize("max_steps", [0, 1, 5, 17, 100, 1000])
+def test_same_as_reference(source: str, tape: str, max_steps: int) -> None:
+    expected_program, expected_tape = run(source, tape, max_steps=max_steps)
+    program, tape_ = run(source, tape, max_steps=max_steps, engine="optimized")
+
+    assert program.steps == expected_program.steps
+    assert program.pointer == expected_program.pointer
+    assert tape_ == expected_tape
+    assert tape_.pointer == expected_tape.pointer
+
+
+def test_fast_mode() -> None:
+    program, tape = run(MOVE_RIGHT, "100", engine="fast")
+    assert tape == "010"
+    assert program.steps == 25
+
+    # The step budget is not exact, but the run still stops
+    program, tape = run("*(>)", 8, max_steps=10, engine="fast")
+    assert 10 <= program.steps < 12
+
+
+def test_blocks() -> None:
+    # The loop body is a single block per iteration
+    ops = optimize(Program("(>>*<<)"))
+    assert [op.code for op in ops] == [OpCode.LOOP_START, OpCode.BLOCK, OpCode.LOOP_END]
+    assert ops[1].offsets == (2,)
+    assert ops[1].arg == 0
+    assert ops[1].weight == 5
+
+    # Toggles which cancel out are dropped from the block
+    ops = optimize(Program("*>*<*<*>>"))
+    assert len(ops) == 1
+    assert ops[0].code == OpCode.BLOCK
+    assert ops[0].offsets == (-1, 1)
+    assert ops[0].arg == 1
+    assert ops[0].weight == 9
+
+
+@pytest.mark.parametrize("max_steps", range(12))
+def test_blocks_wrap(max_steps: int) -> None:
+    # The offsets of a block can be further apart than the size of the tape
+    source = "*>>>*>*<<<<*"
+    expected_program, expected_tape = run(source, "01", max_steps=max_steps)
+    program, tape = run(source, "01", max_steps=max_steps, engine="optimized")
+    assert program.steps == expected_program.steps
+    assert program.pointer == expected_program.pointer
+    assert tape == expected_tape
+    assert tape.pointer == expected_tape.pointer
+
+
+def test_scan() -> None:
+    ops = optimize(Program("*(>>)"))
+    assert [op.code for op in ops] == [
+        OpCode.TOGGLE,
+        OpCode.SCAN,
+        OpCode.MOVE,
+        OpCode.LOOP_END,
+    ]
+    assert ops[1].arg == 4
+
+    # Loops which also toggle are not scans
+    ops = optimize(Program("*(>*)"))
+    assert ops[1].code == OpCode.LOOP_START
+
+
+@pytest.mark.parametrize("source", ["*(>)", "*(>>)", "*(<<<)", "*(>><)", "*(><)"])
+@pytest.mark.parametrize("tape", [1, 7, "0010010", "1000000000010", PackedTape(30)])
+def test_scan_same_as_reference(source: str, tape: _TapeInitType) -> None:
+    expected_program, _tape = run(source, tape, max_steps=10**6)
+    # Including budgets which run out in the middle of a scan
+    for max_steps in [*range(expected_program.steps + 2), 10**6]:
+        expected_program, expected_tape = run(source, tape, max_steps=max_steps)
+        program, tape_ = run(source, tape, max_steps=max_steps, engine="optimized")
+        assert program.steps == expected_program.steps
+        assert program.pointer == expected_program.pointer
+        assert program.finished == expected_program.finished
+        assert tape_ == expected_tape
+        assert tape_.pointer == expected_tape.pointer
+
+
+def test_scan_long() -> None:
+    program, tape = run("*(>)", PackedTape(10**5), max_steps=10**6, engine="optimized")
+    assert program.finished
+    assert program.steps == 2 + 2 * 10**5
+    assert tape.pointer == 0
+
+
+@pytest.mark.parametrize("source", ["*(>)", "*(>>*<<>*<)", MOVE_RIGHT * 3, "*(><)"])
+@pytest.mark.parametrize("tape", ["1000", "0010010", PackedTape("10010")])
+@pytest.mark.parametrize("slice_steps", [1, 2, 3, 7])
+def test_slices_same_as_reference(
+    source: str, tape: _TapeInitType, slice_steps: int
+) -> None:
+    expected_program, expected_tape = run(source, tape, max_steps=200)
+    program, tape_ = run(source, tape, 0, in_place=False)
+    slices = run_slices(program, tape_)
+    finished = next(slices)
+    # The program and tape are up to date after every slice
+    for max_steps in range(slice_steps, 200 + slice_steps, slice_steps):
+        if finished:
+            break
+        finished = slices.send(min(max_steps, 200))
+        reference_program, reference_tape = run(source, tape, max_steps=max_steps)
+        assert program.steps == reference_program.steps
+        assert program.pointer == reference_program.pointer
+        assert tape_ == reference_tape
+        assert tape_.pointer == reference_tape.pointer
+    assert program.finished == expected_program.finished
+    assert tape_ == expected_tape
+
+
+def test_slices_scan() -> None:
+    # A long scan stops at the end of each slice, and carries on in the next one
+    program, tape = Program("(>)"), Tape("1" + "0" * 99_999)
+    slices = run_slices(program, tape)
+    next(slices)
+    for max_steps in range(101, 10_000, 101):
+        assert not slices.send(max_steps)
+        assert program.steps == max_steps
+        assert tape.pointer == max_steps // 2
+    assert tape == "1" + "0" * 99_999
+
+    # Starting from a program and tape which are part way through a scan
+    program, tape = run("*(>)", "0000100", max_steps=5)
+    slices = run_slices(program, tape)
+    next(slices)
+    assert slices.send(100)
+    expected_program, expected_tape = run("*(>)", "0000100")
+    assert program.steps == expected_program.steps
+    assert tape.pointer == expected_tape.pointer
+
+
+def test_scan_limit() -> None:
+    data = bytearray([1, 0, 0, 0, 1, 0])
+    assert _scan(data, 0, 1) == 4
+    assert _scan(data, 1, 1) == 3
+    assert _scan(data, 1, 1, 3) == 3
+    assert _scan(data, 1, 1, 2) == 0
+    assert _scan(data, 1, -1) == 1
+    # The set cells out of reach of the stride are never found
+    assert _scan(data, 1, 2) == 0
+    assert _scan(data, 1, 0) == 0
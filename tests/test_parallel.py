@@ -0,0 +1,38 @@
+import pytest
+from rbf_lang import run, run_many, PackedTape
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def test_ordered() -> None:
+    tapes = [format(i, "04b") for i in range(16)]
+    results = list(run_many(MOVE_RIGHT, tapes, workers=2, chunksize=3))
+
+    assert len(results) == len(tapes)
+    for tape, (program, result) in zip(tapes, results):
+        expected_program, expected_tape = run(MOVE_RIGHT, tape)
+        assert result == expected_tape
+        assert program.steps == expected_program.steps
+        assert program.pointer == expected_program.pointer
+        assert program == MOVE_RIGHT
+
+
+def test_unordered() -> None:
+    tapes = (format(i, "05b") for i in range(32))
+    results = dict(run_many("(>)", tapes, workers=2, chunksize=5, ordered=False))
+
+    assert sorted(results) == list(range(32))
+    for i, (program, tape) in results.items():
+        expected_program, expected_tape = run("(>)", format(i, "05b"))
+        assert tape.pointer == expected_tape.pointer
+        assert program.steps == expected_program.steps
+
+
+def test_options() -> None:
+    tapes = [PackedTape("100"), PackedTape("010")]
+    results = list(run_many("*(>)", tapes, max_steps=3, workers=1, engine="compiled"))
+
+    assert [program.steps for program, _tape in results] == [2, 3]
+    assert all(isinstance(tape, PackedTape) for _program, tape in results)
+
+    with pytest.raises(ValueError):
+        run_many("*", tapes, engine="turbo")
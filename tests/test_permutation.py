@@ -0,0 +1,67 @@
+import pytest
+from rbf_lang import run, reverse_program
+
+np = pytest.importorskip("numpy")
+
+from rbf_lang.permutation import Permutation, program_permutation
+from rbf_lang.bench import MOVE_RIGHT
+
+# Toggles bit 1 if bit 0 is set, leaving the tape head at cell 0
+COPY = "(>*<)"
+
+
+def test_permutation_matches_run() -> None:
+    for source, size in [(MOVE_RIGHT, 3), (MOVE_RIGHT, 5), (COPY, 4)]:
+        permutation = program_permutation(source, size)
+        assert len(permutation) == 2**size
+        for state in range(2**size):
+            tape = format(state, f"0{size}b")
+            _program, expected = run(source, tape)
+            assert permutation(tape) == expected
+            assert permutation.mapping[state] == int(str(expected), 2)
+
+
+def test_permutation_dtype() -> None:
+    assert program_permutation(COPY, 4).mapping.dtype == np.uint8
+    assert program_permutation(COPY, 9).mapping.dtype == np.uint16
+    with pytest.raises(ValueError):
+        program_permutation(COPY, 4).mapping[0] = 1
+
+
+def test_permutation_compose() -> None:
+    toggle = program_permutation("*", 3)
+    copy = program_permutation(COPY, 3)
+    assert toggle.compose(copy) == program_permutation("*" + COPY, 3)
+    assert copy.compose(toggle) == program_permutation(COPY + "*", 3)
+    assert toggle.compose(copy) != copy.compose(toggle)
+
+    with pytest.raises(ValueError):
+        toggle.compose(program_permutation("*", 4))
+
+
+def test_permutation_invert() -> None:
+    source = COPY + "*>*<" + COPY
+    permutation = program_permutation(source, 4)
+    assert permutation.invert() == program_permutation(reverse_program(source), 4)
+    assert permutation.compose(permutation.invert()) == Permutation.identity(4)
+    assert permutation.invert().invert() == permutation
+
+
+def test_permutation_eq() -> None:
+    assert program_permutation("**", 3) == Permutation.identity(3)
+    assert program_permutation("**", 3) != Permutation.identity(4)
+    assert hash(program_permutation("**", 3)) == hash(Permutation.identity(3))
+    assert program_permutation("**", 3) != "**"
+
+
+def test_permutation_errors() -> None:
+    with pytest.raises(ValueError, match="does not finish"):
+        program_permutation(MOVE_RIGHT, 3, max_steps=10)
+    with pytest.raises(ValueError, match="tape head"):
+        program_permutation(">(>>*>)()", 2)
+    with pytest.raises(ValueError):
+        Permutation(np.array([0, 0, 1, 2]), 2)
+    with pytest.raises(ValueError):
+        Permutation(np.array([0, 1]), 2)
+    with pytest.raises(ValueError):
+        program_permutation(COPY, 0)
@@ -0,0 +1,80 @@
+import json
+
+from rbf_lang import run
+from rbf_lang.profiler import profile
+from rbf_lang.bench import MOVE_RIGHT
+
+
+def test_profile_counts() -> None:
+    result = profile(MOVE_RIGHT, "100")
+    program, tape = run(MOVE_RIGHT, "100")
+
+    # Same result as a normal run
+    assert result.tape == tape
+    assert result.program.steps == program.steps
+    assert sum(result.counts) == program.steps
+    assert result.counts[12:15] == [0, 0, 0]
+
+
+def test_profile_loops() -> None:
+    # The inner loop runs 2 iterations, then 1, then is skipped
+    result = profile("(>(>)>)", "1101000", max_steps=100)
+    assert sorted(result.loops) == [0, 2]
+
+    outer = result.loops[0]
+    assert (outer.start, outer.end) == (0, 6)
+    assert outer.entered == 1
+    assert outer.skipped == 0
+
+    inner = result.loops[2]
+    assert inner.entered + inner.skipped == result.counts[2]
+    assert inner.repeated + inner.exited == result.counts[4]
+    assert sum(inner.iterations.values()) == inner.entered + inner.skipped
+    assert sum(k * v for k, v in inner.iterations.items()) == result.counts[3]
+
+
+def test_profile_out_of_steps() -> None:
+    # The run stops in the middle of the loop, so there is no complete pass to count
+    result = profile("(>)", "10010", max_steps=4)
+    assert result.program.steps == 4
+    assert result.loops[0].repeated == 1
+    assert result.loops[0].iterations == {}
+
+
+def test_profile_empty() -> None:
+    result = profile("", "101")
+    assert result.counts == []
+    assert result.loops == {}
+    assert result.listing().startswith("steps: 0")
+
+
+def test_profile_listing() -> None:
+    lines = profile("*(>)", "00010").listing(width=4).splitlines()
+    assert lines[0] == "steps: 8 (max 1000)"
+    assert lines[2].split() == ["0", "*", "1", "##"]
+    assert lines[3].split() == [
+        *["1", "(", "1", "##", "enter", "1", "skip", "0"],
+        *["|", "iterations", "3x1"],
+    ]
+    assert lines[4].split() == ["2", ">", "3", "####"]
+    assert lines[5].split() == ["3", ")", "3", "####", "repeat", "2", "exit", "1"]
+
+
+def test_profile_json() -> None:
+    result = profile("(>)", "10010")
+    data = json.loads(json.dumps(result.to_dict()))
+    assert data["program"] == "(>)"
+    assert data["tape"] == "10010"
+    assert data["steps"] == 7
+    assert data["counts"] == [1, 3, 3]
+    assert data["loops"] == [
+        {
+            "start": 0,
+            "end": 2,
+            "entered": 1,
+            "skipped": 0,
+            "repeated": 2,
+            "exited": 1,
+            "iterations": {"3": 1},
+        }
+    ]
@@ -1,7 +1,24 @@
+import io
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import pytest
-from rbf_lang.program import Program, ProgramPointerError, InvalidProgramError
+from rbf_lang import program as program_module
+from rbf_lang.compiler import compile_program
+from rbf_lang.optimizer import OpCode, optimize
+from rbf_lang.program import (
+    Code,
+    CommandView,
+    Program,
+    ProgramPointerError,
+    InvalidProgramError,
+)
+from rbf_lang.reverse import reverse_program
 
 from rbf_lang.command import Command
+from rbf_lang.tape import Tape
+from rbf_lang.bench import MOVE_RIGHT
 
 
 def test_run() -> None:
@@ -210,12 +227,175 @@ def test_loop_end_nested_brackets() -> None:
     assert program.steps == 6
 
 
+def test_loop_jumps_long_body() -> None:
+    body = "*>" * 1000
+    source = f"({body}({body}){body})*"
+    program = Program(source)
+
+    program.loop_start(False)
+    assert program.pointer == len(source) - 1
+    assert program.steps == 1
+
+    program.reset()
+    program.move_right(len(source) - 2)
+    assert program.command == Command.LOOP_END
+
+    program.loop_end(False)
+    assert program.pointer == 1
+    assert program.steps == len(source) - 1
+
+
 def test_invalid_program() -> None:
     source = "*)"
     with pytest.raises(InvalidProgramError):
         Program(source)
 
 
+def test_views() -> None:
+    program = Program("*>(<)*")
+    view = program.program
+    assert isinstance(view, CommandView)
+    assert view == program[:]
+    assert view == list(program)
+    assert view[2] == Command.LOOP_START
+    assert view[-1] == Command.TOGGLE
+    assert view[1:4] == [Command.TAPE_RIGHT, Command.LOOP_START, Command.TAPE_LEFT]
+    assert str(view[1:4]) == ">(<"
+    assert view[::-1] == program[::-1]
+    assert view[1:4] != view[2:5]
+    with pytest.raises(TypeError):
+        view._code[0] = ord("*")
+
+    # Views can be used to make new programs
+    assert Program(view[2:5]) == "(<)"
+    assert reverse_program(view) == Program("*(>)<*").program
+    assert reverse_program(program) == "*(>)<*"
+
+
+def test_copy_shares_code() -> None:
+    program = Program("*>(<)*" * 1000)
+    program_2 = Program(program)
+    assert program_2.code is program.code
+    assert program_2._opcodes is program._opcodes
+    assert program_2._jumps is program._jumps
+    assert program_2 == program
+    assert Program("*>(<)*" * 1000) == program
+    assert Program("*>(<)*" * 999 + "*>(<)>") != program
+
+
+def test_code() -> None:
+    code = Code("*>(<)  # comment")
+    assert str(code) == "*>(<)"
+    assert len(code) == 5
+    assert code.opcodes == b"*>(<)"
+    assert code == Code([Command.TOGGLE, Command.TAPE_RIGHT] + list(Program("(<)")))
+    assert hash(code) == hash(Code("*>(<)"))
+
+    # Programs made from the same code share it, but each has its own state
+    first, second = Program(code), Program(code, pointer=2)
+    first.move_right()
+    assert first.code is second.code is code
+    assert (first.pointer, first.steps) == (1, 1)
+    assert (second.pointer, second.steps) == (2, 0)
+
+    # The code is immutable, and programs only hold their state and the code
+    with pytest.raises(AttributeError):
+        code.foo = 1  # type: ignore[attr-defined]
+    with pytest.raises(AttributeError):
+        first.foo = 1  # type: ignore[attr-defined]
+    with pytest.raises(TypeError):
+        Code(1)  # type: ignore[arg-type]
+
+
+def test_code_pickle() -> None:
+    program = Program("*>(<)", pointer=1)
+    program.code._compiled("test", lambda: "compiled")
+    copy = pickle.loads(pickle.dumps(program))
+    assert copy == program
+    assert copy.pointer == 1
+    assert copy._jumps == program._jumps
+    # The compiled forms are built again where they are needed
+    assert copy.code._compiled("test", lambda: "again") == "again"
+    assert program.code._compiled("test", lambda: "again") == "compiled"
+
+
+def test_code_compiled_threads() -> None:
+    code = Code("*>" * 10)
+    built = []
+
+    def build() -> int:
+        built.append(1)
+        return len(built)
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(
+            executor.map(lambda _: code._compiled("test", build), range(100))
+        )
+    assert results == [1] * 100
+    assert built == [1]
+
+
+def test_code_compiled_without_source() -> None:
+    # A program read from a file is compiled without ever building its source string
+    program = Program.from_file(io.BytesIO(b"*(>)# comment"))
+    assert program.code._source is None
+    compile_program(program)
+    optimize(program)
+    assert program.code._source is None
+    assert compile_program(program) is compile_program(Program(program))
+
+
+def test_invalid_commands() -> None:
+    with pytest.raises(InvalidProgramError, match="'é' is not a valid Command"):
+        Program("*é")
+    with pytest.raises(InvalidProgramError):
+        Program(["*", ">"])  # type: ignore[list-item]
+    # Enums which are not Commands are rejected, even if their values are characters
+    with pytest.raises(InvalidProgramError, match="'#' is not a valid Command"):
+        Program([OpCode.TOGGLE, OpCode.BLOCK])  # type: ignore[list-item]
+    with pytest.raises(InvalidProgramError, match="'#' is not a valid Command"):
+        Code([OpCode.BLOCK])  # type: ignore[list-item]
+
+
+SOURCE = """
+# x=?, y=0, f=0
+(>>*<<)        # set f if x is set
+>>(            # if f is set
+\t<(>*<)*    # set y
+\t<*(>>*<<)  # unset x
+>>)\r
+<(>*<)         # if y is set, unset f
+"""
+
+
+def test_from_file(tmp_path: Path) -> None:
+    path = tmp_path / "program.rbf"
+    path.write_bytes(SOURCE.encode())
+    expected = MOVE_RIGHT
+    assert Program.from_file(path) == expected
+    assert Program.from_file(str(path)) == expected
+    assert Program.from_file(io.BytesIO(SOURCE.encode())) == expected
+    assert Program.from_file(path, pointer=3).pointer == 3
+
+    path.write_bytes(b"")
+    assert len(Program.from_file(path)) == 0
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_from_file_chunks(monkeypatch: pytest.MonkeyPatch, chunk_size: int) -> None:
+    # Comments and commands are split across the chunks in every possible way
+    monkeypatch.setattr(program_module, "_CHUNK_SIZE", chunk_size)
+    program = Program.from_file(io.BytesIO(SOURCE.encode()))
+    assert program == Program(SOURCE.replace("\t", "").replace("\r", ""))
+
+    with pytest.raises(
+        InvalidProgramError, match="'x' is not a valid Command \\(at byte 5\\)"
+    ):
+        Program.from_file(io.BytesIO(b"*#x\n*x*"))
+    with pytest.raises(InvalidProgramError, match="Unmatched loop start"):
+        Program.from_file(io.BytesIO(b"(*# )\n"))
+
+
 def test_copy() -> None:
     source = "*>" * 8
     program = Program(source)
@@ -223,3 +403,71 @@ def test_copy() -> None:
 
     assert program == program_2
     assert program is not program_2
+
+
+def test_step_back_loop() -> None:
+    tape = Tape("00110")
+    program = Program("(>)*")
+
+    # The bit is not set, so the ( jumps past its loop
+    program.loop_start(tape.bit)
+    assert program.pointer == 3
+
+    program.step_back(tape)
+    assert program.pointer == 0
+    assert program.steps == 0
+
+    # Loop around once, with the bit set at the )
+    tape.move_right(2)
+    program.move_right(2)
+    program.loop_end(tape.bit)
+    assert program.pointer == 3
+
+    program.step_back(tape)
+    assert program.pointer == 2
+    assert program.steps == 2
+
+    # With the bit not set, the ) jumps back to just after the (
+    tape.move_left()
+    program.loop_end(tape.bit)
+    assert program.pointer == 1
+
+    program.step_back(tape)
+    assert program.pointer == 2
+    assert program.steps == 2
+
+
+def test_step_back_finished() -> None:
+    tape = Tape(3)
+    program = Program("*>")
+
+    tape.toggle()
+    program.move_right()
+    tape.move_right()
+    with pytest.raises(ProgramPointerError):
+        program.move_right()
+    assert program.finished
+    assert program.pointer == 1
+
+    # The last command is undone, even though the pointer is still at it
+    program.step_back(tape)
+    assert not program.finished
+    assert (program.pointer, program.steps, tape.pointer) == (1, 1, 0)
+
+    program.step_back(tape)
+    assert (program.pointer, program.steps, str(tape)) == (0, 0, "000")
+
+    with pytest.raises(ProgramPointerError):
+        program.step_back(tape)
+
+
+def test_set_state() -> None:
+    program = Program("*>*")
+    program._set_state(1, 5, False)
+    assert (program.pointer, program.steps, program.finished) == (1, 5, False)
+    # A finished run leaves the pointer at the last command
+    program._set_state(3, 7, True)
+    assert (program.pointer, program.steps, program.finished) == (2, 7, True)
+    program = Program("")
+    program._set_state(0, 0, True)
+    assert program.pointer == 0
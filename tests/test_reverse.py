@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+from rbf_lang import Program, reverse_program
+from rbf_lang import reverse as reverse_module
+from rbf_lang.bench import MOVE_RIGHT
+from rbf_lang.command import Command
+from rbf_lang.exceptions import InvalidProgramError
+from rbf_lang.reverse import reverse_file
+
+MOVE_LEFT = "(>*<)>(<<(>>*<<)*>*(>*<)>)<<(>>*<<)"
+
+SOURCE = """
+# Move the bit under the pointer to the right, using a temporary cell
+(>>*<<) # set f if x is set
+>>( # if f is set
+\t<(>*<)* # set y
+\t<*(>>*<<) # unset x
+>>)\r
+<(>*<) # if y is set, unset f
+"""
+
+
+def test_reverse_program() -> None:
+    assert reverse_program(MOVE_RIGHT) == MOVE_LEFT
+    assert reverse_program(SOURCE.replace("\t", "").replace("\r", "")) == MOVE_LEFT
+    assert reverse_program(Program(MOVE_RIGHT)) == Program(MOVE_LEFT)
+    assert reverse_program(list(Program(MOVE_RIGHT))) == list(Program(MOVE_LEFT))
+    assert reverse_program([Command.TAPE_RIGHT]) == [Command.TAPE_LEFT]
+    assert reverse_program("") == ""
+
+
+@pytest.mark.parametrize(
+    "source, message",
+    [
+        ("*+", "'\\+' is not a valid Command"),
+        ("(()", "Unmatched loop start"),
+        ("())", "Unmatched loop end"),
+        (")(", "Unmatched loop end"),
+    ],
+)
+def test_reverse_invalid(source: str, message: str) -> None:
+    with pytest.raises(InvalidProgramError, match=message):
+        reverse_program(source)
+    # The same errors as for a Program
+    with pytest.raises(InvalidProgramError, match=message):
+        Program(source)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 20])
+def test_reverse_file(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, chunk_size: int
+) -> None:
+    monkeypatch.setattr(reverse_module, "_CHUNK_SIZE", chunk_size)
+    source = tmp_path / "move_right.rbf"
+    destination = tmp_path / "move_left.rbf"
+
+    source.write_bytes(SOURCE.encode())
+    reverse_file(source, destination)
+    assert destination.read_text() == MOVE_LEFT
+
+    # One long line, without a trailing newline
+    source.write_text(MOVE_RIGHT * 10)
+    reverse_file(source, destination)
+    assert destination.read_text() == MOVE_LEFT * 10
+
+    source.write_text("")
+    reverse_file(source, destination)
+    assert destination.read_text() == ""
+
+
+@pytest.mark.parametrize(
+    "source, message",
+    [
+        ("*\n*+ # +\n", "'\\+' is not a valid Command \\(at byte 3\\)"),
+        ("(()", "Unmatched loop start"),
+        ("(\n)\n)", "Unmatched loop end"),
+        # Reading backwards, the unmatched ( is found first
+        (")\n(", "Unmatched loop start"),
+    ],
+)
+def test_reverse_file_invalid(tmp_path: Path, source: str, message: str) -> None:
+    path = tmp_path / "program.rbf"
+    destination = tmp_path / "reversed.rbf"
+    path.write_text(source)
+    with pytest.raises(InvalidProgramError, match=message):
+        reverse_file(path, destination)
+    assert not destination.exists()
@@ -1,4 +1,10 @@
+import pytest
+
 from rbf_lang import run, Tape, Program
+from rbf_lang.hooks import Hooks
+from rbf_lang.runner import ENGINES, iter_run, run_backward
+from rbf_lang.tape import GrowableTape, PackedTape, SparseTape
+from rbf_lang.bench import MOVE_RIGHT
 
 
 def test_run_toggle() -> None:
@@ -64,3 +70,185 @@ def test_run_loop_behavior() -> None:
     source = "*(>)"
     program, tape = run(source, 8, max_steps=10)
     assert program.steps == 10
+
+
+def test_run_packed_tape() -> None:
+    source = MOVE_RIGHT
+    for engine in ENGINES:
+        program, tape = run(source, PackedTape("100"), engine=engine)
+        assert isinstance(tape, PackedTape)
+        assert tape == "010"
+        assert program.steps == 25
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_run_finished(engine: str) -> None:
+    program, tape = run("*>", "00", engine=engine)
+    assert program.finished
+    assert program.steps == 2
+
+    # Running a finished program again does not step it any further
+    for in_place in (False, True):
+        again, again_tape = run(program, tape, engine=engine, in_place=in_place)
+        assert again.finished
+        assert again.steps == 2
+        assert again_tape == "10"
+        assert again_tape.pointer == 1
+
+    # An empty program is finished without running any steps
+    program, tape = run("", "10", engine=engine)
+    assert program.finished
+    assert program.steps == 0
+    assert tape == "10"
+
+
+def test_run_in_place() -> None:
+    source = MOVE_RIGHT
+    program, tape = Program(source), PackedTape("100")
+    result_program, result_tape = run(program, tape, in_place=True)
+    assert result_program is program
+    assert result_tape is tape
+    assert tape == "010"
+    assert program.finished
+
+    # Without in_place, the given program and tape are left as they are
+    program, list_tape = Program(source), Tape("100")
+    result_program, result_tape = run(program, list_tape)
+    assert result_program is not program
+    assert result_program.code is program.code
+    assert list_tape == "100"
+    assert program.steps == 0
+
+    # A tape of another type than tape_type is converted
+    _program, result_tape = run(source, list_tape, tape_type="sparse", in_place=True)
+    assert isinstance(result_tape, SparseTape)
+    assert list_tape == "100"
+
+
+def test_run_tape_types() -> None:
+    source = MOVE_RIGHT
+    program, tape = run(source, "100", tape_type="sparse")
+    assert isinstance(tape, SparseTape)
+    assert tape == "010"
+    assert program.steps == 25
+
+    # A growable tape does not wrap around
+    program, tape = run("<*>>>*", "0", tape_type="growable")
+    assert isinstance(tape, GrowableTape)
+    assert tape == "1001"
+    assert tape.pointer == 3
+
+    # A scan on a growable tape never finds a set cell, so it grows until it runs out
+    program, tape = run("*>*(>)", 2, max_steps=100, tape_type="growable")
+    assert not program.finished
+    assert len(tape) > 2
+
+    with pytest.raises(ValueError):
+        run("*>", GrowableTape(2), engine="optimized")
+    # The other engines would expand a sparse tape to all its cells
+    for engine in ENGINES[1:]:
+        with pytest.raises(ValueError):
+            run("*>", SparseTape(10**12), engine=engine)
+    with pytest.raises(ValueError):
+        run("*>", 2, tape_type="sparse", detect_cycles=True)
+    with pytest.raises(ValueError):
+        iter_run("*>", 2, tape_type="sparse", engine="optimized")
+    with pytest.raises(ValueError):
+        run("*>", 2, tape_type="growable", detect_cycles=True)
+    with pytest.raises(ValueError):
+        run("*>", 2, tape_type="infinite")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_run_backward(engine: str) -> None:
+    source = MOVE_RIGHT
+    for initial in ["100", "000"]:
+        program, tape = run(source, initial, engine=engine)
+        assert program.finished
+
+        # Every intermediate state is recovered exactly
+        for steps in range(program.steps + 1):
+            expected_program, expected_tape = run(source, initial, max_steps=steps)
+            back_program, back_tape = run_backward(program, tape, program.steps - steps)
+            assert back_program.steps == steps
+            assert back_tape == expected_tape
+            assert back_tape.pointer == expected_tape.pointer
+            if steps < program.steps:
+                assert back_program.pointer == expected_program.pointer
+
+    # Cannot go back past the start of the run
+    back_program, back_tape = run_backward(program, tape, program.steps + 10)
+    assert back_program.steps == 0
+    assert back_tape == "000"
+
+
+def test_run_backward_growable() -> None:
+    # The growth of the tape cannot be undone, so neither can the run
+    program, tape = run("<", "0", tape_type="growable")
+    assert tape == "00"
+    with pytest.raises(ValueError):
+        run_backward(program, tape, 1)
+    with pytest.raises(ValueError):
+        program.step_back(tape)
+    assert program.steps == 1
+
+
+@pytest.mark.parametrize("engine", ["reference", "optimized", "fast"])
+def test_iter_run(engine: str) -> None:
+    source = MOVE_RIGHT
+    tape = Tape("100")
+    slices = list(iter_run(source, tape, slice_steps=7, engine=engine))
+    assert [progress.finished for progress in slices] == [False] * 3 + [True]
+    if engine != "fast":
+        assert [progress.steps for progress in slices] == [7, 14, 21, 25]
+        assert [progress.ran for progress in slices] == [7, 7, 7, 4]
+    # Every slice runs on the same program and tape, which is a copy of the given one
+    assert all(progress.program is slices[0].program for progress in slices)
+    assert all(progress.tape is slices[0].tape for progress in slices)
+    assert slices[0].tape == "010"
+    assert tape == "100"
+
+
+def test_iter_run_control() -> None:
+    source = "*(>)"
+    program, tape = Program(source), Tape(1000)
+    slices = iter_run(program, tape, slice_steps=4, in_place=True)
+    progress = next(slices)
+    assert progress.program is program and progress.tape is tape
+    assert program.steps == 4
+
+    # Re-budget the following slices
+    assert slices.send(10).steps == 14
+    assert next(slices).steps == 24
+
+    # Cancel, leaving the state of the last slice
+    slices.close()
+    assert program.steps == 24
+    assert list(slices) == []
+
+    # An empty program has no slices to run
+    assert list(iter_run("", 10)) == []
+    assert list(iter_run("", 10, engine="optimized")) == []
+
+    # The total budget
+    slices = iter_run(source, 1000, slice_steps=4, max_steps=10)
+    assert [progress.steps for progress in slices] == [4, 8, 10]
+
+    # A hook which asks to stop ends the run
+    hooks = Hooks()
+    hooks.at(2, lambda program, tape: program.steps > 5)
+    slices = iter_run(source, 1000, slice_steps=4, hooks=hooks)
+    assert [progress.steps for progress in slices] == [4, 6]
+
+    with pytest.raises(ValueError):
+        iter_run(source, 1000, slice_steps=0)
+    with pytest.raises(ValueError):
+        iter_run(source, 1000, engine="optimized", hooks=hooks)
+    with pytest.raises(ValueError):
+        iter_run(source, 1000, engine="compiled", tape_type="growable")
+    with pytest.raises(ValueError):
+        iter_run(source, 1000, engine="compiled")
+    slices = iter_run(source, 10)
+    next(slices)
+    with pytest.raises(ValueError):
+        slices.send(0)
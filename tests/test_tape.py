@@ -1,5 +1,5 @@
 import pytest
-from rbf_lang.tape import Tape
+from rbf_lang.tape import Tape, PackedTape, SparseTape, GrowableTape
 
 
 @pytest.fixture
@@ -86,3 +86,187 @@ def test_bit(tape: Tape) -> None:
     assert tape.bit is True
     tape.toggle()
     assert tape.bit is False
+
+
+def test_packed_tape() -> None:
+    tape = PackedTape("1011001110")
+    assert len(tape) == 10
+    assert tape == "1011001110"
+    assert tape == Tape("1011001110")
+    assert Tape("1011001110") == tape
+    assert tape == [1, 0, 1, 1, 0, 0, 1, 1, 1, 0]
+    assert tape[2] is True
+    assert tape[-1] is False
+    assert tape[0:4] == [True, False, True, True]
+    assert str(PackedTape(Tape("101"))) == "101"
+    assert str(PackedTape(3)) == "000"
+    assert str(PackedTape("")) == ""
+
+
+def test_packed_tape_toggle_and_move() -> None:
+    tape = PackedTape(12)
+    for _ in range(12):
+        tape.toggle()
+        tape.move_right(5)
+    assert tape == "1" * 12
+    assert tape.pointer == 0
+    tape.move_left()
+    assert tape.pointer == 11
+    tape.toggle()
+    assert tape.bit is False
+    assert tape == "1" * 11 + "0"
+
+
+def test_packed_tape_bytes() -> None:
+    tape = PackedTape("1010000011")
+    assert tape.to_bytes() == b"\xa0\xc0"
+    assert PackedTape.from_bytes(tape.to_bytes(), 10) == tape
+    assert PackedTape.from_bytes(b"\xff", 3) == "111"
+    assert PackedTape.from_bytes(b"\xff", 3).to_bytes() == b"\xe0"
+    assert len(PackedTape.from_bytes(b"\x00" * 4)) == 32
+    with pytest.raises(ValueError):
+        PackedTape.from_bytes(b"\x00", 9)
+
+
+def test_packed_tape_hash() -> None:
+    tape = PackedTape("0110")
+    assert hash(tape) == hash("0110")
+    assert hash(tape) == hash(Tape("0110"))
+    tape.toggle()
+    assert hash(tape) == hash("1110")
+
+
+def test_packed_tape_copy() -> None:
+    tape = PackedTape("0110", pointer=2)
+    tape_2 = tape.copy()
+    assert isinstance(tape_2, PackedTape)
+    assert tape_2 == tape
+    assert tape_2.pointer == 2
+    tape_2.toggle()
+    assert tape == "0110"
+
+
+def test_sparse_tape() -> None:
+    tape = SparseTape("1011001110")
+    assert len(tape) == 10
+    assert tape.ones == [0, 2, 3, 6, 7, 8]
+    assert tape == "1011001110"
+    assert tape == Tape("1011001110")
+    assert Tape("1011001110") == tape
+    assert tape == PackedTape("1011001110")
+    assert tape == [1, 0, 1, 1, 0, 0, 1, 1, 1, 0]
+    assert tape[2] is True
+    assert tape[-1] is False
+    assert tape[0:4] == [True, False, True, True]
+    assert tape != "1011001111"
+    assert tape != "101100111"
+    assert tape != [1, 0, 1, 1, 0, 0, 1, 1, 1, 1]
+    assert tape != Tape("1011001111")
+    assert hash(tape) == hash(SparseTape(Tape("1011001110")))
+    # Equal tapes of any type are the same key
+    assert hash(tape) == hash(Tape("1011001110")) == hash("1011001110")
+    assert {Tape("1011001110"): 1}.get(tape) == 1
+    assert len({tape, Tape("1011001110"), PackedTape("1011001110")}) == 1
+    tape.toggle()
+    assert hash(tape) == hash("0011001110")
+    tape.toggle()
+    assert repr(tape) == "SparseTape.from_ones([0, 2, 3, 6, 7, 8], 10)"
+    assert str(SparseTape(PackedTape("101"))) == "101"
+    assert str(SparseTape(3)) == "000"
+    with pytest.raises(IndexError):
+        tape[10]
+
+
+def test_sparse_tape_large() -> None:
+    tape = SparseTape(10**12)
+    # None of these expand the tape
+    assert tape == SparseTape(10**12)
+    assert repr(tape) == f"SparseTape.from_ones([], {10**12})"
+    tape.move_left()
+    tape.toggle()
+    tape.move_right(5)
+    tape.toggle()
+    assert tape.ones == [4, 10**12 - 1]
+    assert tape.pointer == 4
+    tape.toggle()
+    assert tape.ones == [10**12 - 1]
+
+    tape = SparseTape.from_ones([1, 3], 5, pointer=3)
+    assert tape == "01010"
+    assert tape.bit is True
+    with pytest.raises(ValueError):
+        SparseTape.from_ones([5], 5)
+
+
+def test_sparse_tape_copy() -> None:
+    tape = SparseTape("0110", pointer=2)
+    tape_2 = tape.copy()
+    assert isinstance(tape_2, SparseTape)
+    assert tape_2 == tape
+    assert tape_2.pointer == 2
+    tape_2.toggle()
+    assert tape == "0110"
+    tape.reset()
+    assert tape == "0000"
+    assert tape.pointer == 0
+
+
+def test_growable_tape() -> None:
+    tape = GrowableTape(1)
+    assert not tape.circular
+    tape.move_right(3)
+    tape.toggle()
+    assert tape == "0001"
+    assert tape.pointer == 3
+
+    # Growing to the left keeps the head on the first cell
+    tape.move_left(5)
+    assert tape == "000001"
+    assert tape.pointer == 0
+    tape.toggle()
+    tape.move_left()
+    assert tape == "0100001"
+    assert tape.pointer == 0
+
+    tape_2 = tape.copy()
+    assert isinstance(tape_2, GrowableTape)
+    assert repr(tape_2) == "GrowableTape('0100001')"
+
+
+def test_growable_tape_grow_left() -> None:
+    tape = GrowableTape("01")
+    tape.move_right()
+    for _ in range(100_000):
+        tape.move_left()
+    assert len(tape) == 100_001
+    assert tape.pointer == 0
+    # The spare cells are not part of the tape
+    assert tape[-1] and tape[-2] is False and tape[0] is False
+    assert tape[99_998:] == [False, False, True]
+    tape.toggle()
+    assert tape.bit
+    assert tape == Tape("1" + "0" * 99_998 + "01")
+    assert Tape("1" + "0" * 99_998 + "01") == tape
+    assert hash(tape) == hash(str(tape))
+    assert tape.copy() == tape
+    assert len(tape.copy()._tape) == 100_001
+
+    tape.reset()
+    assert tape == "0" * 100_001
+    tape.move_left()
+    assert len(tape) == 100_002
+
+
+@pytest.mark.parametrize("tape_type", [Tape, PackedTape, SparseTape, GrowableTape])
+def test_toggle_at(tape_type: type[Tape]) -> None:
+    tape = tape_type("0000", pointer=1)
+    hash(tape)
+    tape._toggle_at(2)
+    tape._toggle_at(3)
+    tape._toggle_at(3)
+    # The head stays where it was, and the cached hash is dropped
+    assert tape == "0010"
+    assert tape.pointer == 1
+    assert hash(tape) == hash("0010")
+    tape._move_to(2)
+    assert tape.bit